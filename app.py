@@ -29,6 +29,8 @@ def register_pages():
             st.Page("pages/rag/retrieval.py", title="Retrival"),
         ],
         "-- TRAINING --": [
+            st.Page("pages/training/auto.py", title="Auto (routed)"),
+            st.Page("pages/training/telemetry.py", title="LLM Telemetry"),
             st.Page("pages/training/llama3.2-1b.py", title="llama3.2:1b"),
             st.Page("pages/training/gemma2-27b.py", title="Gemma2:27b"),
             st.Page("pages/training/llama3.2-3b.py", title="llama3.2:3b"),
@@ -38,6 +40,10 @@ def register_pages():
             st.Page("./pages/training/openai.py", title="OpenAILLM"),
             st.Page("./pages/training/together.py", title="TogetherLLM"),
             st.Page("./pages/training/google_vertexai.py", title="VertexAILLM"),
+            st.Page("./pages/training/anthropic.py", title="AnthropicLLM"),
+            st.Page("./pages/training/AzureOpenAI.py", title="AzureOpenAILLM"),
+            st.Page("./pages/training/aws.py", title="BedrockLLM"),
+            st.Page("./pages/training/ai21.py", title="AI21LLM"),
         ],
     }
 
@@ -0,0 +1,129 @@
+import os
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.absolute()
+DATA_DIR = ROOT_DIR / "data"
+CHROMA_DIR = DATA_DIR / "chroma_db_with_metadata"
+DB_PATH = Path(os.getenv("USER_DB_PATH", ROOT_DIR / "user.db")).absolute()
+
+# SQLite connection pool and tuning, see models/database.py
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5"))  # seconds
+DB_CACHE_KB = int(os.getenv("DB_CACHE_KB", "20000"))
+DB_MMAP_BYTES = int(os.getenv("DB_MMAP_BYTES", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+# Client and VC search results per page, see models/search.py
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "25"))
+
+# Cached SELECT results kept per process (0 disables the cache), see models/query_cache.py
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+# Seconds a cached result is served for, so writes from other processes show up (0 keeps it until invalidated)
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "5"))
+
+# Rows per transaction for bulk imports (and per fetch for exports), see models/bulk.py
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+# Scrape blobs: stored once per content hash, compressed (zstd needs the
+# zstandard package, zlib otherwise), last N versions kept per company
+SCRAPE_CODEC = os.getenv("SCRAPE_CODEC", "zstd")
+SCRAPE_COMPRESSION_LEVEL = int(os.getenv("SCRAPE_COMPRESSION_LEVEL", "6"))
+SCRAPE_KEEP_VERSIONS = int(os.getenv("SCRAPE_KEEP_VERSIONS", "5"))
+
+# Scrape service (gRPC), see models/scrape_client.py
+SCRAPE_SERVICE_TARGET = os.getenv("SCRAPE_SERVICE_TARGET", "localhost:5200")
+SCRAPE_RPC_TIMEOUT = float(os.getenv("SCRAPE_RPC_TIMEOUT", "10"))  # seconds, per call
+SCRAPE_BLOB_TIMEOUT = float(os.getenv("SCRAPE_BLOB_TIMEOUT", "30"))  # seconds, for blob downloads
+SCRAPE_RPC_ATTEMPTS = int(os.getenv("SCRAPE_RPC_ATTEMPTS", "4"))  # including the first
+SCRAPE_KEEPALIVE = float(os.getenv("SCRAPE_KEEPALIVE", "30"))  # seconds between pings
+SCRAPE_MAX_MESSAGE_MB = int(os.getenv("SCRAPE_MAX_MESSAGE_MB", "64"))
+SCRAPE_GZIP = os.getenv("SCRAPE_GZIP", "1") == "1"
+SCRAPE_CHUNK_KB = int(os.getenv("SCRAPE_CHUNK_KB", "256"))  # per StreamScrapingBlob message
+SCRAPE_BATCH_SIZE = int(os.getenv("SCRAPE_BATCH_SIZE", "100"))  # names per *Many call
+# Blob bytes per GetScrapingBlobsMany response, under gRPC's default 4 MB message cap; the rest are streamed
+SCRAPE_BATCH_MAX_KB = int(os.getenv("SCRAPE_BATCH_MAX_KB", "3072"))
+# Bulk "scrape all": sites scraped at once, and how IsScrapingDone is polled
+SCRAPE_BULK_CONCURRENCY = int(os.getenv("SCRAPE_BULK_CONCURRENCY", "8"))
+SCRAPE_POLL_INITIAL = float(os.getenv("SCRAPE_POLL_INITIAL", "0.5"))  # seconds
+SCRAPE_POLL_MAX = float(os.getenv("SCRAPE_POLL_MAX", "8"))  # seconds
+SCRAPE_POLL_TIMEOUT = float(os.getenv("SCRAPE_POLL_TIMEOUT", "300"))  # seconds per site
+# Follow WatchScrapes in the background instead of fetching blobs on page renders
+SCRAPE_WATCH = os.getenv("SCRAPE_WATCH", "1") == "1"
+SCRAPE_WATCH_RETRY_MAX = float(os.getenv("SCRAPE_WATCH_RETRY_MAX", "30"))  # seconds between reconnects
+
+# The in-repo scrape service's crawler (python -m models.scrape_service), see models/crawler.py
+CRAWL_DB_PATH = Path(os.getenv("CRAWL_DB_PATH", DATA_DIR / "crawler.db")).absolute()
+CRAWL_USER_AGENT = os.getenv("CRAWL_USER_AGENT", "llm-tranning-crawler/1.0")
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "16"))  # fetches at once, all hosts
+CRAWL_HOST_CONCURRENCY = int(os.getenv("CRAWL_HOST_CONCURRENCY", "2"))  # fetches at once per host
+CRAWL_HOST_RATE = float(os.getenv("CRAWL_HOST_RATE", "2"))  # requests per second per host, or robots.txt's Crawl-delay
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50"))  # per site
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "3"))  # links from the start page
+CRAWL_MAX_PAGE_KB = int(os.getenv("CRAWL_MAX_PAGE_KB", "2048"))
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "20"))  # seconds per request
+CRAWL_MAX_RETRIES = int(os.getenv("CRAWL_MAX_RETRIES", "3"))  # for 429, 5xx and transport errors
+CRAWL_ROBOTS_TTL = float(os.getenv("CRAWL_ROBOTS_TTL", "3600"))  # seconds a robots.txt is trusted
+# Processes extracting the main content of crawled pages (0 or 1: in the crawler), see models/extract.py
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+# Keep models loaded between turns so their KV cache can be reused
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Skip the chat pipeline's warm-up ping if the model was pinged this recently
+PIPELINE_WARM_INTERVAL = float(os.getenv("PIPELINE_WARM_INTERVAL", "60"))  # seconds
+
+# Auto chat routing
+ROUTER_LATENCY_SLO = float(os.getenv("ROUTER_LATENCY_SLO", "15"))  # seconds
+ROUTER_LATENCY_PERCENTILE = float(os.getenv("ROUTER_LATENCY_PERCENTILE", "0.9"))
+ROUTER_SAMPLE_MAX_AGE = float(os.getenv("ROUTER_SAMPLE_MAX_AGE", "600"))  # seconds a latency sample counts for
+
+# Chat memory: turns kept in memory per session before compaction into the summary
+CHAT_MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "6"))
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "10"))
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "llama3.2:1b")
+# Stop reusing Ollama's returned context once it grows past this many tokens
+CHAT_CONTEXT_MAX_TOKENS = int(os.getenv("CHAT_CONTEXT_MAX_TOKENS", "3072"))
+
+# LLM scheduler: concurrent calls per model, queue bound and longest wait for a slot
+LLM_CONCURRENCY = {
+    "gemma2:27b": 1,
+    "llama3.2:3b-instruct-fp16": 1,
+}
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "8"))
+LLM_MAX_WAIT = float(os.getenv("LLM_MAX_WAIT", "30"))  # seconds
+
+# Hosted LLM providers: concurrent requests and requests per second per provider
+# (overridable per provider, e.g. OPENAI_MAX_CONCURRENCY, OPENAI_RATE_LIMIT)
+PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "4"))
+PROVIDER_RATE_LIMIT = float(os.getenv("PROVIDER_RATE_LIMIT", "2"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "4"))
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "60"))  # seconds
+PROVIDER_BACKOFF_BASE = float(os.getenv("PROVIDER_BACKOFF_BASE", "0.5"))  # seconds
+PROVIDER_BACKOFF_CAP = float(os.getenv("PROVIDER_BACKOFF_CAP", "20"))  # seconds
+
+# Hedged chat turns: if the primary backend has no first token after this
+# percentile of its observed time-to-first-token, the secondary is tried too
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "3"))  # seconds, until TTFT samples exist
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))  # seconds
+HEDGE_SECONDARY = os.getenv("HEDGE_SECONDARY", "llama3.2:1b")
+
+# LLM call telemetry, written to the llm_calls table in batches
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") == "1"
+TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "100"))
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "2"))  # seconds
+# USD per million tokens (input, output) for hosted models; local models cost nothing
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "claude-3-5-haiku-latest": (0.80, 4.00),
+    "claude-3-5-sonnet-latest": (3.00, 15.00),
+    "command-r-08-2024": (0.15, 0.60),
+    "command-r-plus-08-2024": (2.50, 10.00),
+    "gemini-1.5-flash-002": (0.075, 0.30),
+    "gemini-1.5-pro-002": (1.25, 5.00),
+    "jamba-mini": (0.20, 0.40),
+    "jamba-large": (2.00, 8.00),
+}
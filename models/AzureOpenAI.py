@@ -0,0 +1,27 @@
+"""Azure OpenAI adapter: the model name is the deployment name"""
+import os
+from typing import Dict
+
+from models.openai import OpenAIProvider
+
+
+class AzureOpenAIProvider(OpenAIProvider):
+    name = "azure_openai"
+    # https://<resource>.openai.azure.com
+    base_url = os.getenv("AZURE_OPENAI_ENDPOINT", "")
+    api_key_env = "AZURE_OPENAI_API_KEY"
+    models = [os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o-mini")]
+    api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-21")
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key and self.base_url)
+
+    def headers(self) -> Dict[str, str]:
+        return {"api-key": self.api_key}
+
+    def build_request(self, model, messages, stream, max_tokens, temperature):
+        _, payload = super().build_request(model, messages, stream, max_tokens, temperature)
+        # The deployment in the path selects the model
+        del payload["model"]
+        return f"/openai/deployments/{model}/chat/completions?api-version={self.api_version}", payload
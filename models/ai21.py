@@ -0,0 +1,14 @@
+"""AI21 Studio adapter (Jamba models, OpenAI-compatible chat API)"""
+from models.openai import OpenAIProvider
+
+
+class AI21Provider(OpenAIProvider):
+    name = "ai21"
+    base_url = "https://api.ai21.com/studio/v1"
+    api_key_env = "AI21_API_KEY"
+    models = ["jamba-mini", "jamba-large"]
+
+    def build_request(self, model, messages, stream, max_tokens, temperature):
+        path, payload = super().build_request(model, messages, stream, max_tokens, temperature)
+        payload.pop("stream_options", None)  # not supported, usage comes with the last chunk
+        return path, payload
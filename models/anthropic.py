@@ -0,0 +1,62 @@
+"""Anthropic Messages API adapter"""
+from typing import Dict, List, Tuple
+
+from models.provider import Provider, Completion, ProviderError
+
+
+class AnthropicProvider(Provider):
+    name = "anthropic"
+    base_url = "https://api.anthropic.com"
+    api_key_env = "ANTHROPIC_API_KEY"
+    models = ["claude-3-5-haiku-latest", "claude-3-5-sonnet-latest"]
+    api_version = "2023-06-01"
+
+    def headers(self) -> Dict[str, str]:
+        return {"x-api-key": self.api_key, "anthropic-version": self.api_version}
+
+    def build_request(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            stream: bool,
+            max_tokens: int,
+            temperature: float,
+    ) -> Tuple[str, dict]:
+        # The system prompt is a top-level field, not a message
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        payload = {
+            "model": model,
+            "messages": [m for m in messages if m["role"] != "system"],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if system:
+            payload["system"] = system
+        if stream:
+            payload["stream"] = True
+        return "/v1/messages", payload
+
+    def parse_response(self, model: str, data: dict) -> Completion:
+        usage = data.get("usage") or {}
+        return Completion(
+            model=data.get("model", model),
+            text="".join(block.get("text", "") for block in data.get("content", []) if block.get("type") == "text"),
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0),
+            finish_reason=data.get("stop_reason"),
+            raw=data,
+        )
+
+    def parse_event(self, event: dict, completion: Completion) -> str:
+        kind = event.get("type")
+        if kind == "message_start":
+            usage = event["message"].get("usage") or {}
+            completion.prompt_tokens = usage.get("input_tokens", 0)
+        elif kind == "content_block_delta" and event["delta"].get("type") == "text_delta":
+            return event["delta"]["text"]
+        elif kind == "message_delta":
+            completion.finish_reason = event["delta"].get("stop_reason")
+            completion.completion_tokens = (event.get("usage") or {}).get("output_tokens", 0)
+        elif kind == "error":
+            raise ProviderError(self.name, f"stream error: {event.get('error')}")
+        return ""
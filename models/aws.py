@@ -0,0 +1,66 @@
+"""AWS Bedrock adapter using the Converse API.
+
+Authenticates with a Bedrock API key (``AWS_BEARER_TOKEN_BEDROCK``).
+ConverseStream answers in AWS's binary event-stream encoding rather than
+server-sent events, so streaming falls back to one chunk per answer.
+"""
+import os
+from typing import Dict, List, Tuple
+from urllib.parse import quote
+
+from models.provider import Provider, Completion
+
+
+class BedrockProvider(Provider):
+    name = "aws"
+    api_key_env = "AWS_BEARER_TOKEN_BEDROCK"
+    models = [
+        "anthropic.claude-3-5-haiku-20241022-v1:0",
+        "meta.llama3-1-8b-instruct-v1:0",
+        "amazon.nova-lite-v1:0",
+    ]
+    region = os.getenv("AWS_REGION", "us-east-1")
+    base_url = f"https://bedrock-runtime.{region}.amazonaws.com"
+    supports_streaming = False
+
+    def build_request(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            stream: bool,
+            max_tokens: int,
+            temperature: float,
+    ) -> Tuple[str, dict]:
+        payload = {
+            "messages": [
+                {"role": m["role"], "content": [{"text": m["content"]}]}
+                for m in messages if m["role"] != "system"
+            ],
+            "inferenceConfig": {"maxTokens": max_tokens, "temperature": temperature},
+        }
+        system = [{"text": m["content"]} for m in messages if m["role"] == "system"]
+        if system:
+            payload["system"] = system
+        return f"/model/{quote(model, safe='')}/converse", payload
+
+    def parse_response(self, model: str, data: dict) -> Completion:
+        content = (data.get("output") or {}).get("message", {}).get("content") or []
+        usage = data.get("usage") or {}
+        return Completion(
+            model=model,
+            text="".join(block.get("text", "") for block in content),
+            prompt_tokens=usage.get("inputTokens", 0),
+            completion_tokens=usage.get("outputTokens", 0),
+            finish_reason=data.get("stopReason"),
+            raw=data,
+        )
+
+    def parse_event(self, event: dict, completion: Completion) -> str:
+        """A decoded ConverseStream event; not called while streaming falls back to complete()"""
+        if "metadata" in event:
+            usage = event["metadata"].get("usage") or {}
+            completion.prompt_tokens = usage.get("inputTokens", 0)
+            completion.completion_tokens = usage.get("outputTokens", 0)
+        if "messageStop" in event:
+            completion.finish_reason = event["messageStop"].get("stopReason")
+        return ((event.get("contentBlockDelta") or {}).get("delta") or {}).get("text") or ""
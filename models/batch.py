@@ -0,0 +1,235 @@
+"""Offline batch RAG inference over a JSONL file of prompts.
+
+Each input line is run through the same retrieval + generation pipeline as
+the chat pages and one result line is appended to the output file. Prompts
+whose id already has a successful result in the output are skipped, so an
+interrupted run resumes where it stopped.
+
+``--stub`` benchmarks the pipeline itself: a deterministic stand-in
+replaces the model and the vector store (no Ollama server, embedding
+model or index is touched) and no calls are recorded in telemetry.
+
+Usage:
+    python -m models.batch requests.jsonl results.jsonl --workers 4
+    python -m models.batch requests.jsonl bench.jsonl --stub
+"""
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from models.chat import load_vector_store, retrieve, generate_turn, document_id, PrefixState
+from models import telemetry
+from models.router import router
+from models.scheduler import SchedulerBusy, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+ID_FIELDS = ("id", "request_id")
+PROMPT_FIELDS = ("prompt", "question", "query", "body")
+
+
+class StubLLM:
+    """Deterministic stand-in for the Ollama client, for benchmarks without a model"""
+
+    def generate(self, model, prompt, **kwargs):
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+        answer = f"[stub {model}] {digest[:16]}"
+        return {
+            "response": answer,
+            "context": [],
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": 0,
+            "eval_count": len(answer.split()),
+        }
+
+
+class StubStore:
+    """Deterministic stand-in for the vector store: the same k documents per prompt, no embeddings"""
+
+    def similarity_search_with_relevance_scores(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+        digest = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        return [
+            (Document(page_content=f"Stub document {i} for {digest[:16]}", metadata={"source": f"stub/{i}"}),
+             round(1.0 - i / (k + 1), 4))
+            for i in range(k)
+        ]
+
+
+def read_prompts(path: Path, id_field: Optional[str], prompt_field: Optional[str]) -> Iterator[Tuple[str, str]]:
+    """Stream (id, prompt) pairs from a JSONL file"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Line {line_no}: invalid JSON ({e}), skipped")
+                continue
+            if not isinstance(record, dict):
+                logger.warning(f"Line {line_no}: expected an object, skipped")
+                continue
+            ids = [id_field] if id_field else ID_FIELDS
+            prompts = [prompt_field] if prompt_field else PROMPT_FIELDS
+            record_id = next((str(record[k]) for k in ids if k in record), str(line_no))
+            prompt = next((record[k] for k in prompts if record.get(k)), None)
+            if prompt is None:
+                logger.warning(f"Line {line_no}: no prompt field, skipped")
+                continue
+            yield record_id, prompt
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """Ids that already have a successful result in the output file"""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a crash
+            if isinstance(result, dict) and result.get("status") == "ok" and "id" in result:
+                done.add(str(result["id"]))
+    return done
+
+
+def run_one(db, record_id: str, prompt: str, model: str, k: int, client, retries: int = 5,
+            telemetry: bool = True) -> dict:
+    start = time.perf_counter()
+    try:
+        scored_docs = retrieve(db, prompt, k=k)
+        docs = [doc for doc, _ in scored_docs]
+        model_name = router.route(prompt, [score for _, score in scored_docs]).model if model == "auto" else model
+        for attempt in range(retries):
+            try:
+                answer, stats = generate_turn(
+                    model_name, prompt, docs, PrefixState(), f"batch-{record_id}",
+                    priority=PRIORITY_BACKGROUND, client=client, page="batch", telemetry=telemetry,
+                )
+                break
+            except SchedulerBusy:
+                if attempt == retries - 1:
+                    raise
+                time.sleep(2 ** attempt)
+        return {
+            "id": record_id,
+            "status": "ok",
+            "model": model_name,
+            "answer": answer,
+            "sources": [
+                {"id": document_id(doc), "source": doc.metadata.get("source"), "score": round(score, 4)}
+                for doc, score in scored_docs
+            ],
+            "latency_s": round(time.perf_counter() - start, 3),
+            "prompt_tokens": stats.prompt_tokens,
+            "completion_tokens": stats.completion_tokens,
+        }
+    except Exception as e:
+        logger.error(f"{record_id}: {e}")
+        return {
+            "id": record_id,
+            "status": "error",
+            "error": str(e),
+            "latency_s": round(time.perf_counter() - start, 3),
+        }
+
+
+def run_batch(
+        input_path: Path,
+        output_path: Path,
+        model: str = "llama3.2:1b",
+        workers: int = 4,
+        k: int = 3,
+        stub: bool = False,
+        id_field: Optional[str] = None,
+        prompt_field: Optional[str] = None,
+) -> dict:
+    done = completed_ids(output_path)
+    if done:
+        logger.info(f"Resuming: {len(done)} prompts already completed")
+    db = StubStore() if stub else load_vector_store()
+    client = StubLLM() if stub else None
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    started = time.perf_counter()
+
+    # Terminate a torn last line so new results start on their own line
+    if output_path.exists() and output_path.stat().st_size:
+        with open(output_path, "rb") as f:
+            f.seek(-1, 2)
+            needs_newline = f.read(1) != b"\n"
+    else:
+        needs_newline = False
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        if needs_newline:
+            out.write("\n")
+        pending = set()
+
+        def drain():
+            nonlocal pending
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                counts[result["status"]] += 1
+
+        for record_id, prompt in read_prompts(input_path, id_field, prompt_field):
+            if record_id in done:
+                counts["skipped"] += 1
+                continue
+            # Keep at most 2x workers prompts in flight so the input is streamed, not loaded
+            if len(pending) >= workers * 2:
+                drain()
+            pending.add(executor.submit(run_one, db, record_id, prompt, model, k, client, telemetry=not stub))
+        while pending:
+            drain()
+
+    if not stub:
+        telemetry.writer.flush()
+    elapsed = time.perf_counter() - started
+    counts["elapsed_s"] = round(elapsed, 2)
+    counts["prompts_per_s"] = round(counts["ok"] / elapsed, 3) if elapsed else 0.0
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the RAG chat pipeline over a JSONL file of prompts")
+    parser.add_argument("input", type=Path, help="JSONL file with one prompt per line")
+    parser.add_argument("output", type=Path, help="JSONL file results are appended to")
+    parser.add_argument("--model", default="llama3.2:1b", help="Ollama model, or 'auto' to use the router")
+    parser.add_argument("--workers", type=int, default=4, help="prompts processed in parallel")
+    parser.add_argument("-k", type=int, default=3, help="documents retrieved per prompt")
+    parser.add_argument("--stub", action="store_true",
+                        help="use deterministic stubs instead of Ollama and the vector store, without telemetry")
+    parser.add_argument("--id-field", help=f"id field (default: first of {', '.join(ID_FIELDS)})")
+    parser.add_argument("--prompt-field", help=f"prompt field (default: first of {', '.join(PROMPT_FIELDS)})")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    counts = run_batch(
+        args.input, args.output,
+        model=args.model, workers=args.workers, k=args.k, stub=args.stub,
+        id_field=args.id_field, prompt_field=args.prompt_field,
+    )
+    print(json.dumps(counts))
+    return 0 if counts["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
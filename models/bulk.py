@@ -0,0 +1,293 @@
+"""Bulk CSV / JSONL import and export for products, services, clients and VCs.
+
+Imports stream the input and write it with ``executemany`` in chunked
+transactions, one commit per chunk, so a 100k-row file never sits in memory
+and a bad chunk does not undo the chunks before it. Rows whose key (title or
+name) already exists are skipped, updated or abort the import, depending on
+``on_conflict``. A dry run does all of the work inside one transaction and
+rolls it back, so its counts are exactly what a real import would do.
+
+Exports are generators of text lines read from the table with ``fetchmany``.
+
+Usage:
+    python -m models.bulk import clients clients.csv --on-conflict update
+    python -m models.bulk import products products.jsonl --dry-run
+    python -m models.bulk export vcs vcs.jsonl
+    python -m models.bulk export services -            # to stdout
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from config import settings
+from models.database import get_db_connection
+from models.query_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+# Table -> (key column, other columns); every column is required
+TABLES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "products": ("title", ("description",)),
+    "services": ("title", ("description",)),
+    "clients": ("name", ("url",)),
+    "vcs": ("name", ("url",)),
+}
+FORMATS = ("csv", "jsonl")
+CONFLICT_MODES = ("skip", "update", "abort")
+# Keep at most this many row errors in an ImportResult
+MAX_ERRORS = 20
+
+
+@dataclass
+class ImportResult:
+    table: str
+    dry_run: bool = False
+    read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    errors: List[str] = field(default_factory=list)
+    aborted: bool = False
+    seconds: float = 0.0
+
+    def error(self, message: str):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(message)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+
+def columns(table: str) -> Tuple[str, ...]:
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table!r}, expected one of {', '.join(TABLES)}")
+    key, others = TABLES[table]
+    return (key,) + others
+
+
+def guess_format(path: str) -> str:
+    return "jsonl" if Path(path).suffix.lower() in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Stream (line number, record) pairs; a JSONL line that fails to parse yields its error"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, e
+    else:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+
+
+def to_row(record, names: Tuple[str, ...]) -> Tuple[str, ...]:
+    """The table row for a record, or ValueError naming what is wrong with it"""
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON ({record})")
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    row = tuple(str(record.get(name) or "").strip() for name in names)
+    missing = [name for name, value in zip(names, row) if not value]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    return row
+
+
+def insert_sql(table: str, on_conflict: str) -> str:
+    names = columns(table)
+    key = names[0]
+    sql = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})"
+    if on_conflict == "skip":
+        sql += f" ON CONFLICT ({key}) DO NOTHING"
+    elif on_conflict == "update":
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names[1:])
+        sql += f" ON CONFLICT ({key}) DO UPDATE SET {updates}"
+    return sql
+
+
+def existing_keys(conn: sqlite3.Connection, table: str, keys: List[str]) -> set:
+    key = columns(table)[0]
+    found = set()
+    # Stay well under SQLite's host parameter limit
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        placeholders = ", ".join("?" for _ in batch)
+        found.update(k for (k,) in conn.execute(f"SELECT {key} FROM {table} WHERE {key} IN ({placeholders})", batch))
+    return found
+
+
+def write_chunk(conn: sqlite3.Connection, table: str, sql: str, rows: List[tuple], on_conflict: str,
+                result: ImportResult):
+    """Write one chunk and count what happened to it"""
+    # Later duplicates in the same chunk hit the earlier row, just as they would across chunks
+    keys = [row[0] for row in rows]
+    before = existing_keys(conn, table, keys)
+    seen = set(before)
+    conflicts = 0
+    for key in keys:
+        if key in seen:
+            conflicts += 1
+        seen.add(key)
+
+    cursor = conn.executemany(sql, rows)
+    if on_conflict == "update":
+        result.updated += conflicts
+        result.inserted += len(rows) - conflicts
+    else:
+        result.inserted += cursor.rowcount
+        result.skipped += len(rows) - cursor.rowcount
+
+
+def import_records(
+        table: str,
+        records: Iterable[Tuple[int, object]],
+        on_conflict: str = "skip",
+        dry_run: bool = False,
+        chunk_size: int = settings.BULK_CHUNK_SIZE,
+) -> ImportResult:
+    """Import (line number, record) pairs as produced by read_records"""
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"Unknown conflict mode {on_conflict!r}, expected one of {', '.join(CONFLICT_MODES)}")
+    names = columns(table)
+    sql = insert_sql(table, on_conflict)
+    result = ImportResult(table, dry_run=dry_run)
+    start = time.perf_counter()
+
+    def valid_rows() -> Iterator[tuple]:
+        for line_no, record in records:
+            result.read += 1
+            try:
+                yield to_row(record, names)
+            except ValueError as e:
+                result.invalid += 1
+                result.error(f"line {line_no}: {e}")
+
+    rows = valid_rows()
+    with get_db_connection() as conn:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            try:
+                write_chunk(conn, table, sql, chunk, on_conflict, result)
+            except sqlite3.IntegrityError as e:
+                # Only "abort" lets a conflict through; the failing chunk is rolled back
+                conn.rollback()
+                result.aborted = True
+                result.error(f"chunk ending at row {result.read}: {e}")
+                break
+            if not dry_run:
+                conn.commit()
+        if dry_run:
+            conn.rollback()
+    if not dry_run and (result.inserted or result.updated):
+        invalidate(table)
+    result.seconds = time.perf_counter() - start
+    logger.info(
+        f"{'Dry run of ' if dry_run else ''}{table} import: {result.read} read, {result.inserted} inserted, "
+        f"{result.updated} updated, {result.skipped} skipped, {result.invalid} invalid "
+        f"in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/s)"
+    )
+    return result
+
+
+def import_file(table: str, path: str, fmt: str = None, **kwargs) -> ImportResult:
+    # utf-8-sig: spreadsheet exports often start with a byte order mark
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return import_records(table, read_records(f, fmt or guess_format(path)), **kwargs)
+
+
+def export_lines(table: str, fmt: str = "csv", batch_size: int = settings.BULK_CHUNK_SIZE) -> Iterator[str]:
+    """Stream a table as CSV (with a header) or JSONL lines, ordered by id"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    names = columns(table)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def csv_line(values) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    if fmt == "csv":
+        yield csv_line(names)
+    with get_db_connection() as conn:
+        cursor = conn.execute(f"SELECT {', '.join(names)} FROM {table} ORDER BY id")
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                if fmt == "csv":
+                    yield csv_line(row)
+                else:
+                    yield json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import and export of products, services, clients and VCs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="import a CSV or JSONL file")
+    importer.add_argument("table", choices=list(TABLES))
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    importer.add_argument("--on-conflict", choices=CONFLICT_MODES, default="skip",
+                          help="what to do with rows whose key exists (default: %(default)s)")
+    importer.add_argument("--dry-run", action="store_true", help="validate and count, then roll back")
+    importer.add_argument("--chunk-size", type=int, default=settings.BULK_CHUNK_SIZE)
+
+    exporter = commands.add_parser("export", help="export a table to CSV or JSONL")
+    exporter.add_argument("table", choices=list(TABLES))
+    exporter.add_argument("path", help="output file, or - for stdout")
+    exporter.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        stream=sys.stderr,
+    )
+    fmt = args.format or guess_format(args.path)
+    try:
+        if args.command == "import":
+            result = import_file(args.table, args.path, fmt, on_conflict=args.on_conflict,
+                                 dry_run=args.dry_run, chunk_size=args.chunk_size)
+            for message in result.errors:
+                logger.warning(message)
+            return 1 if result.aborted else 0
+
+        if args.path == "-":
+            sys.stdout.writelines(export_lines(args.table, fmt))
+        else:
+            with open(args.path, "w", encoding="utf-8", newline="") as f:
+                f.writelines(export_lines(args.table, fmt))
+        return 0
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"{args.command} failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
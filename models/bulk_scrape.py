@@ -0,0 +1,283 @@
+"""Scrape every client and VC site through the scrape service.
+
+A job sends ``Scrape`` for each site, at most ``SCRAPE_BULK_CONCURRENCY`` at
+a time, waits for it with one ``IsScrapingDoneMany`` poll per round for
+every site in flight (jittered exponential backoff between rounds), then
+streams the blob straight into compressed storage (skipping the download
+when it is the one already stored). All of it runs on one grpc.aio channel
+on the shared background event loop, so hundreds of sites cost a handful of
+threads. One job runs per process; the pages poll its progress.
+
+Usage:
+    python -m models.bulk_scrape                 # every client and VC
+    python -m models.bulk_scrape --table vcs
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import grpc
+
+from config import settings
+from models.database import get_db_connection
+from models.event_loop import submit
+from models.scrape_client import (
+    BlobStreamError, ScrapeFailed, rpc_error, scrape_channel, scraping_blobs_many, scraping_done_many_async,
+    stream_blob_async,
+)
+from models.scrapes import latest_hash, save_compressed_scrape, url_key
+from proto.scrape_pb2 import ScrapeRequest  # on the path via scrape_client
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_TABLES = ("clients", "vcs")
+# Keep at most this many site errors in a job's progress
+MAX_ERRORS = 50
+
+
+@dataclass(frozen=True)
+class Site:
+    table: str
+    name: str
+    url: str
+
+    @property
+    def key(self) -> str:
+        return url_key(self.url)
+
+
+@dataclass
+class ScrapeProgress:
+    total: int
+    in_flight: int = 0
+    requested: int = 0
+    scraped: int = 0
+    stored: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    bytes: int = 0  # downloaded
+    deltas: int = 0  # blobs of which only the changed pages were downloaded
+    errors: List[str] = field(default_factory=list)
+    started: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+
+    @property
+    def completed(self) -> int:
+        return self.stored + self.unchanged + self.failed
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def sites_per_minute(self) -> float:
+        return self.completed / self.seconds * 60 if self.seconds else 0.0
+
+    def fail(self, site: Site, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"{site.name} ({site.url}): {message}")
+
+
+def load_sites(tables: Sequence[str] = SCRAPE_TABLES) -> List[Site]:
+    sites = []
+    with get_db_connection() as conn:
+        for table in tables:
+            if table not in SCRAPE_TABLES:
+                raise ValueError(f"Unknown table {table!r}, expected one of {', '.join(SCRAPE_TABLES)}")
+            rows = conn.execute(f"SELECT name, url FROM {table} WHERE url != '' ORDER BY id").fetchall()
+            sites.extend(Site(table, name, url) for name, url in rows)
+    # A site listed as both a client and a VC is scraped once
+    unique = {}
+    for site in sites:
+        unique.setdefault(site.key, site)
+    return list(unique.values())
+
+
+def load_site(table: str, row_id: int) -> Optional[Site]:
+    if table not in SCRAPE_TABLES:
+        raise ValueError(f"Unknown table {table!r}, expected one of {', '.join(SCRAPE_TABLES)}")
+    with get_db_connection() as conn:
+        row = conn.execute(f"SELECT name, url FROM {table} WHERE id = ?", (row_id,)).fetchone()
+    return Site(table, *row) if row else None
+
+
+class StatusPoller:
+    """Polls IsScrapingDoneMany for every site still being scraped, one call per round
+
+    Rounds start SCRAPE_POLL_INITIAL apart and back off, with jitter, up to
+    SCRAPE_POLL_MAX while nothing finishes.
+    """
+
+    def __init__(self, stub):
+        self.stub = stub
+        self.waiting: Dict[str, List[asyncio.Future]] = {}
+        self.rounds = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def wait(self, site: Site):
+        """Return once the site's scrape is done"""
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(site.key, []).append(future)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        try:
+            error = await asyncio.wait_for(future, settings.SCRAPE_POLL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"not done after {settings.SCRAPE_POLL_TIMEOUT:.0f}s") from None
+        if error:
+            raise ScrapeFailed(error)
+
+    def resolve(self, name: str, error: Optional[str] = None):
+        for future in self.waiting.pop(name, ()):
+            if not future.done():
+                future.set_result(error)
+
+    async def run(self):
+        delay = settings.SCRAPE_POLL_INITIAL
+        while self.waiting:
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            # Drop sites whose wait timed out or was cancelled
+            for name in [name for name, futures in self.waiting.items() if all(f.done() for f in futures)]:
+                del self.waiting[name]
+            if not self.waiting:
+                break
+            self.rounds += 1
+            try:
+                done, errors = await scraping_done_many_async(self.stub, list(self.waiting))
+            except grpc.aio.AioRpcError as e:
+                done, errors = {}, {name: rpc_error(e) for name in self.waiting}
+            finished = [name for name, is_done in done.items() if is_done]
+            for name in finished:
+                self.resolve(name)
+            for name, error in errors.items():
+                self.resolve(name, error)
+            delay = settings.SCRAPE_POLL_INITIAL if finished else min(delay * 2, settings.SCRAPE_POLL_MAX)
+
+
+async def scrape_site(stub, site: Site, progress: ScrapeProgress, slots: asyncio.Semaphore, poller: StatusPoller):
+    async with slots:
+        progress.in_flight += 1
+        try:
+            # Same naming as the Company page: scrape by name, then look the result up by URL key
+            await stub.Scrape(ScrapeRequest(name=site.name, url=site.url))
+            progress.requested += 1
+            await poller.wait(site)
+            progress.scraped += 1
+            known_hash = await asyncio.to_thread(latest_hash, site.key)
+            blob = await stream_blob_async(stub, site.key, known_hash)
+        except grpc.aio.AioRpcError as e:
+            progress.fail(site, f"{e.code().name}: {e.details()}")
+            return
+        except (TimeoutError, ScrapeFailed, BlobStreamError) as e:
+            progress.fail(site, str(e))
+            return
+        finally:
+            progress.in_flight -= 1
+    if blob.skipped:
+        progress.unchanged += 1
+        return
+    if not blob.size:
+        progress.fail(site, "empty blob")
+        return
+    if blob.received is not None:
+        progress.deltas += 1
+    progress.bytes += blob.size if blob.received is None else blob.received
+    try:
+        stored = await asyncio.to_thread(save_compressed_scrape, site.key, blob.sha256, blob.size, blob.codec, blob.data)
+    except sqlite3.Error as e:
+        progress.fail(site, f"not stored: {e}")
+        return
+    if stored:
+        progress.stored += 1
+    else:
+        progress.unchanged += 1
+
+
+async def scrape_sites(sites: Sequence[Site], progress: ScrapeProgress,
+                       concurrency: int = settings.SCRAPE_BULK_CONCURRENCY):
+    stub = scrape_channel.aio_stub()
+    slots = asyncio.Semaphore(concurrency)
+    poller = StatusPoller(stub)
+    try:
+        await asyncio.gather(*(scrape_site(stub, site, progress, slots, poller) for site in sites))
+    finally:
+        progress.finished = time.time()
+        logger.info(
+            f"Scraped {progress.total} sites in {progress.seconds:.1f}s: {progress.stored} stored, "
+            f"{progress.unchanged} unchanged, {progress.failed} failed ({progress.deltas} as deltas, {poller.rounds} status polls)"
+        )
+
+
+def refresh_blobs(names: Sequence[str], stub=None) -> Tuple[int, int, Dict[str, str]]:
+    """Store the current blob of many finished scrapes: (stored, unchanged, {name: error})
+
+    One GetScrapingBlobsMany call per SCRAPE_BATCH_SIZE names; blobs that are
+    already the latest stored ones are not sent at all.
+    """
+    blobs, errors = scraping_blobs_many(names, {name: latest_hash(name) for name in names}, stub)
+    stored = unchanged = 0
+    for name, blob in blobs.items():
+        if blob.skipped or not save_compressed_scrape(name, blob.sha256, blob.size, blob.codec, blob.data):
+            unchanged += 1
+        else:
+            stored += 1
+    return stored, unchanged, errors
+
+
+class ScrapeJob:
+    """The bulk scrape running in this process, if any"""
+
+    def __init__(self, sites: Sequence[Site]):
+        self.sites = list(sites)
+        self.progress = ScrapeProgress(total=len(self.sites))
+        self.future: Future = submit(scrape_sites(self.sites, self.progress))
+
+    @property
+    def running(self) -> bool:
+        return not self.future.done()
+
+    def cancel(self):
+        self.future.cancel()
+
+
+current_job: Optional[ScrapeJob] = None
+
+
+def start_scrape(sites: Sequence[Site]) -> Optional[ScrapeJob]:
+    """Start a job on the shared loop; None if one is already running"""
+    global current_job
+    if current_job is not None and current_job.running:
+        return None
+    current_job = ScrapeJob(sites)
+    return current_job
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape every client and VC site")
+    parser.add_argument("--table", choices=SCRAPE_TABLES, action="append", help="default: both")
+    parser.add_argument("--concurrency", type=int, default=settings.SCRAPE_BULK_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    sites = load_sites(args.table or SCRAPE_TABLES)
+    progress = ScrapeProgress(total=len(sites))
+    asyncio.run(scrape_sites(sites, progress, args.concurrency))
+    for message in progress.errors:
+        logger.warning(message)
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""Retrieval + generation pipeline shared by the chat pages.
+
+Prompts use a stable layout so consecutive turns share a prefix that Ollama
+can keep in its KV cache: the system prompt first, then the retrieved
+documents ordered by ID, then the conversation memory and finally the
+question. When a turn retrieves the same documents as the previous one on
+the same model, the ``context`` returned by Ollama is sent back and only
+the new question is prefilled.
+"""
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import ollama
+from chromadb.config import Settings
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_nomic.embeddings import NomicEmbeddings
+
+from config import settings
+from models.scheduler import scheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from models.telemetry import track
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+INSTRUCTIONS = (
+    "Please provide an answer based only on the provided documents. "
+    "If the answer is not found in the documents, respond with 'I'm not sure'."
+)
+
+ollama_client = ollama.Client(host=settings.OLLAMA_HOST)
+
+
+def load_vector_store() -> Chroma:
+    """Open the persisted Chroma store with the Nomic embedding model"""
+    embedding = NomicEmbeddings(
+        model="nomic-embed-text-v1.5",
+        inference_mode="local"
+    )
+    chroma_settings = Settings(
+        anonymized_telemetry=False,
+        is_persistent=True,
+    )
+    return Chroma(
+        persist_directory=str(settings.CHROMA_DIR),
+        embedding_function=embedding,
+        client_settings=chroma_settings
+    )
+
+
+def retrieve(db: Chroma, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+    """Return the top-k documents with their relevance scores (0..1, higher is better)"""
+    return db.similarity_search_with_relevance_scores(query, k=k)
+
+
+def document_id(doc: Document) -> str:
+    """Stable ID of a retrieved chunk: the Chroma ID, or a hash of source and content"""
+    doc_id = getattr(doc, "id", None)
+    if doc_id:
+        return str(doc_id)
+    key = f"{doc.metadata.get('source', '')}\0{doc.page_content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def format_history(summary: str, history: Sequence[Dict[str, str]]) -> str:
+    """Render the rolling summary and recent turns as prompt context"""
+    parts = []
+    if summary:
+        parts.append("Summary of the earlier conversation:\n" + summary)
+    if history:
+        parts.append("Recent conversation:\n" + "\n".join(f"{m['role']}: {m['content']}" for m in history))
+    return "\n\n".join(parts)
+
+
+def build_prompt(
+        query: str,
+        docs: List[Document],
+        summary: str = "",
+        history: Sequence[Dict[str, str]] = (),
+) -> str:
+    """Build the prompt for a question, its retrieved documents and the chat memory.
+
+    Everything that changes from turn to turn comes last so the documents stay
+    in the shared prefix.
+    """
+    ordered = sorted(docs, key=document_id)
+    conversation = format_history(summary, history)
+    return (
+            "Relevant Documents:\n"
+            + "\n\n".join([doc.page_content for doc in ordered])
+            + ("\n\n" + conversation if conversation else "")
+            + "\n\nQuestion: " + query
+            + "\n\n" + INSTRUCTIONS
+    )
+
+
+def build_followup_prompt(query: str) -> str:
+    """Prompt for a turn that continues from the previous turn's Ollama context"""
+    return "Question: " + query + "\n\n" + INSTRUCTIONS
+
+
+@dataclass
+class PrefixState:
+    """What the previous turn of a session left in Ollama's context"""
+    model: Optional[str] = None
+    doc_ids: Tuple[str, ...] = ()
+    context: List[int] = field(default_factory=list)
+    prompt: str = ""
+
+
+@dataclass
+class TurnStats:
+    prompt_tokens: int
+    completion_tokens: int
+    prefill_seconds: float
+    reused_tokens: int
+    saved_seconds: float
+    context_reused: bool
+
+
+class PrefillRates:
+    """Per-model prefill cost (seconds per token, characters per token), measured on uncached turns"""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, tokens: int, seconds: float, chars: int):
+        if tokens <= 0 or seconds <= 0:
+            return
+        sample = (seconds / tokens, chars / tokens)
+        with self._lock:
+            previous = self._rates.get(model)
+            if previous is None:
+                self._rates[model] = sample
+            else:
+                self._rates[model] = tuple(
+                    (1 - self.alpha) * old + self.alpha * new for old, new in zip(previous, sample)
+                )
+
+    def get(self, model: str) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            return self._rates.get(model)
+
+
+prefill_rates = PrefillRates()
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def generate(
+        model_name: str,
+        prompt: str,
+        session_id: str = "background",
+        priority: int = PRIORITY_BACKGROUND,
+        kind: str = "generate",
+) -> str:
+    """Run a plain prompt through a local Ollama model"""
+    with scheduler.slot(model_name, session_id, priority), track(model_name, session_id, kind=kind) as call:
+        response = ollama_client.generate(model=model_name, prompt=prompt, keep_alive=settings.OLLAMA_KEEP_ALIVE)
+        call.prompt_tokens = response.get("prompt_eval_count") or 0
+        call.completion_tokens = response.get("eval_count") or 0
+    return response["response"]
+
+
+@dataclass
+class TurnRequest:
+    """A prepared turn: the prompt to send and whether it continues the previous context"""
+    model: str
+    prompt: str
+    context: Optional[List[int]]
+    doc_ids: Tuple[str, ...]
+
+    @property
+    def reuse(self) -> bool:
+        return self.context is not None
+
+
+def prepare_turn(
+        model_name: str,
+        query: str,
+        docs: List[Document],
+        state: PrefixState,
+        summary: str = "",
+        history: Sequence[Dict[str, str]] = (),
+) -> TurnRequest:
+    """Pick between a full prompt and a follow-up on the previous turn's context"""
+    doc_ids = tuple(sorted(document_id(doc) for doc in docs))
+    if (
+            state.model == model_name
+            and state.doc_ids == doc_ids
+            and 0 < len(state.context) <= settings.CHAT_CONTEXT_MAX_TOKENS
+    ):
+        return TurnRequest(model_name, build_followup_prompt(query), state.context, doc_ids)
+    return TurnRequest(model_name, build_prompt(query, docs, summary=summary, history=history), None, doc_ids)
+
+
+def finish_turn(request: TurnRequest, state: PrefixState, response) -> TurnStats:
+    """Measure prefill reuse from Ollama's final response and update ``state`` for the next turn"""
+    model_name = request.model
+    prompt_tokens = response.get("prompt_eval_count") or 0
+    prefill_seconds = (response.get("prompt_eval_duration") or 0) / 1e9
+
+    if request.reuse:
+        reused_tokens = len(request.context)
+    else:
+        # Ollama's prompt cache skips the prefix shared with the previous prompt;
+        # only turns without a shared prefix measure the full prefill cost
+        shared_chars = common_prefix_length(request.prompt, state.prompt) if state.model == model_name else 0
+        if shared_chars == 0:
+            prefill_rates.observe(model_name, prompt_tokens, prefill_seconds, len(request.prompt))
+        rates = prefill_rates.get(model_name)
+        reused_tokens = int(shared_chars / rates[1]) if rates and shared_chars else 0
+    rates = prefill_rates.get(model_name)
+    saved_seconds = reused_tokens * rates[0] if rates else 0.0
+
+    state.model = model_name
+    state.doc_ids = request.doc_ids
+    state.context = list(response.get("context") or [])
+    if not request.reuse:
+        state.prompt = request.prompt
+
+    stats = TurnStats(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=response.get("eval_count") or 0,
+        prefill_seconds=prefill_seconds,
+        reused_tokens=reused_tokens,
+        saved_seconds=saved_seconds,
+        context_reused=request.reuse,
+    )
+    logger.info(
+        f"{model_name}: prefilled {prompt_tokens} tokens in {prefill_seconds:.2f}s, "
+        f"reused {reused_tokens} tokens (~{saved_seconds:.2f}s saved, context reuse={request.reuse})"
+    )
+    return stats
+
+
+def generate_turn(
+        model_name: str,
+        query: str,
+        docs: List[Document],
+        state: PrefixState,
+        session_id: str,
+        summary: str = "",
+        history: Sequence[Dict[str, str]] = (),
+        priority: int = PRIORITY_INTERACTIVE,
+        client=None,
+        page: str = "",
+        telemetry: bool = True,
+) -> Tuple[str, TurnStats]:
+    """Answer one chat turn, reusing the previous turn's context when the prefix matches.
+
+    ``state`` is updated in place for the next turn. ``client`` defaults to the
+    shared Ollama client; anything with the same ``generate()`` works. With
+    ``telemetry=False`` the call is not recorded in llm_calls.
+    """
+    client = client or ollama_client
+    request = prepare_turn(model_name, query, docs, state, summary=summary, history=history)
+    with scheduler.slot(model_name, session_id, priority), \
+            track(model_name, session_id, page=page, record=telemetry) as call:
+        response = client.generate(
+            model=model_name,
+            prompt=request.prompt,
+            system=SYSTEM_PROMPT,
+            context=request.context,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
+        )
+        stats = finish_turn(request, state, response)
+        call.prompt_tokens, call.completion_tokens = stats.prompt_tokens, stats.completion_tokens
+        call.cache_hit = stats.context_reused or stats.reused_tokens > 0
+    return response["response"], stats
+
+
+def summarize(summary: str, messages: List[Dict[str, str]], session_id: str = "background") -> str:
+    """Fold evicted chat messages into the rolling summary with a small model"""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = (
+            "Update the summary of a conversation with the new messages below. "
+            "Keep names, facts and open questions; answer with the summary only, in under 150 words."
+            + ("\n\nCurrent summary:\n" + summary if summary else "")
+            + "\n\nNew messages:\n" + transcript
+    )
+    return generate(settings.CHAT_SUMMARY_MODEL, prompt, session_id=session_id, kind="summary").strip()
@@ -0,0 +1,55 @@
+"""Cohere v2 chat adapter"""
+from typing import Dict, List, Tuple
+
+from models.provider import Provider, Completion
+
+
+class CohereProvider(Provider):
+    name = "cohere"
+    base_url = "https://api.cohere.com"
+    api_key_env = "COHERE_API_KEY"
+    models = ["command-r-08-2024", "command-r-plus-08-2024"]
+
+    def build_request(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            stream: bool,
+            max_tokens: int,
+            temperature: float,
+    ) -> Tuple[str, dict]:
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": stream,
+        }
+        return "/v2/chat", payload
+
+    @staticmethod
+    def _tokens(usage: dict) -> Tuple[int, int]:
+        tokens = (usage or {}).get("tokens") or {}
+        return int(tokens.get("input_tokens", 0)), int(tokens.get("output_tokens", 0))
+
+    def parse_response(self, model: str, data: dict) -> Completion:
+        content = (data.get("message") or {}).get("content") or []
+        prompt_tokens, completion_tokens = self._tokens(data.get("usage"))
+        return Completion(
+            model=model,
+            text="".join(part.get("text", "") for part in content if part.get("type") == "text"),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            finish_reason=data.get("finish_reason"),
+            raw=data,
+        )
+
+    def parse_event(self, event: dict, completion: Completion) -> str:
+        kind = event.get("type")
+        if kind == "content-delta":
+            return event["delta"]["message"]["content"].get("text", "")
+        if kind == "message-end":
+            delta = event.get("delta") or {}
+            completion.finish_reason = delta.get("finish_reason")
+            completion.prompt_tokens, completion.completion_tokens = self._tokens(delta.get("usage"))
+        return ""
@@ -0,0 +1,134 @@
+"""Compression for scrape blobs stored in SQLite.
+
+Blobs are compressed with zstd when the optional ``zstandard`` package is
+installed and with zlib otherwise. The codec is stored next to every blob,
+so a database written with one codec stays readable after switching.
+
+``register_functions`` adds ``scrape_text(codec, data)`` to a connection,
+which lets the full-text search triggers index the page text of a
+compressed blob.
+
+``StreamCompressor`` compresses and hashes a blob chunk by chunk as it is
+streamed from the scrape service, so the uncompressed text is never held
+in memory as a whole; ``decompress_chunks`` reads it back the same way.
+"""
+import codecs
+import hashlib
+import json
+import sqlite3
+import zlib
+from typing import Iterator, List, Tuple
+
+from config import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODECS = ("zstd", "zlib") if zstandard is not None else ("zlib",)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the uncompressed text: the blob's address"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def default_codec() -> str:
+    codec = settings.SCRAPE_CODEC
+    return codec if codec in CODECS else "zlib"
+
+
+def compress(text: str, codec: str = None) -> Tuple[str, bytes]:
+    """(codec, compressed bytes) for a text"""
+    codec = codec or default_codec()
+    raw = text.encode("utf-8")
+    if codec == "zstd":
+        return codec, zstandard.ZstdCompressor(level=settings.SCRAPE_COMPRESSION_LEVEL).compress(raw)
+    if codec == "zlib":
+        return codec, zlib.compress(raw, min(settings.SCRAPE_COMPRESSION_LEVEL, 9))
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def decompress(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed; install the zstandard package to read it")
+        # A streamed frame has no content size in its header, which decompress() needs
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def decompress_chunks(codec: str, data: bytes, size: int = settings.SCRAPE_CHUNK_KB * 1024) -> Iterator[str]:
+    """decompress() a chunk of at most ``size`` bytes at a time"""
+    text = codecs.getincrementaldecoder("utf-8")()
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed; install the zstandard package to read it")
+        for raw in zstandard.ZstdDecompressor().read_to_iter(data, write_size=size):
+            yield text.decode(raw)
+    elif codec == "zlib":
+        decompressor = zlib.decompressobj()
+        raw = decompressor.decompress(data, size)
+        while raw:
+            yield text.decode(raw)
+            raw = decompressor.decompress(decompressor.unconsumed_tail, size)
+        yield text.decode(decompressor.flush())
+    else:
+        raise ValueError(f"Unknown codec {codec!r}")
+    yield text.decode(b"", final=True)
+
+
+class StreamCompressor:
+    """Compresses bytes as they arrive and keeps their SHA-256 and size"""
+
+    def __init__(self, codec: str = None):
+        self.codec = codec or default_codec()
+        if self.codec == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=settings.SCRAPE_COMPRESSION_LEVEL).compressobj()
+        elif self.codec == "zlib":
+            self._compressor = zlib.compressobj(min(settings.SCRAPE_COMPRESSION_LEVEL, 9))
+        else:
+            raise ValueError(f"Unknown codec {codec!r}")
+        self._sha256 = hashlib.sha256()
+        self._parts: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes):
+        self._sha256.update(data)
+        self.size += len(data)
+        compressed = self._compressor.compress(data)
+        if compressed:
+            self._parts.append(compressed)
+
+    def hexdigest(self) -> str:
+        """Same as content_hash of the text written so far"""
+        return self._sha256.hexdigest()
+
+    def finish(self) -> bytes:
+        """The compressed blob; nothing can be written after this"""
+        self._parts.append(self._compressor.flush())
+        return b"".join(self._parts)
+
+
+def page_text(blob: str) -> str:
+    """The page text of a scrape blob (see models/scrape_blob.py), or the blob itself"""
+    try:
+        record = json.loads(blob)
+    except ValueError:
+        return blob
+    if not isinstance(record, dict):
+        return blob
+    if "pages" in record:
+        return "\n\n".join(page.get("text") or "" for page in record["pages"])
+    return record.get("data", blob)
+
+
+def scrape_text(codec: str, data: bytes) -> str:
+    return page_text(decompress(codec, data))
+
+
+def register_functions(conn: sqlite3.Connection):
+    conn.create_function("scrape_text", 2, scrape_text, deterministic=True)
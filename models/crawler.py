@@ -0,0 +1,598 @@
+"""Polite asyncio crawler behind the in-repo scrape service.
+
+A crawl job covers one site. From its start URL the crawler follows links
+on the same host (with or without ``www.``) breadth first, up to
+``CRAWL_MAX_DEPTH`` links deep and ``CRAWL_MAX_PAGES`` pages, and keeps the
+title and main content of every HTML page, without menus, banners and
+footers (see models/extract.py; ``EXTRACT_WORKERS`` processes parse pages
+off the event loop). The URL frontier is deduplicated on the
+normalised URL (no fragment, lower-case scheme and host, no default port).
+
+Politeness:
+
+- robots.txt is read once per host (trusted for ``CRAWL_ROBOTS_TTL``) and
+  obeyed, including its Crawl-delay; while it is unreachable the host is
+  not crawled, and it is tried again after a minute; ``rel="nofollow"``
+  links are skipped
+- a host gets at most ``CRAWL_HOST_CONCURRENCY`` requests at once and
+  ``CRAWL_HOST_RATE`` per second, across all jobs; a 429 halves its rate
+- 429, 5xx and transport errors are retried with jittered exponential
+  backoff, honouring Retry-After
+
+Jobs, their frontier and the fetched pages live in SQLite (``CRAWL_DB_PATH``,
+with its own migrations). Every page is recorded as soon as it is fetched,
+so a restarted service resumes unfinished crawls from the URLs still queued.
+
+Re-crawls are incremental. Pages keep their ETag, Last-Modified and a
+fingerprint of their text between crawls; a page with validators is
+requested conditionally, and a 304 reuses the stored copy and its links.
+A crawl that changes nothing keeps the site's blob as it was, byte for
+byte. Otherwise the new blob is stored with a delta from the previous one
+(see models/scrape_blob.py), which StreamScrapingBlob sends to clients
+that hold the previous blob.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from config import settings
+from models.compression import content_hash
+from models.database import connect
+from models.extract import ExtractedPage, ExtractStats, extract
+from models.migrations import Migration, migrate
+from models.provider import RateLimiter, backoff_delay
+from models.scrape_blob import make_delta, render
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 1.0  # seconds
+BACKOFF_CAP = 60.0  # seconds
+# An unreachable robots.txt blocks its host only this long before it is read again
+ROBOTS_UNREACHABLE_TTL = BACKOFF_CAP  # seconds
+# Links to files that are never HTML are not worth a request
+SKIP_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".json", ".xml",
+    ".zip", ".gz", ".mp3", ".mp4", ".mov", ".woff", ".woff2", ".ttf", ".doc", ".docx", ".xls", ".xlsx",
+)
+
+SCHEMA = """
+CREATE TABLE crawl_jobs (
+    name TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL,  -- running, done or failed
+    error TEXT,
+    blob TEXT,  -- of the last finished crawl, kept while the next one runs
+    blob_sha256 TEXT,
+    requested_at REAL NOT NULL,
+    finished_at REAL
+);
+
+CREATE TABLE crawl_urls (
+    job TEXT NOT NULL REFERENCES crawl_jobs(name),
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',  -- queued, done, skipped or failed
+    status INTEGER,
+    title TEXT,
+    text TEXT,
+    fetched_at REAL,
+    PRIMARY KEY (job, url)
+);
+
+CREATE INDEX idx_crawl_urls_state ON crawl_urls(job, state);
+"""
+
+# Re-crawls: the validators and fingerprint of every page, and the last crawl's delta.
+# crawl_urls.state can now also be 'stale': found by the last crawl, not yet by this one.
+CONDITIONAL_RECRAWLS = """
+ALTER TABLE crawl_urls ADD COLUMN etag TEXT;
+ALTER TABLE crawl_urls ADD COLUMN last_modified TEXT;
+ALTER TABLE crawl_urls ADD COLUMN fingerprint TEXT;  -- SHA-256 of title and text
+ALTER TABLE crawl_urls ADD COLUMN links TEXT;  -- JSON, followed again when the page is not modified
+ALTER TABLE crawl_jobs ADD COLUMN base_sha256 TEXT;  -- the blob before the last change
+ALTER TABLE crawl_jobs ADD COLUMN delta TEXT;  -- from that blob to the current one
+"""
+
+MIGRATIONS = [
+    Migration(1, "crawl jobs and URL frontier", SCHEMA),
+    Migration(2, "conditional re-crawls", CONDITIONAL_RECRAWLS),
+]
+
+
+def normalize_url(href: str, base: Optional[str] = None) -> Optional[str]:
+    """Absolute http(s) URL without fragment or default port; None for anything else"""
+    try:
+        parts = urlsplit(urljoin(base, href.strip()) if base else href.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = f"[{parts.hostname}]" if ":" in parts.hostname else parts.hostname
+    if port is not None and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def site_of(url: str) -> str:
+    """The host a crawl stays on; www.example.com and example.com are one site"""
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+@dataclass
+class Fetched:
+    url: str  # after redirects
+    status: int
+    content_type: str
+    body: str
+    retry_after: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def is_html(self) -> bool:
+        return "html" in self.content_type
+
+
+@dataclass
+class CrawlJob:
+    name: str
+    url: str
+    state: str
+    error: Optional[str]
+    blob_sha256: Optional[str]
+    requested_at: float
+    finished_at: Optional[float]
+
+
+class CrawlStore:
+    """Crawl jobs and their frontier; one connection, used from the crawler's event loop"""
+
+    JOB_COLUMNS = "name, url, state, error, blob_sha256, requested_at, finished_at"
+
+    def __init__(self, path=settings.CRAWL_DB_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = connect(path)
+        migrate(self.conn, MIGRATIONS)
+
+    def job(self, name: str) -> Optional[CrawlJob]:
+        row = self.conn.execute(f"SELECT {self.JOB_COLUMNS} FROM crawl_jobs WHERE name = ?", (name,)).fetchone()
+        return CrawlJob(*row) if row else None
+
+    def jobs(self, state: Optional[str] = None) -> List[CrawlJob]:
+        sql = f"SELECT {self.JOB_COLUMNS} FROM crawl_jobs"
+        rows = self.conn.execute(sql + " WHERE state = ?", (state,)) if state else self.conn.execute(sql)
+        return [CrawlJob(*row) for row in rows]
+
+    def start_job(self, name: str, url: str):
+        """A new crawl of the site from its start URL; the last blob stays until it finishes
+
+        The pages of the last crawl become ``stale``: they keep their validators
+        for conditional requests, and the ones not found again are dropped
+        when the crawl finishes.
+        """
+        with self.conn:
+            self.conn.execute("UPDATE crawl_urls SET state = 'stale' WHERE job = ?", (name,))
+            self.conn.execute(
+                """
+                INSERT INTO crawl_jobs (name, url, state, requested_at) VALUES (?, ?, 'running', ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    url = excluded.url, state = 'running', error = NULL,
+                    requested_at = excluded.requested_at, finished_at = NULL
+                """,
+                (name, url, time.time()),
+            )
+            self.conn.execute(
+                """
+                INSERT INTO crawl_urls (job, url, depth) VALUES (?, ?, 0)
+                ON CONFLICT (job, url) DO UPDATE SET state = 'queued', depth = 0
+                """,
+                (name, url),
+            )
+
+    def enqueue(self, name: str, url: str, depth: int) -> bool:
+        """Add a URL to the frontier; False if it is known already or the site is full"""
+        with self.conn:
+            cursor = self.conn.execute(
+                """
+                INSERT INTO crawl_urls (job, url, depth)
+                SELECT ?, ?, ? WHERE (SELECT COUNT(*) FROM crawl_urls WHERE job = ? AND state != 'stale') < ?
+                ON CONFLICT (job, url) DO UPDATE SET state = 'queued', depth = excluded.depth
+                WHERE crawl_urls.state = 'stale'
+                """,
+                (name, url, depth, name, settings.CRAWL_MAX_PAGES),
+            )
+        return cursor.rowcount == 1
+
+    def queued(self, name: str) -> List[Tuple[str, int]]:
+        return self.conn.execute(
+            "SELECT url, depth FROM crawl_urls WHERE job = ? AND state = 'queued' ORDER BY rowid", (name,)
+        ).fetchall()
+
+    def record(self, name: str, url: str, state: str, status: Optional[int] = None):
+        """A URL that gave no page this time; what was known of it stays for the next crawl"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE crawl_urls SET state = ?, status = ?, fetched_at = ? WHERE job = ? AND url = ?",
+                (state, status, time.time(), name, url),
+            )
+
+    def validators(self, name: str, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """(ETag, Last-Modified) of the last copy of a page"""
+        row = self.conn.execute(
+            "SELECT etag, last_modified FROM crawl_urls WHERE job = ? AND url = ? AND fingerprint IS NOT NULL",
+            (name, url),
+        ).fetchone()
+        return row or (None, None)
+
+    def record_page(self, name: str, url: str, status: int, title: str, text: str, links: List[str],
+                    etag: Optional[str], last_modified: Optional[str]) -> bool:
+        """A fetched page; False if its title and text are those of the last copy"""
+        fingerprint = hashlib.sha256(f"{title}\n{text}".encode("utf-8")).hexdigest()
+        with self.conn:
+            old = self.conn.execute(
+                "SELECT fingerprint FROM crawl_urls WHERE job = ? AND url = ?", (name, url)
+            ).fetchone()
+            self.conn.execute(
+                """
+                UPDATE crawl_urls SET state = 'done', status = ?, title = ?, text = ?, links = ?, etag = ?,
+                    last_modified = ?, fingerprint = ?, fetched_at = ?
+                WHERE job = ? AND url = ?
+                """,
+                (status, title, text, json.dumps(links), etag, last_modified, fingerprint, time.time(), name, url),
+            )
+        return old is None or old[0] != fingerprint
+
+    def record_not_modified(self, name: str, url: str) -> List[str]:
+        """A page the site answered 304 for; the links of its last copy"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE crawl_urls SET state = 'done', status = 304, fetched_at = ? WHERE job = ? AND url = ?",
+                (time.time(), name, url),
+            )
+        row = self.conn.execute("SELECT links FROM crawl_urls WHERE job = ? AND url = ?", (name, url)).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def pages(self, name: str) -> List[Tuple[str, str, str]]:
+        """(url, title, text) of the fetched pages, in the order they were first found"""
+        return self.conn.execute(
+            "SELECT url, title, text FROM crawl_urls WHERE job = ? AND state = 'done' ORDER BY rowid", (name,)
+        ).fetchall()
+
+    def counts(self, name: str) -> Dict[str, int]:
+        return dict(self.conn.execute(
+            "SELECT state, COUNT(*) FROM crawl_urls WHERE job = ? GROUP BY state", (name,)
+        ).fetchall())
+
+    def finish(self, name: str, blob: Optional[str] = None, blob_sha256: Optional[str] = None,
+               delta: Optional[str] = None, error: Optional[str] = None):
+        """End a crawl: with a new blob (and the delta to it), the old one kept, or an error"""
+        with self.conn:
+            self.conn.execute("DELETE FROM crawl_urls WHERE job = ? AND state = 'stale'", (name,))
+            if error is not None:
+                self.conn.execute(
+                    "UPDATE crawl_jobs SET state = 'failed', error = ?, finished_at = ? WHERE name = ?",
+                    (error, time.time(), name),
+                )
+            elif blob is None:
+                self.conn.execute("UPDATE crawl_jobs SET state = 'done', finished_at = ? WHERE name = ?",
+                                  (time.time(), name))
+            else:
+                self.conn.execute(
+                    """
+                    UPDATE crawl_jobs SET state = 'done', base_sha256 = blob_sha256, delta = ?, blob = ?,
+                        blob_sha256 = ?, finished_at = ?
+                    WHERE name = ?
+                    """,
+                    (delta, blob, blob_sha256, time.time(), name),
+                )
+
+    def blob(self, name: str) -> Optional[str]:
+        row = self.conn.execute("SELECT blob FROM crawl_jobs WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def delta(self, name: str, base_sha256: str) -> Optional[str]:
+        """The delta from the blob ``base_sha256`` to the current one, if that is the blob before it"""
+        row = self.conn.execute(
+            "SELECT delta FROM crawl_jobs WHERE name = ? AND base_sha256 = ?", (name, base_sha256)
+        ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+class Host:
+    """Politeness state for one host: robots.txt, concurrency slots and rate limit"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.slots = asyncio.Semaphore(settings.CRAWL_HOST_CONCURRENCY)
+        self.limiter = RateLimiter(settings.CRAWL_HOST_RATE, burst=1)
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_expires_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def allowed(self, url: str) -> bool:
+        return self.robots.can_fetch(settings.CRAWL_USER_AGENT, url)
+
+    def slow_down(self):
+        self.limiter.rate = max(0.1, self.limiter.rate / 2)
+
+
+class Crawler:
+    """Runs crawl jobs on the current event loop; ``on_finish`` gets each finished CrawlJob"""
+
+    def __init__(self, store: CrawlStore, on_finish: Optional[Callable[[CrawlJob], None]] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.store = store
+        self.on_finish = on_finish
+        self.transport = transport
+        self.hosts: Dict[str, Host] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.metrics = Counter()
+        self.extract_stats = ExtractStats()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool binds to the loop the crawler runs on
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": settings.CRAWL_USER_AGENT},
+                timeout=httpx.Timeout(settings.CRAWL_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(max_connections=settings.CRAWL_CONCURRENCY),
+                follow_redirects=True,
+                transport=self.transport,
+            )
+            self._slots = asyncio.Semaphore(settings.CRAWL_CONCURRENCY)
+        return self._client
+
+    async def aclose(self):
+        for task in list(self.tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def running(self, name: str) -> bool:
+        return name in self.tasks
+
+    def start(self, name: str, url: str) -> bool:
+        """Crawl a site from its URL; False if it is being crawled already"""
+        if self.running(name):
+            return False
+        self.store.start_job(name, url)
+        self._spawn(name)
+        return True
+
+    def resume(self) -> int:
+        """Carry on with the crawls a previous run of the service left unfinished"""
+        jobs = [job for job in self.store.jobs("running") if not self.running(job.name)]
+        for job in jobs:
+            self._spawn(job.name)
+        if jobs:
+            logger.info(f"Resuming {len(jobs)} unfinished crawls")
+        return len(jobs)
+
+    def _spawn(self, name: str):
+        task = asyncio.create_task(self.crawl(name))
+        self.tasks[name] = task
+        task.add_done_callback(lambda _: self.tasks.pop(name, None))
+
+    async def crawl(self, name: str):
+        job = self.store.job(name)
+        start = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue()
+        for url, depth in self.store.queued(name):
+            queue.put_nowait((url, depth))
+        workers = [asyncio.create_task(self.worker(job, queue)) for _ in range(settings.CRAWL_HOST_CONCURRENCY)]
+        try:
+            await queue.join()
+        finally:
+            # Cancelled on shutdown: the job stays "running" and resumes on the next start
+            for worker in workers:
+                worker.cancel()
+        self.finish(job, time.perf_counter() - start)
+
+    async def worker(self, job: CrawlJob, queue: asyncio.Queue):
+        site = site_of(job.url)
+        while True:
+            url, depth = await queue.get()
+            try:
+                links = await self.visit(job.name, url)
+                if depth < settings.CRAWL_MAX_DEPTH:
+                    for link in links:
+                        if site_of(link) == site and self.store.enqueue(job.name, link, depth + 1):
+                            queue.put_nowait((link, depth + 1))
+            except (httpx.HTTPError, OSError, ValueError) as e:
+                self.metrics["failed"] += 1
+                self.store.record(job.name, url, "failed")
+                logger.warning(f"{url}: {type(e).__name__}: {e}")
+            except Exception:
+                # Anything else (say a broken extraction pool) fails the page, not the worker
+                self.metrics["failed"] += 1
+                self.store.record(job.name, url, "failed")
+                logger.exception(f"{url}: unexpected error")
+            finally:
+                queue.task_done()
+
+    async def visit(self, name: str, url: str) -> List[str]:
+        """Fetch one page and record it; the links to follow from it"""
+        if urlsplit(url).path.lower().endswith(SKIP_EXTENSIONS):
+            self.store.record(name, url, "skipped")
+            return []
+        host = await self.host(url)
+        if not host.allowed(url):
+            self.metrics["robots_disallowed"] += 1
+            self.store.record(name, url, "skipped")
+            return []
+        # Conditional when there is a copy: an unchanged page then costs a bodiless 304
+        etag, last_modified = self.store.validators(name, url)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        fetched = await self.fetch(host, url, headers=headers)
+        if fetched.status == 304:
+            self.metrics["not_modified"] += 1
+            return self.store.record_not_modified(name, url)
+        if fetched.status >= 400:
+            self.metrics["failed"] += 1
+            self.store.record(name, url, "failed", fetched.status)
+            return []
+        if not fetched.is_html or site_of(fetched.url) != site_of(url):
+            self.store.record(name, url, "skipped", fetched.status)
+            return []
+        final_url = normalize_url(fetched.url)
+        if final_url != url:
+            # Redirected: the target joins the frontier like a link, so it is only kept once
+            self.store.record(name, url, "skipped", fetched.status)
+            return [final_url]
+        page = await self.extract(fetched.body)
+        links = [] if page.nofollow else [
+            link for link in (normalize_url(href, fetched.url) for href in page.links) if link
+        ]
+        self.metrics["pages"] += 1
+        if not self.store.record_page(name, url, fetched.status, page.title, page.text, links,
+                                      fetched.etag, fetched.last_modified):
+            self.metrics["unchanged"] += 1
+        return links
+
+    async def extract(self, html: str) -> ExtractedPage:
+        if settings.EXTRACT_WORKERS > 1:
+            if self._pool is None:
+                # Spawned, not forked: the service's gRPC threads must not be copied mid-call
+                self._pool = ProcessPoolExecutor(
+                    settings.EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                )
+            page = await asyncio.get_running_loop().run_in_executor(self._pool, extract, html)
+        else:
+            page = extract(html)
+        self.extract_stats.add(page)
+        return page
+
+    async def host(self, url: str) -> Host:
+        """The politeness state of a URL's host, with its robots.txt read"""
+        parts = urlsplit(url)
+        host = self.hosts.setdefault(parts.netloc, Host(parts.netloc))
+        async with host.lock:
+            if host.robots is None or time.monotonic() >= host.robots_expires_at:
+                await self.read_robots(host, f"{parts.scheme}://{parts.netloc}/robots.txt")
+        return host
+
+    async def read_robots(self, host: Host, robots_url: str):
+        robots = RobotFileParser(robots_url)
+        try:
+            fetched = await self.fetch(host, robots_url, html_only=False)
+        except (httpx.HTTPError, OSError) as e:
+            fetched = None
+            logger.warning(f"{robots_url}: {type(e).__name__}: {e}")
+        ttl = settings.CRAWL_ROBOTS_TTL
+        if fetched is not None and fetched.status < 400:
+            robots.parse(fetched.body.splitlines())
+        elif fetched is not None and fetched.status < 500:
+            robots.allow_all = True  # no robots.txt
+        else:
+            # Unreachable: assume the site wants no crawling (RFC 9309), but only until the next try
+            robots.disallow_all = True
+            ttl = ROBOTS_UNREACHABLE_TTL
+        robots.modified()
+        delay = robots.crawl_delay(settings.CRAWL_USER_AGENT)
+        if delay:
+            host.limiter.rate = min(host.limiter.rate, 1 / float(delay))
+        host.robots = robots
+        host.robots_expires_at = time.monotonic() + ttl
+
+    async def fetch(self, host: Host, url: str, html_only: bool = True, headers: Optional[dict] = None) -> Fetched:
+        """GET with the host's limits, retrying throttling, server errors and transport errors"""
+        client = self.client
+        for attempt in range(settings.CRAWL_MAX_RETRIES + 1):
+            fetched = None
+            async with self._slots, host.slots:
+                await host.limiter.acquire()
+                self.metrics["requests"] += 1
+                try:
+                    fetched = await self.get(client, url, html_only, headers)
+                except httpx.TransportError as e:
+                    if attempt == settings.CRAWL_MAX_RETRIES:
+                        raise
+                    reason = type(e).__name__
+                else:
+                    if fetched.status not in RETRY_STATUSES or attempt == settings.CRAWL_MAX_RETRIES:
+                        return fetched
+                    reason = f"HTTP {fetched.status}"
+                    if fetched.status == 429:
+                        host.slow_down()
+            delay = backoff_delay(attempt, BACKOFF_BASE, BACKOFF_CAP, fetched.retry_after if fetched else None)
+            self.metrics["retries"] += 1
+            logger.info(f"{url}: {reason}, retry {attempt + 1}/{settings.CRAWL_MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def get(client: httpx.AsyncClient, url: str, html_only: bool, headers: Optional[dict] = None) -> Fetched:
+        limit = settings.CRAWL_MAX_PAGE_KB * 1024
+        async with client.stream("GET", url, headers=headers) as response:
+            content_type = response.headers.get("content-type", "").lower()
+            body = b""
+            # Only read what will be used, and never more than CRAWL_MAX_PAGE_KB of it
+            if response.status_code < 400 and ("html" in content_type or not html_only):
+                chunks, size = [], 0
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= limit:
+                        break
+                body = b"".join(chunks)[:limit]
+            return Fetched(
+                str(response.url),
+                response.status_code,
+                content_type,
+                body.decode(response.encoding or "utf-8", errors="replace"),
+                response.headers.get("retry-after"),
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+            )
+
+    def finish(self, job: CrawlJob, seconds: float):
+        pages = [{"url": url, "title": title, "text": text} for url, title, text in self.store.pages(job.name)]
+        counts = self.store.counts(job.name)
+        old = self.store.blob(job.name)
+        old_pages = {page["url"]: page for page in json.loads(old).get("pages", [])} if old else {}
+        changed = sum(old_pages.get(page["url"]) != page for page in pages) + len(old_pages.keys() - {
+            page["url"] for page in pages})
+        if not pages:
+            self.store.finish(job.name, error=f"No page of {job.url} could be fetched ({counts})")
+        elif not changed:
+            # The same blob, byte for byte: clients holding it have nothing to download
+            self.store.finish(job.name)
+        else:
+            blob = render(job.name, job.url, pages, datetime.now().isoformat())
+            self.store.finish(job.name, blob, content_hash(blob), make_delta(old, blob) if old else None)
+        logger.info(f"Crawled {job.name} in {seconds:.1f}s: {counts}, {changed} pages changed")
+        logger.info(f"Extraction so far: {self.extract_stats.summary(wall_clock=False)}")
+        if self.on_finish is not None:
+            self.on_finish(self.store.job(job.name))
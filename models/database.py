@@ -0,0 +1,150 @@
+"""Shared SQLite access for every page and background worker.
+
+Connections to the absolute ``settings.DB_PATH`` are opened once, tuned
+once (WAL journal, ``busy_timeout``, ``synchronous=NORMAL``, a larger page
+cache, memory-mapped reads) and then reused from a small pool, so a page
+no longer pays for a connect and a schema check on every query. Each
+connection keeps its own cache of prepared statements. Pending schema
+migrations are applied once per process, before the first connection is
+handed out.
+
+Usage::
+
+    with get_db_connection() as conn:
+        conn.execute("INSERT INTO products (title, description) VALUES (?, ?)", (title, description))
+
+The block commits on success and rolls back on error; the connection goes
+back to the pool instead of being closed.
+"""
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from config import settings
+from models.compression import register_functions
+from models.migrations import migrate
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT * 1000)}",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA cache_size=-{settings.DB_CACHE_KB}",
+    "PRAGMA temp_store=MEMORY",
+    f"PRAGMA mmap_size={settings.DB_MMAP_BYTES}",
+)
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def connect(db_path=None) -> sqlite3.Connection:
+    """Open a tuned connection; prefer get_db_connection() unless the connection is long-lived"""
+    conn = sqlite3.connect(
+        db_path or settings.DB_PATH,
+        timeout=settings.DB_BUSY_TIMEOUT,
+        cached_statements=settings.DB_STATEMENT_CACHE,
+        # Pooled connections move between Streamlit's script threads, one at a time
+        check_same_thread=False,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    register_functions(conn)
+    return conn
+
+
+def init_schema(conn: sqlite3.Connection):
+    """Bring the schema up to date once per process (see models/migrations.py)"""
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        version = migrate(conn)
+        _schema_ready = True
+        logger.info(f"Database schema at version {version} ({settings.DB_PATH})")
+
+
+class ConnectionPool:
+    """Hands each thread its own connection for the duration of a block"""
+
+    def __init__(self, size: int = settings.DB_POOL_SIZE, timeout: float = settings.DB_BUSY_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if not can_open:
+            # Every connection is busy: wait for one rather than opening more
+            try:
+                return self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise sqlite3.OperationalError(
+                    f"No database connection free after {self.timeout:g}s: all {self.size} are in use "
+                    f"(a get_db_connection() nested in another, or a connection never released?)"
+                ) from None
+        conn = None
+        try:
+            conn = connect()
+            init_schema(conn)
+            return conn
+        except sqlite3.Error:
+            if conn is not None:
+                conn.close()
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def release(self, conn: sqlite3.Connection, broken: bool = False):
+        if broken:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+
+pool = ConnectionPool()
+
+
+@contextmanager
+def get_db_connection():
+    """Borrow a pooled connection; commits on success, rolls back on error"""
+    conn = pool.acquire()
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except BaseException as e:
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            broken = True
+        if isinstance(e, sqlite3.Error):
+            logger.error(f"Database error: {e}")
+        raise
+    finally:
+        pool.release(conn, broken=broken)
+
+
+def fetch_one(sql: str, params=()) -> Optional[tuple]:
+    with get_db_connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def fetch_all(sql: str, params=()) -> list:
+    with get_db_connection() as conn:
+        return conn.execute(sql, params).fetchall()
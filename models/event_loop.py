@@ -0,0 +1,78 @@
+"""The background event loop shared by every Streamlit session.
+
+Chat turns (models.pipeline) and bulk scrape jobs (models.bulk_scrape) run
+on one asyncio loop in a daemon thread, so a page's script thread only
+waits on its own work and async clients keep their connection pools. This
+module imports nothing beyond the standard library, so scraping does not
+pull in the LLM stack.
+
+``shutdown()`` (also run at exit) calls the hooks registered with
+``on_shutdown`` on the loop, cancels the tasks still running and stops
+it; the next ``get_loop()`` starts a new loop, so anything bound to the
+old one should be dropped by a hook.
+"""
+import asyncio
+import atexit
+import inspect
+import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Awaitable, Callable, Coroutine, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_shutdown_hooks: List[Callable[[], Union[None, Awaitable[None]]]] = []
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Start the shared background event loop on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="chat-pipeline", daemon=True).start()
+        return _loop
+
+
+def submit(coro: Coroutine) -> Future:
+    """Schedule a coroutine on the shared loop from any thread"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def on_shutdown(hook: Callable[[], Union[None, Awaitable[None]]]):
+    """Have ``hook()`` called (and awaited, if async) on the loop when it shuts down, before its tasks are cancelled"""
+    _shutdown_hooks.append(hook)
+
+
+async def _stop():
+    for hook in _shutdown_hooks:
+        try:
+            result = hook()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.warning(f"Event loop shutdown hook {hook.__qualname__} failed: {e}")
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def shutdown(timeout: float = 5.0):
+    """Cancel everything on the shared loop and stop it; the next get_loop() starts a new one"""
+    global _loop
+    with _loop_lock:
+        loop, _loop = _loop, None
+    if loop is None or not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_stop(), loop).result(timeout)
+    except FutureTimeoutError:
+        logger.warning(f"Event loop tasks still running {timeout:g}s after being cancelled")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+atexit.register(shutdown)
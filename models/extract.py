@@ -0,0 +1,405 @@
+"""Main-content extraction from crawled HTML pages.
+
+Pages used to be flattened whole, so menus, banners and footers
+("HomeTurn-KeyAIAcadiaArchesZion...") were stored, exported to
+web_curl.yaml and embedded along with the text that matters. ``extract``
+keeps a page's title and the text of its main content, one block per
+line. It drops:
+
+- script, style, form controls and other elements without readable text
+- nav, aside, form and dialog elements, header and footer outside the
+  page's <main> or <article>, and elements whose ARIA role or class/id
+  marks them as navigation, banners, cookie notices, sharing widgets etc.
+- lists and tables made (almost) only of links: menus without a <nav>
+
+The main content is the page's <main> (or role="main"), else its first
+<article>, else the whole body. Links are collected from the whole page
+before anything is dropped, since menus are how a crawler finds pages.
+
+selectolax (the Lexbor engine, in requirements.txt) does the parsing. Without
+it the standard library's HTMLParser is used, with the same rules except
+link-list detection, which needs a tree; it closes elements whose end tag
+is optional and left out as a browser would, and never skips from a void
+element.
+
+``extract_pages`` extracts many pages in a process pool and returns
+``ExtractStats``: bytes of HTML, of flattened text and of main content,
+and pages and megabytes per second.
+
+Usage:
+    python -m models.extract saved/*.html            # report what extraction saves
+    python -m models.extract page.html --show        # print the extracted text too
+"""
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from config import settings
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+logger = logging.getLogger(__name__)
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "canvas", "object", "select", "button"}
+BOILERPLATE_TAGS = {"nav", "aside", "form", "dialog"}
+# Page banners and footers; the ones inside the main content are its own
+OUTER_BOILERPLATE_TAGS = {"header", "footer"}
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "dialog"}
+BOILERPLATE_HINTS = (
+    "cookie", "consent", "breadcrumb", "navbar", "sidebar", "skip-link", "share", "social", "newsletter", "popup",
+)
+MAIN_TAGS = {"main", "article"}
+# The page itself and its main content, whatever their class or id say
+KEEP_TAGS = {"html", "body"} | MAIN_TAGS
+# Parents of an element that wraps the whole page, like the <form id="form1"> of ASP.NET WebForms
+PAGE_TAGS = {None, "html", "body"}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption", "footer", "form",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+    "table", "td", "th", "tr", "ul",
+}
+LINK_LIST_TAGS = ("ul", "ol", "menu", "dl", "table")
+# Elements that never have an end tag
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr",
+}
+# Open element -> start tags that close it when its end tag was left out
+P_CLOSERS = {
+    "address", "article", "aside", "blockquote", "div", "dl", "fieldset", "footer", "form", "h1", "h2", "h3", "h4",
+    "h5", "h6", "header", "hr", "main", "nav", "ol", "p", "pre", "section", "table", "ul",
+}
+IMPLIED_END = {
+    "p": P_CLOSERS,
+    "li": {"li"},
+    "dt": {"dt", "dd"},
+    "dd": {"dt", "dd"},
+    "tr": {"tr"},
+    "td": {"td", "th", "tr"},
+    "th": {"td", "th", "tr"},
+    "option": {"option", "optgroup"},
+}
+MAIN_SELECTOR = "main, article, [role=main]"
+LINK_DENSITY = 0.8  # share of a list's text in links above which it is a menu
+
+
+@dataclass
+class ExtractedPage:
+    title: str
+    text: str  # main content, one block per line
+    links: List[str]  # every followable href on the page, menus included
+    nofollow: bool  # <meta name="robots" content="nofollow">
+    html_bytes: int = 0
+    flat_bytes: int = 0  # all visible text, as pages were stored before extraction
+    seconds: float = 0.0
+
+
+def is_main(tag: str, attrs: dict) -> bool:
+    return tag in MAIN_TAGS or (attrs.get("role") or "").lower() == "main"
+
+
+def hinted(attrs: dict) -> bool:
+    """A class or id token is a boilerplate hint, or starts with one: share-bar, not shared-layout or no-sidebar"""
+    tokens = f"{attrs.get('class') or ''} {attrs.get('id') or ''}".lower().split()
+    return any(token == hint or token.startswith((f"{hint}-", f"{hint}_"))
+               for token in tokens for hint in BOILERPLATE_HINTS)
+
+
+def is_boilerplate(tag: str, attrs: dict, in_main: bool, parent: Optional[str]) -> bool:
+    """Whether to drop an element; the callers keep the ones around the main content themselves"""
+    if tag in KEEP_TAGS or is_main(tag, attrs):
+        return False
+    if tag == "form" and parent in PAGE_TAGS:
+        return False
+    if tag in BOILERPLATE_TAGS or (tag in OUTER_BOILERPLATE_TAGS and not in_main):
+        return True
+    if (attrs.get("role") or "").lower() in BOILERPLATE_ROLES or attrs.get("aria-hidden") == "true":
+        return True
+    return hinted(attrs)
+
+
+def tidy(text: str) -> str:
+    """Collapse whitespace within lines and drop empty ones"""
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def followable(attrs: dict) -> bool:
+    return bool(attrs.get("href")) and "nofollow" not in (attrs.get("rel") or "").lower()
+
+
+def robots_nofollow(attrs: dict) -> bool:
+    return (attrs.get("name") or "").lower() == "robots" and "nofollow" in (attrs.get("content") or "").lower()
+
+
+def extract(html: str) -> ExtractedPage:
+    """Title, main-content text and links of an HTML page"""
+    start = time.perf_counter()
+    page = _extract_lexbor(html) if LexborHTMLParser is not None else _extract_stdlib(html)
+    page.html_bytes = len(html.encode("utf-8"))
+    page.seconds = time.perf_counter() - start
+    return page
+
+
+def _inside(node, tags) -> bool:
+    parent = node.parent
+    while parent is not None:
+        if parent.tag in tags:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _extract_lexbor(html: str) -> ExtractedPage:
+    tree = LexborHTMLParser(html)
+    title_node = tree.css_first("title") or tree.css_first("h1")
+    title = " ".join(title_node.text().split()) if title_node is not None else ""
+    nofollow = any(robots_nofollow(meta.attributes) for meta in tree.css("meta[name]"))
+    links = [a.attributes["href"] for a in tree.css("a[href]") if followable(a.attributes)]
+    body = tree.body
+    if body is None:
+        return ExtractedPage(title, "", links, nofollow)
+    tree.strip_tags(list(SKIP_TAGS))
+    flat_bytes = len(body.text(separator=" ").encode("utf-8"))
+
+    # Decomposing a node frees its descendants: only drop the outermost of nested matches
+    doomed = [
+        node for node in body.traverse()
+        if node.is_element_node and is_boilerplate(
+            node.tag, node.attributes, _inside(node, MAIN_TAGS), node.parent.tag if node.parent else None,
+        )
+    ]
+    for node in body.css(", ".join(LINK_LIST_TAGS)):
+        text = len(node.text(strip=True))
+        linked = sum(len(a.text(strip=True)) for a in node.css("a"))
+        if text and linked / text >= LINK_DENSITY:
+            doomed.append(node)
+    # Whatever its class, an element around the main content is a layout wrapper
+    doomed = [node for node in doomed if node.css_first(MAIN_SELECTOR) is None]
+    doomed_ids = {node.mem_id for node in doomed}
+    for node in doomed:
+        parent, outermost = node.parent, True
+        while parent is not None:
+            if parent.mem_id in doomed_ids:
+                outermost = False
+                break
+            parent = parent.parent
+        if outermost:
+            node.decompose()
+
+    root = tree.css_first("main, [role=main]") or tree.css_first("article") or body
+    for node in root.css(", ".join(BLOCK_TAGS)):
+        node.insert_after("\n")
+    return ExtractedPage(title, tidy(root.text(separator="")), links, nofollow, flat_bytes=flat_bytes)
+
+
+class _StdlibExtractor(HTMLParser):
+    """extract() on html.parser: boilerplate is skipped while parsing"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.h1 = ""
+        self.links: List[str] = []
+        self.nofollow = False
+        self.flat: List[str] = []
+        self.body: List[str] = []
+        self.main: List[str] = []
+        self._skip = 0
+        # Open elements, and the index in them of the boilerplate element being skipped
+        self._open: List[str] = []
+        self._boilerplate: Optional[int] = None
+        self._main_depth = 0
+        self._main_done = False
+        self._in_title = False
+        self._in_h1 = False
+
+    def _block(self):
+        self.body.append("\n")
+        if self._main_depth:
+            self.main.append("\n")
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and followable(attrs):
+            self.links.append(attrs["href"])
+        elif tag == "meta" and robots_nofollow(attrs):
+            self.nofollow = True
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "h1":
+            self._in_h1 = True
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        # A start tag can close elements whose end tag was left out, the boilerplate one included
+        while self._open and tag in IMPLIED_END.get(self._open[-1], ()):
+            self._open.pop()
+        if self._boilerplate is not None and len(self._open) <= self._boilerplate:
+            self._boilerplate = None
+        parent = self._open[-1] if self._open else None
+        # A void element has no end tag to pop it
+        if tag not in VOID_TAGS:
+            self._open.append(tag)
+        if self._boilerplate is not None:
+            if not is_main(tag, attrs):
+                return
+            # What looked like boilerplate wraps the main content: it is layout after all
+            self._boilerplate = None
+        elif tag not in VOID_TAGS and is_boilerplate(tag, attrs, self._main_depth > 0, parent):
+            self._boilerplate = len(self._open) - 1
+            return
+        if self._main_depth:
+            if tag in MAIN_TAGS:
+                self._main_depth += 1
+        elif not self._main_done and is_main(tag, attrs):
+            self._main_depth = 1
+        if tag in BLOCK_TAGS:
+            self._block()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag == "h1":
+            self._in_h1 = False
+        if tag not in self._open:
+            return
+        # Also closes the elements opened since that were left open
+        index = len(self._open) - 1 - self._open[::-1].index(tag)
+        del self._open[index:]
+        if self._boilerplate is not None:
+            if index > self._boilerplate:
+                return
+            boilerplate_end = index == self._boilerplate
+            self._boilerplate = None
+            if boilerplate_end:
+                return
+            # The end tag of an element around the boilerplate one, which it closes implicitly
+        if tag in BLOCK_TAGS:
+            self._block()
+        if self._main_depth and tag in MAIN_TAGS:
+            self._main_depth -= 1
+            self._main_done = not self._main_depth
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip:
+            return
+        self.flat.append(data)
+        if self._in_h1:
+            self.h1 += data
+        if self._boilerplate is None:
+            self.body.append(data)
+            if self._main_depth:
+                self.main.append(data)
+
+
+def _extract_stdlib(html: str) -> ExtractedPage:
+    parser = _StdlibExtractor()
+    parser.feed(html)
+    parser.close()
+    main = tidy("".join(parser.main))
+    return ExtractedPage(
+        " ".join((parser.title or parser.h1).split()),
+        main or tidy("".join(parser.body)),
+        parser.links,
+        parser.nofollow,
+        flat_bytes=len(" ".join(parser.flat).encode("utf-8")),
+    )
+
+
+@dataclass
+class ExtractStats:
+    pages: int = 0
+    html_bytes: int = 0
+    flat_bytes: int = 0
+    text_bytes: int = 0
+    cpu_seconds: float = 0.0  # spent extracting, summed over workers
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    def add(self, page: ExtractedPage):
+        self.pages += 1
+        self.html_bytes += page.html_bytes
+        self.flat_bytes += page.flat_bytes
+        self.text_bytes += len(page.text.encode("utf-8"))
+        self.cpu_seconds += page.seconds
+
+    @property
+    def saved_bytes(self) -> int:
+        """Boilerplate text no longer stored, compared to flattening whole pages"""
+        return self.flat_bytes - self.text_bytes
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self, wall_clock: bool = True) -> str:
+        """Sizes and throughput; per wall-clock second, or per CPU second spent extracting"""
+        seconds = self.seconds if wall_clock else self.cpu_seconds
+        saved = self.saved_bytes / self.flat_bytes if self.flat_bytes else 0.0
+        per_second = (f"{self.pages / seconds:.0f} pages/s, {self.html_bytes / 1e6 / seconds:.1f} MB/s"
+                      if seconds else "no time measured")
+        return (
+            f"{self.pages} pages: {self.html_bytes / 1e6:.2f} MB HTML, {self.flat_bytes / 1e6:.2f} MB flattened "
+            f"text, {self.text_bytes / 1e6:.2f} MB main content ({saved:.0%} boilerplate dropped); {per_second}"
+        )
+
+
+def _extract_item(item: Tuple[str, str]) -> Tuple[str, ExtractedPage]:
+    url, html = item
+    return url, extract(html)
+
+
+def extract_pages(pages: Iterable[Tuple[str, str]], workers: int = settings.EXTRACT_WORKERS
+                  ) -> Tuple[List[Tuple[str, ExtractedPage]], ExtractStats]:
+    """Extract (url, html) pairs in a process pool; results in input order"""
+    stats = ExtractStats()
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_extract_item, pages, chunksize=8))
+    else:
+        results = [_extract_item(item) for item in pages]
+    for _, page in results:
+        stats.add(page)
+    stats.finished = time.perf_counter()
+    return results, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the main content of saved HTML pages")
+    parser.add_argument("paths", nargs="+", type=Path, help="HTML files, or directories of them")
+    parser.add_argument("--workers", type=int, default=settings.EXTRACT_WORKERS)
+    parser.add_argument("--show", action="store_true", help="print each page's title and text")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    files = [p for path in args.paths for p in (sorted(path.rglob("*.htm*")) if path.is_dir() else [path])]
+    pages = [(str(p), p.read_text(encoding="utf-8", errors="replace")) for p in files]
+    results, stats = extract_pages(pages, args.workers)
+    if args.show:
+        for url, page in results:
+            print(f"# {page.title} ({url})\n{page.text}\n")
+    engine = "selectolax" if LexborHTMLParser is not None else "html.parser"
+    logger.info(f"{stats.summary()} with {engine}, {args.workers} workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""Fireworks AI adapter (OpenAI-compatible API)"""
+from models.openai import OpenAIProvider
+
+
+class FireworksProvider(OpenAIProvider):
+    name = "fireworks"
+    base_url = "https://api.fireworks.ai/inference/v1"
+    api_key_env = "FIREWORKS_API_KEY"
+    models = [
+        "accounts/fireworks/models/llama-v3p1-8b-instruct",
+        "accounts/fireworks/models/llama-v3p1-70b-instruct",
+    ]
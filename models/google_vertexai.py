@@ -0,0 +1,67 @@
+"""Google Vertex AI Gemini adapter.
+
+Authenticates with an OAuth access token, e.g.
+``VERTEX_ACCESS_TOKEN=$(gcloud auth print-access-token)``.
+"""
+import os
+from typing import Dict, List, Tuple
+
+from models.provider import Provider, Completion
+
+
+class VertexAIProvider(Provider):
+    name = "google_vertexai"
+    api_key_env = "VERTEX_ACCESS_TOKEN"
+    models = ["gemini-1.5-flash-002", "gemini-1.5-pro-002"]
+    project = os.getenv("VERTEX_PROJECT", "")
+    location = os.getenv("VERTEX_LOCATION", "us-central1")
+    base_url = f"https://{location}-aiplatform.googleapis.com/v1"
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key and self.project)
+
+    def build_request(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            stream: bool,
+            max_tokens: int,
+            temperature: float,
+    ) -> Tuple[str, dict]:
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        payload = {
+            "contents": [
+                {"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+                for m in messages if m["role"] != "system"
+            ],
+            "generationConfig": {"maxOutputTokens": max_tokens, "temperature": temperature},
+        }
+        if system:
+            payload["systemInstruction"] = {"parts": [{"text": system}]}
+        method = "streamGenerateContent?alt=sse" if stream else "generateContent"
+        path = f"/projects/{self.project}/locations/{self.location}/publishers/google/models/{model}:{method}"
+        return path, payload
+
+    @staticmethod
+    def _read(data: dict, completion: Completion) -> str:
+        usage = data.get("usageMetadata") or {}
+        if usage:
+            completion.prompt_tokens = usage.get("promptTokenCount", 0)
+            completion.completion_tokens = usage.get("candidatesTokenCount", 0)
+        candidates = data.get("candidates") or []
+        if not candidates:
+            return ""
+        candidate = candidates[0]
+        if candidate.get("finishReason"):
+            completion.finish_reason = candidate["finishReason"]
+        parts = (candidate.get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    def parse_response(self, model: str, data: dict) -> Completion:
+        completion = Completion(model=model, raw=data)
+        completion.text = self._read(data, completion)
+        return completion
+
+    def parse_event(self, event: dict, completion: Completion) -> str:
+        return self._read(event, completion)
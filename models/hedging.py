@@ -0,0 +1,260 @@
+"""Hedged chat turns across backends to cut tail latency.
+
+A backend is a local Ollama model (``llama3.2:1b``) or a hosted model
+prefixed with its provider (``openai/gpt-4o-mini``). The question is sent
+to the primary backend first; if it has not produced a first token after
+the configured percentile of its observed time-to-first-token, the same
+prompt goes to the secondary backend. Whichever streams first wins and the
+other attempt is cancelled, which closes its HTTP stream and frees its
+scheduler slot. A primary that fails before answering falls back to the
+secondary straight away.
+
+Time-to-first-token is recorded per backend by plain turns as well as
+hedged ones (``models.pipeline.ttft_stats``), so the hedge delay follows
+each backend's tail latency as it changes, even when hedging is rare.
+"""
+import asyncio
+import logging
+import queue
+import time
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+from models.chat import retrieve, build_prompt, TurnStats, SYSTEM_PROMPT
+from models.pipeline import get_async_client, ttft_stats, Timeline, TurnResult, END_OF_STREAM
+from models.provider import get_provider, Completion, PROVIDERS
+from models.scheduler import scheduler, PRIORITY_INTERACTIVE
+from models.telemetry import track
+
+logger = logging.getLogger(__name__)
+
+# Hedged turns and who won them, since the process started
+hedge_counts = Counter()
+
+
+def parse_backend(backend: str) -> Tuple[Optional[str], str]:
+    """Split a backend into (provider, model); the provider is None for Ollama models"""
+    provider, _, model = backend.partition("/")
+    if model and provider in PROVIDERS:
+        return provider, model
+    return None, backend
+
+
+def hedge_delay(backend: str) -> float:
+    """How long to wait for the backend's first token before hedging"""
+    observed = ttft_stats.percentile(backend, settings.HEDGE_PERCENTILE)
+    delay = settings.HEDGE_DEFAULT_DELAY if observed is None else observed
+    return max(settings.HEDGE_MIN_DELAY, delay)
+
+
+async def stream_backend(
+        backend: str,
+        prompt: str,
+        session_id: str,
+        completion: Completion,
+        page: str = "",
+) -> AsyncIterator[str]:
+    """Stream an answer from any backend, holding a scheduler slot while it runs"""
+    provider_name, model = parse_backend(backend)
+    ticket = await scheduler.acquire_async(backend, session_id, PRIORITY_INTERACTIVE)
+    stream = None
+    cancelled = False
+    try:
+        with track(backend, session_id, page=page, kind="hedge") as call:
+            if provider_name:
+                messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+                stream = get_provider(provider_name).stream(model, messages, completion=completion)
+                async for text in stream:
+                    call.first_token()
+                    yield text
+            else:
+                parts = []
+                stream = await get_async_client().generate(
+                    model=model,
+                    prompt=prompt,
+                    system=SYSTEM_PROMPT,
+                    keep_alive=settings.OLLAMA_KEEP_ALIVE,
+                    stream=True,
+                )
+                async for chunk in stream:
+                    if chunk["response"]:
+                        call.first_token()
+                        parts.append(chunk["response"])
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        completion.prompt_tokens = chunk.get("prompt_eval_count") or 0
+                        completion.completion_tokens = chunk.get("eval_count") or 0
+                completion.text = "".join(parts)
+            call.prompt_tokens, call.completion_tokens = completion.prompt_tokens, completion.completion_tokens
+    except (asyncio.CancelledError, GeneratorExit):
+        cancelled = True
+        raise
+    finally:
+        try:
+            # Closes the HTTP response, which aborts a generation still running upstream
+            if stream is not None:
+                await stream.aclose()
+        finally:
+            scheduler.release(ticket, cancelled=cancelled)
+
+
+class Attempt:
+    """One backend's try at answering, buffering its tokens until a winner is picked"""
+
+    def __init__(self, backend: str, prompt: str, session_id: str, page: str = ""):
+        self.backend = backend
+        self.prompt = prompt
+        self.session_id = session_id
+        self.page = page
+        self.completion = Completion(parse_backend(backend)[1])
+        self.chunks: asyncio.Queue = asyncio.Queue()
+        self.answered = asyncio.Event()
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            async for text in stream_backend(
+                    self.backend, self.prompt, self.session_id, self.completion, page=self.page
+            ):
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - self.started
+                    ttft_stats.observe(self.backend, self.ttft)
+                    self.answered.set()
+                self.chunks.put_nowait(text)
+        except asyncio.CancelledError:
+            if self.ttft is None:
+                # Censored: the first token would have taken at least this long. That only says
+                # something about the tail once it is past the current estimate; a shorter wait
+                # (a hedge that lost, a turn replaced by the next question) would drag it down
+                waited = time.perf_counter() - self.started
+                estimate = ttft_stats.percentile(self.backend, settings.HEDGE_PERCENTILE)
+                if estimate is not None and waited >= estimate:
+                    ttft_stats.observe(self.backend, waited)
+            raise
+        finally:
+            self.chunks.put_nowait(END_OF_STREAM)
+        # An empty answer still counts as an answer
+        self.answered.set()
+
+    @property
+    def failed(self) -> bool:
+        return self.task.done() and not self.task.cancelled() and self.task.exception() is not None
+
+    def cancel(self):
+        self.task.cancel()
+
+
+async def first_to_answer(attempts: List[Attempt], timeout: Optional[float] = None) -> Optional[Attempt]:
+    """The first attempt to stream a token; None on timeout or once every attempt failed"""
+    waiters = [asyncio.create_task(attempt.answered.wait()) for attempt in attempts]
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while True:
+            for attempt in attempts:
+                if attempt.answered.is_set():
+                    return attempt
+            if all(attempt.failed for attempt in attempts):
+                return None
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            pending = [w for w in waiters if not w.done()] + [a.task for a in attempts if not a.task.done()]
+            await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+
+async def run_hedged_turn(
+        db,
+        query: str,
+        primary: str,
+        secondary: str,
+        session_id: str,
+        summary: str = "",
+        history: Sequence[Dict[str, str]] = (),
+        tokens: Optional[queue.Queue] = None,
+        k: int = 3,
+        page: str = "",
+) -> TurnResult:
+    """Run one chat turn on ``primary``, hedging to ``secondary`` when the first token is late.
+
+    Streamed tokens are put on ``tokens`` (followed by END_OF_STREAM) when given.
+    """
+    timeline = Timeline()
+    attempts: List[Attempt] = []
+    try:
+        start = time.perf_counter()
+        scored_docs = await asyncio.to_thread(retrieve, db, query, k)
+        timeline.record("retrieval", start)
+        prompt = build_prompt(query, [doc for doc, _ in scored_docs], summary=summary, history=history)
+
+        generation_start = time.perf_counter()
+        attempts.append(Attempt(primary, prompt, session_id, page))
+        delay = hedge_delay(primary) if secondary != primary else None
+        winner = await first_to_answer(attempts, timeout=delay)
+        if winner is None and secondary != primary:
+            reason = "fallback" if attempts[0].failed else "hedged"
+            hedge_counts[reason] += 1
+            logger.info(
+                f"{primary} has no first token after {time.perf_counter() - generation_start:.2f}s "
+                f"({reason}), sending the request to {secondary} too"
+            )
+            timeline.record(f"{reason} to {secondary}", generation_start)
+            attempts.append(Attempt(secondary, prompt, session_id, page))
+            winner = await first_to_answer(attempts)
+        if winner is None:
+            # Every attempt failed: surface the primary's error
+            await attempts[0].task
+            raise RuntimeError(f"No answer from {primary}")
+
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+        if len(attempts) > 1:
+            hedge_counts["primary won" if winner is attempts[0] else "secondary won"] += 1
+        first_token = winner.started + winner.ttft if winner.ttft is not None else time.perf_counter()
+        timeline.record(f"first token ({winner.backend})", generation_start, first_token)
+
+        while True:
+            text = await winner.chunks.get()
+            if text is END_OF_STREAM:
+                break
+            if tokens is not None:
+                tokens.put(text)
+        await winner.task
+        timeline.record("generation", generation_start)
+
+        completion = winner.completion
+        stats = TurnStats(
+            prompt_tokens=completion.prompt_tokens,
+            completion_tokens=completion.completion_tokens,
+            prefill_seconds=0.0,
+            reused_tokens=0,
+            saved_seconds=0.0,
+            context_reused=False,
+        )
+        return TurnResult(winner.backend, completion.text, stats, timeline, scored_docs)
+    finally:
+        for attempt in attempts:
+            if not attempt.task.done():
+                attempt.cancel()
+        if tokens is not None:
+            tokens.put(END_OF_STREAM)
+
+
+def ttft_snapshot() -> List[dict]:
+    """Observed time-to-first-token and current hedge delay per backend"""
+    rows = []
+    for backend in ttft_stats.models():
+        rows.append({
+            "backend": backend,
+            "samples": ttft_stats.count(backend),
+            "ttft_p50": ttft_stats.percentile(backend, 0.5),
+            "ttft_p95": ttft_stats.percentile(backend, 0.95),
+            "hedge_delay": round(hedge_delay(backend), 3),
+        })
+    return rows
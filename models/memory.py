@@ -0,0 +1,130 @@
+"""Bounded per-session chat memory.
+
+Only the last N turns are kept in memory. Older messages are folded into a
+rolling summary, and every message is appended to the ``chat_transcripts``
+table so the full history can still be paged in on demand.
+
+A store created with ``background=True`` summarizes on the shared event
+loop instead of in the caller's thread (a Streamlit script run); until the
+summary catches up, ``context()`` still returns the evicted messages.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from models.database import get_db_connection
+from models.event_loop import submit
+
+logger = logging.getLogger(__name__)
+
+# summarizer(previous_summary, evicted_messages) -> new summary
+Summarizer = Callable[[str, List[Dict[str, str]]], str]
+
+
+def truncate_summary(summary: str, messages: List[Dict[str, str]], limit: int = 2000) -> str:
+    """Fallback summarizer: keep the tail of the running transcript"""
+    lines = [summary] if summary else []
+    lines += [f"{m['role']}: {m['content']}" for m in messages]
+    text = "\n".join(lines)
+    return text[-limit:]
+
+
+class ConversationStore:
+    def __init__(
+            self,
+            session_id: str,
+            max_turns: int = settings.CHAT_MEMORY_TURNS,
+            summarizer: Optional[Summarizer] = None,
+            background: bool = False,
+    ):
+        self.session_id = session_id
+        self.max_messages = max_turns * 2  # a turn is a user + assistant message
+        self.summarizer = summarizer or truncate_summary
+        self.background = background
+        self.summary = ""
+        self.recent = deque()
+        self.total = 0
+        # Evicted messages the summary does not cover yet, and the background summarization folding them in
+        self._unsummarized: List[Dict[str, str]] = []
+        self._summarizing: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def add(self, role: str, content: str):
+        """Append a message, offload it to SQLite and compact if over the limit"""
+        with get_db_connection() as conn:
+            conn.execute(
+                "INSERT INTO chat_transcripts (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (self.session_id, role, content, time.time()),
+            )
+        self.recent.append({"role": role, "content": content})
+        self.total += 1
+        if len(self.recent) > self.max_messages:
+            self._compact()
+
+    def context(self) -> Tuple[str, List[Dict[str, str]]]:
+        """(summary, history) for the next turn: the recent messages, after any the summary lacks yet"""
+        with self._lock:
+            return self.summary, self._unsummarized + list(self.recent)
+
+    def _compact(self):
+        # Evict down to half the window so summarization runs every few turns, not every turn
+        keep = max(2, self.max_messages // 2)
+        with self._lock:
+            evicted = [self.recent.popleft() for _ in range(len(self.recent) - keep)]
+            if self.background:
+                self._unsummarized += evicted
+                # Also restarts one cancelled with the loop
+                if self._summarizing is None or self._summarizing.done():
+                    self._summarizing = submit(self._summarize_pending())
+                return
+        self.summary = self._fold(self.summary, evicted)
+
+    def _fold(self, summary: str, evicted: List[Dict[str, str]]) -> str:
+        try:
+            summary = self.summarizer(summary, evicted)
+        except Exception as e:
+            logger.warning(f"Summarization failed, truncating instead: {e}")
+            summary = truncate_summary(summary, evicted)
+        logger.info(f"Compacted {len(evicted)} messages of session {self.session_id} into the summary")
+        return summary
+
+    async def _summarize_pending(self):
+        """Fold the evicted messages into the summary, a batch at a time, until none are left"""
+        while True:
+            with self._lock:
+                evicted = list(self._unsummarized)
+                if not evicted:
+                    self._summarizing = None
+                    return
+            # The summarizer is a blocking LLM call: keep it off the loop itself
+            summary = await asyncio.to_thread(self._fold, self.summary, evicted)
+            with self._lock:
+                self.summary = summary
+                del self._unsummarized[:len(evicted)]
+
+    @property
+    def older_count(self) -> int:
+        """Number of messages only available from the transcript table"""
+        return self.total - len(self.recent)
+
+    def page(self, page: int, page_size: int = settings.CHAT_HISTORY_PAGE_SIZE) -> List[Dict[str, str]]:
+        """Load one page of older messages, page 0 being the most recent ones"""
+        end = self.older_count - page * page_size
+        if end <= 0:
+            return []
+        start = max(0, end - page_size)
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                "SELECT role, content FROM chat_transcripts WHERE session_id = ? "
+                "ORDER BY id LIMIT ? OFFSET ?",
+                (self.session_id, end - start, start),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def page_count(self, page_size: int = settings.CHAT_HISTORY_PAGE_SIZE) -> int:
+        return -(-self.older_count // page_size)
@@ -0,0 +1,438 @@
+"""Numbered schema migrations for user.db.
+
+Applied migrations are recorded in ``schema_version``. Each pending
+migration runs in its own ``BEGIN IMMEDIATE`` transaction, so a failure
+leaves the database at the previous version, and two processes starting
+at once cannot apply the same migration twice.
+
+A migration is either an SQL script or a function taking the connection.
+Never edit a migration once it has shipped; add a new one instead.
+
+Usage:
+    python -m models.migrations           # apply pending migrations
+    python -m models.migrations --status  # show the current version
+    python -m models.migrations --vacuum  # migrate, then shrink the file
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, List, Union
+
+from models.compression import compress, content_hash, decompress
+from models.scrape_blob import decode
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Union[str, Callable[[sqlite3.Connection], None]]
+
+
+BASELINE = """
+CREATE TABLE IF NOT EXISTS user_info (
+    first_name TEXT,
+    last_name TEXT,
+    company_name TEXT,
+    position TEXT,
+    email TEXT,
+    address TEXT,
+    phone TEXT,
+    company_url TEXT,
+    company_description TEXT
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS service (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vcs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scraping_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_name TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_transcripts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_transcripts_session ON chat_transcripts (session_id, id);
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    page TEXT,
+    session_id TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    ttft_ms INTEGER,
+    latency_ms INTEGER,
+    cache_hit INTEGER,
+    cost REAL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_ts ON llm_calls (ts);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_model_ts ON llm_calls (model, ts);
+"""
+
+# The dashboard's old init_db() created "service"; the Services page always used "services"
+MERGE_SERVICE_TABLES = """
+INSERT INTO services (title, description)
+SELECT title, description FROM service AS s
+WHERE s.id = (SELECT MIN(id) FROM service WHERE title = s.title)
+  AND s.title NOT IN (SELECT title FROM services);
+DROP TABLE service;
+"""
+
+USER_INFO_COLUMNS = (
+    "first_name", "last_name", "company_name", "position", "email",
+    "address", "phone", "company_url", "company_description",
+)
+
+
+def add_user_info_id(conn: sqlite3.Connection):
+    """Rebuild user_info with an id and every column the pages use.
+
+    Older databases created by the Info page lack company_description, so
+    only the columns that exist are copied.
+    """
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(user_info)")}
+    columns = ", ".join(c for c in USER_INFO_COLUMNS if c in existing)
+    conn.execute(f"""
+        CREATE TABLE user_info_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {", ".join(f"{c} TEXT" for c in USER_INFO_COLUMNS)}
+        )
+    """)
+    conn.execute(f"INSERT INTO user_info_new ({columns}) SELECT {columns} FROM user_info ORDER BY rowid")
+    conn.execute("DROP TABLE user_info")
+    conn.execute("ALTER TABLE user_info_new RENAME TO user_info")
+
+
+# Titles were only kept unique by a check-then-insert; keep the first of any duplicates
+UNIQUE_TITLES_AND_LOOKUP_INDEXES = """
+DELETE FROM products WHERE id NOT IN (SELECT MIN(id) FROM products GROUP BY title);
+CREATE UNIQUE INDEX idx_products_title ON products (title);
+DELETE FROM services WHERE id NOT IN (SELECT MIN(id) FROM services GROUP BY title);
+CREATE UNIQUE INDEX idx_services_title ON services (title);
+CREATE INDEX idx_scraping_data_company ON scraping_data (company_name, id);
+"""
+
+# How company.py keys scraped pages: the URL without scheme or trailing slash
+URL_KEY = "rtrim(replace(replace({url}, 'https://', ''), 'http://', ''), '/')"
+# The page text of a scrape blob ({"Name", "url", "data", "time"})
+SCRAPED_TEXT = "CASE WHEN json_valid({data}) THEN json_extract({data}, '$.data') ELSE {data} END"
+
+
+def search_index(table: str) -> str:
+    """FTS5 index over a directory table's name, URL and latest scraped text, kept in sync by triggers"""
+    fts = f"{table}_fts"
+    url_key = URL_KEY.format(url="url")
+    latest_scrape = (
+        f"(SELECT {SCRAPED_TEXT.format(data='s.data')} FROM scraping_data AS s "
+        f"WHERE s.company_name IN ({{name}}, {URL_KEY.format(url='{url}')}) ORDER BY s.id DESC LIMIT 1)"
+    )
+    matching_rows = f"SELECT id FROM {table} WHERE name = {{key}} OR {url_key} = {{key}}"
+    return f"""
+CREATE INDEX idx_{table}_url_key ON {table} ({url_key});
+CREATE VIRTUAL TABLE {fts} USING fts5 (
+    name, url, scraped,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+INSERT INTO {fts} (rowid, name, url, scraped)
+SELECT id, name, url, {latest_scrape.format(name="t.name", url="t.url")} FROM {table} AS t;
+CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {fts} (rowid, name, url, scraped)
+    VALUES (new.id, new.name, new.url, {latest_scrape.format(name="new.name", url="new.url")});
+END;
+CREATE TRIGGER {table}_fts_update AFTER UPDATE ON {table} BEGIN
+    DELETE FROM {fts} WHERE rowid = old.id;
+    INSERT INTO {fts} (rowid, name, url, scraped)
+    VALUES (new.id, new.name, new.url, {latest_scrape.format(name="new.name", url="new.url")});
+END;
+CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN
+    DELETE FROM {fts} WHERE rowid = old.id;
+END;
+CREATE TRIGGER {table}_fts_scrape_insert AFTER INSERT ON scraping_data BEGIN
+    UPDATE {fts} SET scraped = {SCRAPED_TEXT.format(data="new.data")}
+    WHERE rowid IN ({matching_rows.format(key="new.company_name")});
+END;
+CREATE TRIGGER {table}_fts_scrape_delete AFTER DELETE ON scraping_data BEGIN
+    UPDATE {fts} SET scraped = (
+        SELECT {SCRAPED_TEXT.format(data="s.data")} FROM scraping_data AS s, {table} AS t
+        WHERE t.id = {fts}.rowid AND s.company_name IN (t.name, {URL_KEY.format(url="t.url")})
+        ORDER BY s.id DESC LIMIT 1
+    )
+    WHERE rowid IN ({matching_rows.format(key="old.company_name")});
+END;
+"""
+
+
+def blob_search_triggers(table: str) -> str:
+    """The migration 5 triggers, reading scraped text from compressed blobs"""
+    fts = f"{table}_fts"
+    url_key = URL_KEY.format(url="url")
+    latest_scrape = (
+        "(SELECT scrape_text(b.codec, b.data) FROM scraping_data AS s "
+        "JOIN scrape_blobs AS b ON b.hash = s.blob_hash "
+        f"WHERE s.company_name IN ({{name}}, {URL_KEY.format(url='{url}')}) ORDER BY s.id DESC LIMIT 1)"
+    )
+    matching_rows = f"SELECT id FROM {table} WHERE name = {{key}} OR {url_key} = {{key}}"
+    return f"""
+CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {fts} (rowid, name, url, scraped)
+    VALUES (new.id, new.name, new.url, {latest_scrape.format(name="new.name", url="new.url")});
+END;
+CREATE TRIGGER {table}_fts_update AFTER UPDATE ON {table} BEGIN
+    DELETE FROM {fts} WHERE rowid = old.id;
+    INSERT INTO {fts} (rowid, name, url, scraped)
+    VALUES (new.id, new.name, new.url, {latest_scrape.format(name="new.name", url="new.url")});
+END;
+CREATE TRIGGER {table}_fts_scrape_insert AFTER INSERT ON scraping_data BEGIN
+    UPDATE {fts} SET scraped = (SELECT scrape_text(codec, data) FROM scrape_blobs WHERE hash = new.blob_hash)
+    WHERE rowid IN ({matching_rows.format(key="new.company_name")});
+END;
+CREATE TRIGGER {table}_fts_scrape_delete AFTER DELETE ON scraping_data BEGIN
+    UPDATE {fts} SET scraped = (
+        SELECT scrape_text(b.codec, b.data) FROM scraping_data AS s
+        JOIN scrape_blobs AS b ON b.hash = s.blob_hash
+        JOIN {table} AS t ON s.company_name IN (t.name, {URL_KEY.format(url="t.url")})
+        WHERE t.id = {fts}.rowid
+        ORDER BY s.id DESC LIMIT 1
+    )
+    WHERE rowid IN ({matching_rows.format(key="old.company_name")});
+END;
+"""
+
+
+def scrape_time(blob: str, default: float) -> float:
+    """The UNIX time recorded in a scrape blob, if it has one"""
+    try:
+        return datetime.fromisoformat(json.loads(blob)["time"]).timestamp()
+    except (ValueError, KeyError, TypeError):
+        return default
+
+
+def store_scrapes_as_blobs(conn: sqlite3.Connection):
+    """Move scrape blobs into a compressed table addressed by content hash.
+
+    scraping_data keeps one row per scrape, pointing at its blob. The search
+    triggers read scraping_data.data, so they are replaced by ones that
+    decompress the blob instead.
+    """
+    for table in ("clients", "vcs"):
+        for trigger in ("insert", "update", "scrape_insert", "scrape_delete"):
+            conn.execute(f"DROP TRIGGER {table}_fts_{trigger}")
+    conn.execute("""
+        CREATE TABLE scrape_blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE scraping_data_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_name TEXT NOT NULL,
+            blob_hash TEXT NOT NULL REFERENCES scrape_blobs (hash),
+            scraped_at REAL NOT NULL
+        )
+    """)
+    now = time.time()
+    for row_id, company_name, blob in conn.execute("SELECT id, company_name, data FROM scraping_data ORDER BY id").fetchall():
+        digest = content_hash(blob)
+        if conn.execute("SELECT 1 FROM scrape_blobs WHERE hash = ?", (digest,)).fetchone() is None:
+            codec, data = compress(blob)
+            conn.execute(
+                "INSERT INTO scrape_blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                (digest, codec, len(blob.encode("utf-8")), data),
+            )
+        conn.execute(
+            "INSERT INTO scraping_data_new (id, company_name, blob_hash, scraped_at) VALUES (?, ?, ?, ?)",
+            (row_id, company_name, digest, scrape_time(blob, now)),
+        )
+    conn.execute("DROP TABLE scraping_data")
+    conn.execute("ALTER TABLE scraping_data_new RENAME TO scraping_data")
+    conn.execute("CREATE INDEX idx_scraping_data_company ON scraping_data (company_name, id)")
+    conn.execute("CREATE INDEX idx_scraping_data_blob ON scraping_data (blob_hash)")
+    for table in ("clients", "vcs"):
+        for statement in statements(blob_search_triggers(table)):
+            conn.execute(statement)
+
+
+SCRAPE_PAGES = """
+ALTER TABLE scrape_blobs ADD COLUMN site_name TEXT;
+ALTER TABLE scrape_blobs ADD COLUMN site_url TEXT;
+ALTER TABLE scrape_blobs ADD COLUMN site_time TEXT;
+ALTER TABLE scrape_blobs ADD COLUMN page_count INTEGER;
+
+CREATE TABLE scrape_pages (
+    blob_hash TEXT NOT NULL REFERENCES scrape_blobs (hash),
+    position INTEGER NOT NULL,
+    url TEXT,
+    title TEXT,
+    text TEXT NOT NULL,
+    PRIMARY KEY (blob_hash, position)
+);
+
+CREATE INDEX idx_scrape_blobs_site_url ON scrape_blobs (site_url);
+CREATE INDEX idx_scrape_pages_url ON scrape_pages (url);
+"""
+
+
+def store_scrape_pages(conn: sqlite3.Connection):
+    """Decode every stored blob into its site columns and one scrape_pages row per page.
+
+    Blobs are compressed, so SQLite's JSON functions cannot read them; they
+    are decoded once here, and once on ingest from now on.
+    """
+    for statement in statements(SCRAPE_PAGES):
+        conn.execute(statement)
+    for (digest,) in conn.execute("SELECT hash FROM scrape_blobs").fetchall():
+        codec, data = conn.execute("SELECT codec, data FROM scrape_blobs WHERE hash = ?", (digest,)).fetchone()
+        record = decode(decompress(codec, data))
+        conn.execute(
+            "UPDATE scrape_blobs SET site_name = ?, site_url = ?, site_time = ?, page_count = ? WHERE hash = ?",
+            (record.name, record.url, record.time, len(record.pages), digest),
+        )
+        conn.executemany(
+            "INSERT INTO scrape_pages (blob_hash, position, url, title, text) VALUES (?, ?, ?, ?, ?)",
+            [(digest, position, page.url, page.title, page.text) for position, page in enumerate(record.pages)],
+        )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", BASELINE),
+    Migration(2, "merge service into services", MERGE_SERVICE_TABLES),
+    Migration(3, "user_info id column", add_user_info_id),
+    Migration(4, "unique titles and lookup indexes", UNIQUE_TITLES_AND_LOOKUP_INDEXES),
+    Migration(5, "full-text search over clients and vcs", search_index("clients") + search_index("vcs")),
+    Migration(6, "content-addressed compressed scrape blobs", store_scrapes_as_blobs),
+    Migration(7, "decoded scrape pages", store_scrape_pages),
+]
+
+
+def statements(script: str) -> Iterator[str]:
+    """Split an SQL script into complete statements (trigger bodies stay whole)"""
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                yield buffer.strip()
+            buffer = ""
+    if buffer.strip():
+        raise ValueError(f"Incomplete SQL statement: {buffer.strip()[:80]}")
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection, migrations: List[Migration] = MIGRATIONS) -> int:
+    """Apply pending migrations in order and return the resulting version"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
+
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= current_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have applied it while we waited for the lock
+            if migration.version <= current_version(conn):
+                conn.rollback()
+                continue
+            if callable(migration.apply):
+                migration.apply(conn)
+            else:
+                for statement in statements(migration.apply):
+                    conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, time.time()),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {migration.version} ({migration.name}) failed")
+            raise
+        logger.info(f"Applied migration {migration.version}: {migration.name}")
+    return current_version(conn)
+
+
+def main(argv=None):
+    from config import settings
+    from models.database import connect
+
+    parser = argparse.ArgumentParser(description="Apply user.db schema migrations")
+    parser.add_argument("--db", default=settings.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--status", action="store_true", help="only show the applied migrations")
+    parser.add_argument("--vacuum", action="store_true", help="reclaim free pages after migrating")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    conn = connect(args.db)
+    try:
+        if not args.status:
+            migrate(conn)
+        if args.vacuum:
+            conn.execute("VACUUM")
+        rows = conn.execute("SELECT version, name, applied_at FROM schema_version ORDER BY version").fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Database error: {e}")
+        return 1
+    finally:
+        conn.close()
+    for version, name, applied_at in rows:
+        print(f"{version:>4}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(applied_at))}  {name}")
+    pending = [m for m in MIGRATIONS if m.version > (rows[-1][0] if rows else 0)]
+    print(f"{len(pending)} pending" if pending else "up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
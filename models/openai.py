@@ -0,0 +1,55 @@
+"""OpenAI chat completions adapter; also the base of OpenAI-compatible providers"""
+from typing import Dict, List, Tuple
+
+from models.provider import Provider, Completion
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+    base_url = "https://api.openai.com/v1"
+    api_key_env = "OPENAI_API_KEY"
+    models = ["gpt-4o-mini", "gpt-4o", "gpt-4.1-mini"]
+    path = "/chat/completions"
+
+    def build_request(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            stream: bool,
+            max_tokens: int,
+            temperature: float,
+    ) -> Tuple[str, dict]:
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        return self.path, payload
+
+    def parse_response(self, model: str, data: dict) -> Completion:
+        choice = data["choices"][0]
+        usage = data.get("usage") or {}
+        return Completion(
+            model=data.get("model", model),
+            text=choice["message"].get("content") or "",
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            finish_reason=choice.get("finish_reason"),
+            raw=data,
+        )
+
+    def parse_event(self, event: dict, completion: Completion) -> str:
+        usage = event.get("usage")
+        if usage:
+            completion.prompt_tokens = usage.get("prompt_tokens", 0)
+            completion.completion_tokens = usage.get("completion_tokens", 0)
+        if not event.get("choices"):
+            return ""
+        choice = event["choices"][0]
+        if choice.get("finish_reason"):
+            completion.finish_reason = choice["finish_reason"]
+        return (choice.get("delta") or {}).get("content") or ""
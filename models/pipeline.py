@@ -0,0 +1,338 @@
+"""Asyncio chat pipeline that overlaps the independent stages of a turn.
+
+The model warm-up (a keep-alive ping that loads the model into memory) runs
+concurrently with query embedding and vector search; the prompt is built
+as soon as the documents are back and generation starts streaming right
+away. Every stage is recorded in a per-turn timeline.
+
+All turns run on one background event loop shared by every Streamlit
+session, so a session's script thread only waits on its own turn and the
+shared ``ollama.AsyncClient`` keeps its connection pool across turns.
+
+A session has at most one turn in flight: starting a new turn, or calling
+``cancel_turn`` when the page run is interrupted, cancels the previous one.
+Cancelling closes the streaming HTTP response, which makes Ollama stop
+generating, and gives the scheduler slot back. Warm-ups are tracked and
+cancelled when the shared loop shuts down, along with the client bound
+to it.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Coroutine, Dict, List, Optional, Sequence, Set, Tuple
+
+import ollama
+from langchain_core.documents import Document
+
+from config import settings
+from models.chat import retrieve, prepare_turn, finish_turn, build_prompt, PrefixState, TurnStats, SYSTEM_PROMPT
+from models.event_loop import on_shutdown, submit
+from models.provider import get_provider, Completion
+from models.router import router, RoutingDecision, LatencyStats
+from models.scheduler import scheduler, PRIORITY_INTERACTIVE
+from models.telemetry import track
+
+logger = logging.getLogger(__name__)
+
+# Sentinel put on a token queue once generation is over
+END_OF_STREAM = None
+
+_async_client: Optional[ollama.AsyncClient] = None
+_warm_until: Dict[str, float] = {}
+# Warm-ups in flight on the shared loop, cancelled when it shuts down
+_warm_tasks: Set[asyncio.Task] = set()
+_active_turns: Dict[str, Future] = {}
+_active_lock = threading.Lock()
+# Turns started, completed, failed and cancelled since the process started
+turn_counts = Counter()
+# Time-to-first-token per backend (model, or provider/model), queueing included; sets the hedge delay
+ttft_stats = LatencyStats(window=100, min_samples=5)
+
+
+def start_turn(session_id: str, coro: Coroutine) -> Future:
+    """Submit a session's turn, cancelling the one it still has in flight"""
+    cancel_turn(session_id)
+    future = submit(coro)
+    with _active_lock:
+        _active_turns[session_id] = future
+    turn_counts["started"] += 1
+
+    def forget(done: Future):
+        with _active_lock:
+            if _active_turns.get(session_id) is done:
+                del _active_turns[session_id]
+        if done.cancelled():
+            turn_counts["cancelled"] += 1
+        elif done.exception() is not None:
+            turn_counts["failed"] += 1
+        else:
+            turn_counts["completed"] += 1
+
+    future.add_done_callback(forget)
+    return future
+
+
+def cancel_turn(session_id: str) -> bool:
+    """Abort a session's in-flight turn, if any"""
+    with _active_lock:
+        future = _active_turns.pop(session_id, None)
+    if future is None or future.done():
+        return False
+    logger.info(f"Cancelling in-flight turn of session {session_id}")
+    return future.cancel()
+
+
+def get_async_client() -> ollama.AsyncClient:
+    # Created lazily so it binds to the pipeline loop
+    global _async_client
+    if _async_client is None:
+        _async_client = ollama.AsyncClient(host=settings.OLLAMA_HOST)
+    return _async_client
+
+
+def _shutdown():
+    """Cancel the warm-ups in flight and drop the client bound to the loop going away"""
+    global _async_client
+    for task in list(_warm_tasks):
+        task.cancel()
+    _warm_tasks.clear()
+    _async_client = None
+
+
+on_shutdown(_shutdown)
+
+
+@dataclass
+class Stage:
+    name: str
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class Timeline:
+    origin: float = field(default_factory=time.perf_counter)
+    stages: List[Stage] = field(default_factory=list)
+
+    def record(self, name: str, start: float, end: Optional[float] = None):
+        end = time.perf_counter() if end is None else end
+        self.stages.append(Stage(name, start - self.origin, end - self.origin))
+
+    def as_rows(self) -> List[dict]:
+        return [
+            {"stage": s.name, "start (s)": round(s.start, 3), "end (s)": round(s.end, 3),
+             "duration (s)": round(s.duration, 3)}
+            for s in self.stages
+        ]
+
+
+@dataclass
+class TurnResult:
+    model: str
+    answer: str
+    stats: TurnStats
+    timeline: Timeline
+    scored_docs: List[Tuple[Document, float]]
+    decision: Optional[RoutingDecision] = None
+
+
+async def warm_up(model: str, timeline: Timeline):
+    """Load the model (or extend its keep-alive) unless it was pinged recently"""
+    start = time.perf_counter()
+    if _warm_until.get(model, 0.0) > time.monotonic():
+        return
+    try:
+        await get_async_client().generate(model=model, prompt="", keep_alive=settings.OLLAMA_KEEP_ALIVE)
+        _warm_until[model] = time.monotonic() + settings.PIPELINE_WARM_INTERVAL
+    except Exception as e:
+        logger.warning(f"Warm-up of {model} failed: {e}")
+    timeline.record(f"warm-up {model}", start)
+
+
+def start_warm_up(model: str, timeline: Timeline) -> asyncio.Task:
+    """warm_up() as a task on the running loop, tracked until it finishes"""
+    task = asyncio.create_task(warm_up(model, timeline))
+    _warm_tasks.add(task)
+    task.add_done_callback(_warm_tasks.discard)
+    return task
+
+
+async def run_turn(
+        db,
+        query: str,
+        model: Optional[str],
+        state: PrefixState,
+        session_id: str,
+        summary: str = "",
+        history: Sequence[Dict[str, str]] = (),
+        tokens: Optional[queue.Queue] = None,
+        k: int = 3,
+        page: str = "",
+) -> TurnResult:
+    """Run one chat turn; with model=None the question is routed after retrieval.
+
+    Streamed tokens are put on ``tokens`` (followed by END_OF_STREAM) when given.
+    """
+    timeline = Timeline()
+    try:
+        # Warm the fixed model, or the router's best guess, while retrieval runs
+        warm_model = model or router.preview(query)
+        warm_tasks = [start_warm_up(warm_model, timeline)]
+
+        start = time.perf_counter()
+        scored_docs = await asyncio.to_thread(retrieve, db, query, k)
+        timeline.record("retrieval", start)
+
+        decision = None
+        if model is None:
+            decision = router.route(query, [score for _, score in scored_docs])
+        model_name = decision.model if decision else model
+        if model_name != warm_model:
+            warm_tasks.append(start_warm_up(model_name, timeline))
+
+        start = time.perf_counter()
+        docs = [doc for doc, _ in scored_docs]
+        request = prepare_turn(model_name, query, docs, state, summary=summary, history=history)
+        timeline.record("prompt", start)
+
+        queue_start = time.perf_counter()
+        ticket = await scheduler.acquire_async(model_name, session_id, PRIORITY_INTERACTIVE)
+        timeline.record("queue", queue_start)
+        stream = None
+        cancelled = False
+        try:
+            with track(model_name, session_id, page=page) as call:
+                generation_start = time.perf_counter()
+                first_token = None
+                parts = []
+                final = None
+                stream = await get_async_client().generate(
+                    model=model_name,
+                    prompt=request.prompt,
+                    system=SYSTEM_PROMPT,
+                    context=request.context,
+                    keep_alive=settings.OLLAMA_KEEP_ALIVE,
+                    stream=True,
+                )
+                async for chunk in stream:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        call.first_token()
+                        timeline.record("first token", generation_start, first_token)
+                        ttft_stats.observe(model_name, first_token - queue_start)
+                    parts.append(chunk["response"])
+                    if tokens is not None and chunk["response"]:
+                        tokens.put(chunk["response"])
+                    if chunk.get("done"):
+                        final = chunk
+                latency = time.perf_counter() - generation_start
+                timeline.record("generation", generation_start)
+
+                stats = finish_turn(request, state, final or {})
+                call.prompt_tokens, call.completion_tokens = stats.prompt_tokens, stats.completion_tokens
+                call.cache_hit = stats.context_reused or stats.reused_tokens > 0
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            try:
+                # Closes the HTTP response, which aborts a generation still running upstream
+                if stream is not None:
+                    await stream.aclose()
+            finally:
+                scheduler.release(ticket, cancelled=cancelled)
+
+        # The warm-up normally finished long ago; don't leave it dangling
+        await asyncio.gather(*warm_tasks)
+        if decision:
+            router.observe(decision, latency)
+        else:
+            router.stats.observe(model_name, latency)
+        return TurnResult(model_name, "".join(parts), stats, timeline, scored_docs, decision)
+    finally:
+        if tokens is not None:
+            tokens.put(END_OF_STREAM)
+
+
+async def run_provider_turn(
+        db,
+        query: str,
+        provider_name: str,
+        model: str,
+        session_id: str,
+        summary: str = "",
+        history: Sequence[Dict[str, str]] = (),
+        tokens: Optional[queue.Queue] = None,
+        k: int = 3,
+        page: str = "",
+) -> TurnResult:
+    """Run one chat turn against a hosted provider from models.provider.
+
+    Streamed tokens are put on ``tokens`` (followed by END_OF_STREAM) when given.
+    """
+    timeline = Timeline()
+    try:
+        provider = get_provider(provider_name)
+
+        start = time.perf_counter()
+        scored_docs = await asyncio.to_thread(retrieve, db, query, k)
+        timeline.record("retrieval", start)
+
+        start = time.perf_counter()
+        prompt = build_prompt(query, [doc for doc, _ in scored_docs], summary=summary, history=history)
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+        timeline.record("prompt", start)
+
+        # Hosted models share the scheduler's fairness across sessions
+        scheduler_key = f"{provider_name}/{model}"
+        queue_start = time.perf_counter()
+        ticket = await scheduler.acquire_async(scheduler_key, session_id, PRIORITY_INTERACTIVE)
+        timeline.record("queue", queue_start)
+        completion = Completion(model)
+        stream = provider.stream(model, messages, completion=completion)
+        cancelled = False
+        try:
+            with track(scheduler_key, session_id, page=page) as call:
+                generation_start = time.perf_counter()
+                first_token = None
+                async for text in stream:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        call.first_token()
+                        timeline.record("first token", generation_start, first_token)
+                        ttft_stats.observe(scheduler_key, first_token - queue_start)
+                    if tokens is not None:
+                        tokens.put(text)
+                timeline.record("generation", generation_start)
+                call.prompt_tokens, call.completion_tokens = completion.prompt_tokens, completion.completion_tokens
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            try:
+                # Closes the HTTP response
+                await stream.aclose()
+            finally:
+                scheduler.release(ticket, cancelled=cancelled)
+
+        stats = TurnStats(
+            prompt_tokens=completion.prompt_tokens,
+            completion_tokens=completion.completion_tokens,
+            prefill_seconds=0.0,
+            reused_tokens=0,
+            saved_seconds=0.0,
+            context_reused=False,
+        )
+        return TurnResult(scheduler_key, completion.text, stats, timeline, scored_docs)
+    finally:
+        if tokens is not None:
+            tokens.put(END_OF_STREAM)
@@ -0,0 +1,322 @@
+"""Common interface for hosted LLM providers.
+
+Every provider shares one pooled ``httpx.AsyncClient`` (keep-alive
+connections, HTTP/1.1), a concurrency limit and a token-bucket rate limit.
+Requests that fail with a transport error or a retryable status (429, 5xx)
+are retried with full-jitter exponential backoff, honouring ``Retry-After``.
+Streaming responses are read as server-sent events.
+
+An adapter only describes the wire format: the request path and body for a
+list of chat messages, and how to read text and token usage out of a
+response or a stream event. Base URLs, keys and limits come from the
+environment (``<NAME>_BASE_URL``, ``<NAME>_API_KEY``, ``<NAME>_MAX_CONCURRENCY``,
+``<NAME>_RATE_LIMIT``), so a provider can be pointed at a local mock server.
+
+A provider instance belongs to one event loop; the process-wide instances
+returned by ``get_provider`` are used from the chat pipeline loop.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass, field, fields
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: timeouts, conflicts, throttling and server errors
+RETRY_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Provider name -> adapter class, imported on first use
+PROVIDERS = {
+    "openai": "models.openai.OpenAIProvider",
+    "azure_openai": "models.AzureOpenAI.AzureOpenAIProvider",
+    "anthropic": "models.anthropic.AnthropicProvider",
+    "cohere": "models.cohere.CohereProvider",
+    "fireworks": "models.fireworks.FireworksProvider",
+    "together": "models.together.TogetherProvider",
+    "google_vertexai": "models.google_vertexai.VertexAIProvider",
+    "aws": "models.aws.BedrockProvider",
+    "ai21": "models.ai21.AI21Provider",
+}
+
+
+class ProviderError(Exception):
+    """Raised when a provider request fails for good"""
+
+    def __init__(self, provider: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{provider}: {message}" if status is None else f"{provider}: HTTP {status}: {message}")
+        self.provider = provider
+        self.status = status
+
+
+@dataclass
+class Completion:
+    model: str
+    text: str = ""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    finish_reason: Optional[str] = None
+    raw: dict = field(default_factory=dict, repr=False)
+
+
+class RateLimiter:
+    """Async token bucket allowing ``rate`` requests per second, bursting up to ``burst``"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> float:
+        """Wait for a token and return the seconds spent waiting"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            # No await between refilling and taking a token, so the loop needs no lock
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = (1 - self.tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff, but never sooner than the server's Retry-After"""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, min(cap, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date form, fall back to the jittered delay
+    return delay
+
+
+async def sse_events(response: httpx.Response) -> AsyncIterator[dict]:
+    """Decode the JSON payloads of a server-sent event stream"""
+    data = []
+    async for line in response.aiter_lines():
+        if line.startswith("data:"):
+            data.append(line[5:].strip())
+        elif not line and data:
+            payload = "\n".join(data)
+            data = []
+            if payload == "[DONE]":
+                return
+            yield json.loads(payload)
+    if data and data != ["[DONE]"]:
+        yield json.loads("\n".join(data))
+
+
+class Provider(ABC):
+    """Base class of the hosted LLM adapters"""
+
+    name = ""
+    base_url = ""
+    api_key_env = ""
+    models: List[str] = []
+    supports_streaming = True
+
+    def __init__(
+            self,
+            base_url: Optional[str] = None,
+            api_key: Optional[str] = None,
+            max_concurrency: Optional[int] = None,
+            rate_limit: Optional[float] = None,
+            max_retries: int = settings.PROVIDER_MAX_RETRIES,
+            timeout: float = settings.PROVIDER_TIMEOUT,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        prefix = self.name.upper()
+        self.base_url = base_url or os.getenv(f"{prefix}_BASE_URL") or self.base_url
+        self.api_key = api_key or os.getenv(self.api_key_env or f"{prefix}_API_KEY", "")
+        self.max_concurrency = max_concurrency or int(
+            os.getenv(f"{prefix}_MAX_CONCURRENCY", settings.PROVIDER_MAX_CONCURRENCY)
+        )
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.transport = transport
+        self.limiter = RateLimiter(
+            rate_limit if rate_limit is not None
+            else float(os.getenv(f"{prefix}_RATE_LIMIT", settings.PROVIDER_RATE_LIMIT))
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.metrics = Counter()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool binds to the loop the provider runs on
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # Adapter hooks
+
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    @abstractmethod
+    def build_request(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            stream: bool,
+            max_tokens: int,
+            temperature: float,
+    ) -> Tuple[str, dict]:
+        """Path (relative to base_url) and JSON body of a chat request"""
+
+    @abstractmethod
+    def parse_response(self, model: str, data: dict) -> Completion:
+        """The completion in a non-streamed response body"""
+
+    @abstractmethod
+    def parse_event(self, event: dict, completion: Completion) -> str:
+        """Text delta of a stream event; usage and finish reason are set on ``completion``"""
+
+    # Transport
+
+    async def _send(self, path: str, payload: dict, stream: bool = False) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            waited = await self.limiter.acquire()
+            if waited:
+                self.metrics["throttled_seconds"] += waited
+            self.metrics["requests"] += 1
+            retry_after = None
+            try:
+                request = self.client.build_request("POST", path, json=payload, headers=self.headers())
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    self.metrics["errors"] += 1
+                    raise ProviderError(self.name, str(e) or type(e).__name__) from e
+                reason = type(e).__name__
+            else:
+                if response.status_code < 400:
+                    return response
+                if stream:
+                    await response.aread()
+                    await response.aclose()
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    self.metrics["errors"] += 1
+                    raise ProviderError(self.name, response.text[:500], response.status_code)
+                reason = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("retry-after")
+
+            delay = backoff_delay(attempt, settings.PROVIDER_BACKOFF_BASE, settings.PROVIDER_BACKOFF_CAP, retry_after)
+            self.metrics["retries"] += 1
+            logger.warning(f"{self.name} {path}: {reason}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def complete(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            max_tokens: int = 1024,
+            temperature: float = 0.2,
+    ) -> Completion:
+        """Send a chat request and return the whole answer"""
+        path, payload = self.build_request(model, messages, False, max_tokens, temperature)
+        async with self.semaphore:
+            response = await self._send(path, payload)
+            data = response.json()
+        return self.parse_response(model, data)
+
+    async def stream(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            max_tokens: int = 1024,
+            temperature: float = 0.2,
+            completion: Optional[Completion] = None,
+    ) -> AsyncIterator[str]:
+        """Yield the answer as it streams in; ``completion`` collects the text and usage.
+
+        Retries only happen before the first byte. Closing the iterator (or
+        cancelling the task consuming it) closes the HTTP response.
+        """
+        completion = completion if completion is not None else Completion(model)
+        if not self.supports_streaming:
+            result = await self.complete(model, messages, max_tokens, temperature)
+            for f in fields(Completion):
+                setattr(completion, f.name, getattr(result, f.name))
+            yield result.text
+            return
+
+        path, payload = self.build_request(model, messages, True, max_tokens, temperature)
+        async with self.semaphore:
+            response = await self._send(path, payload, stream=True)
+            parts = []
+            try:
+                async for event in sse_events(response):
+                    text = self.parse_event(event, completion)
+                    if text:
+                        parts.append(text)
+                        yield text
+            finally:
+                await response.aclose()
+                completion.text = "".join(parts)
+
+    def snapshot(self) -> dict:
+        return {
+            "configured": self.configured,
+            "base_url": self.base_url,
+            "max_concurrency": self.max_concurrency,
+            "rate_limit": self.limiter.rate,
+            **{key: round(value, 2) for key, value in self.metrics.items()},
+        }
+
+
+_instances: Dict[str, Provider] = {}
+_instances_lock = threading.Lock()
+
+
+def get_provider(name: str) -> Provider:
+    """Process-wide provider instance, created on first use"""
+    with _instances_lock:
+        if name not in _instances:
+            if name not in PROVIDERS:
+                raise ValueError(f"Unknown provider {name!r}, expected one of {', '.join(PROVIDERS)}")
+            module_name, class_name = PROVIDERS[name].rsplit(".", 1)
+            _instances[name] = getattr(importlib.import_module(module_name), class_name)()
+        return _instances[name]
+
+
+def provider_snapshots() -> Dict[str, dict]:
+    """Metrics of the providers used so far"""
+    with _instances_lock:
+        return {name: provider.snapshot() for name, provider in _instances.items()}
@@ -0,0 +1,130 @@
+"""Process-wide read-through cache for the pages' SELECTs.
+
+Streamlit reruns a page on every interaction, so the CRUD pages would read
+the same tables again and again. Reads go through ``cached_fetch_all`` /
+``cached_fetch_one`` with the tables they depend on; the result is cached
+under the query, its parameters and the current version of each table.
+Write functions call ``invalidate(table)`` after their transaction commits,
+which bumps the table's version so later reads miss and refetch. Old
+entries are never served again and age out of the LRU.
+
+Writes from other processes (the migration CLI, a bulk import or scrape)
+bump no version here, so every entry also expires ``QUERY_CACHE_TTL``
+seconds after it was loaded: their rows show up within that time, or at
+once when this process writes the same table or calls ``invalidate()``
+with no tables.
+
+Usage::
+
+    rows = cached_fetch_all("SELECT title, description FROM products", tables=("products",))
+    ...
+    invalidate("products")
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from config import settings
+from models.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """LRU of query results keyed by (query, params, table versions), each kept for at most ``ttl`` seconds"""
+
+    def __init__(self, max_entries: int = settings.QUERY_CACHE_SIZE, ttl: float = settings.QUERY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.versions: Dict[str, int] = {}
+        self.epoch = 0  # bumped by invalidate() without tables
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expired = 0
+        # Key -> (monotonic time it expires at, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, key: Hashable, tables: Iterable[str]) -> Hashable:
+        return key, self.epoch, tuple((table, self.versions.get(table, 0)) for table in sorted(tables))
+
+    def get_or_load(self, key: Hashable, tables: Iterable[str], load: Callable[[], object]):
+        """The cached value for ``key``, calling ``load`` on a miss"""
+        if self.max_entries <= 0:
+            return load()
+        with self._lock:
+            versioned = self._key(key, tables)
+            entry = self._entries.get(versioned)
+            if entry is not None:
+                if not self.ttl or entry[0] > time.monotonic():
+                    self._entries.move_to_end(versioned)
+                    self.hits += 1
+                    return entry[1]
+                # Possibly changed by another process since
+                del self._entries[versioned]
+                self.expired += 1
+            self.misses += 1
+        # Load outside the lock; under the versions read above, so a concurrent
+        # write makes this entry unreachable rather than stale. The TTL counts
+        # from before the load, so it also bounds how long a write made during
+        # the load by another process goes unseen
+        expires_at = time.monotonic() + self.ttl
+        value = load()
+        with self._lock:
+            self._entries[versioned] = (expires_at, value)
+            self._entries.move_to_end(versioned)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *tables: str):
+        """Bump the version of each table, or of every table if none are given"""
+        with self._lock:
+            self.invalidations += 1
+            if not tables:
+                # The epoch is part of every key, so a load in flight now stores an unreachable entry
+                self.epoch += 1
+                self._entries.clear()
+                return
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "expired": self.expired,
+                "ttl": self.ttl,
+                "epoch": self.epoch,
+                "table_versions": dict(self.versions),
+            }
+
+
+query_cache = QueryCache()
+
+
+def cached_fetch_all(sql: str, params: tuple = (), tables: Iterable[str] = ()) -> List[tuple]:
+    """Rows of a SELECT over ``tables``, served from the cache while none of them changed"""
+    def load():
+        with get_db_connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # Rows are tuples of immutable values; hand out a new list so callers can't change the cached one
+    return list(query_cache.get_or_load((sql, tuple(params)), tables, load))
+
+
+def cached_fetch_one(sql: str, params: tuple = (), tables: Iterable[str] = ()) -> Optional[tuple]:
+    rows = cached_fetch_all(sql, params, tables)
+    return rows[0] if rows else None
+
+
+def invalidate(*tables: str):
+    query_cache.invalidate(*tables)
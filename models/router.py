@@ -0,0 +1,218 @@
+"""Latency-aware routing of chat questions across the local Ollama models.
+
+The router picks the cheapest model whose capability tier covers the
+estimated complexity of a question, then checks the model's observed
+latency against the SLO and falls back to a faster model when needed.
+Latency samples age out after ``ROUTER_SAMPLE_MAX_AGE`` seconds, so a
+model skipped for being slow goes back to its prior latency and is tried
+again rather than judged on old samples forever.
+"""
+import logging
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    name: str
+    tier: int  # capability tier, 0 is the smallest model
+    cost: float  # relative cost of a call, used to order candidates
+    prior_latency: float  # seconds, used until enough live samples exist
+
+
+MODEL_PROFILES = [
+    ModelProfile("llama3.2:1b", tier=0, cost=1.0, prior_latency=2.0),
+    ModelProfile("llama3.2:3b", tier=1, cost=2.0, prior_latency=4.0),
+    ModelProfile("llama3.2:3b-instruct-fp16", tier=1, cost=3.0, prior_latency=6.0),
+    ModelProfile("gemma2:27b", tier=2, cost=10.0, prior_latency=20.0),
+]
+
+REASONING_KEYWORDS = (
+    "why", "explain", "compare", "difference", "analy", "evaluate",
+    "pros and cons", "trade-off", "tradeoff", "step by step", "summar",
+    "recommend", "strategy", "plan", "design", "implications",
+)
+
+
+@dataclass
+class Complexity:
+    score: float
+    tier: int
+    signals: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class RoutingDecision:
+    timestamp: float
+    query_chars: int
+    complexity: Complexity
+    model: str
+    predicted_latency: float
+    fallback: bool
+    reason: str
+    latency: Optional[float] = None  # filled in once the call finishes
+
+
+class LatencyStats:
+    """Thread-safe rolling window of call latencies per model, optionally only the last ``max_age`` seconds"""
+
+    def __init__(self, window: int = 50, min_samples: int = 3, max_age: Optional[float] = None):
+        self.window = window
+        self.min_samples = min_samples
+        self.max_age = max_age
+        # Model -> (monotonic time, seconds) samples, oldest first
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, seconds: float):
+        with self._lock:
+            self._samples[model].append((time.monotonic(), seconds))
+
+    def _recent(self, model: str) -> List[float]:
+        """The model's samples still in the window; call with the lock held"""
+        samples = self._samples.get(model)
+        if not samples:
+            return []
+        if self.max_age:
+            cutoff = time.monotonic() - self.max_age
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+        return [seconds for _, seconds in samples]
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._recent(model))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+        return samples[index]
+
+    def count(self, model: str) -> int:
+        with self._lock:
+            return len(self._recent(model))
+
+    def models(self) -> List[str]:
+        with self._lock:
+            return sorted(self._samples)
+
+
+def classify_complexity(query: str, relevance_scores: Sequence[float] = ()) -> Complexity:
+    """Cheap heuristic estimate of how much model a question needs"""
+    text = query.lower()
+    words = len(text.split())
+    signals = {}
+
+    if words > 40:
+        signals["length"] = 1.0
+    elif words > 15:
+        signals["length"] = 0.5
+
+    keyword_hits = sum(1 for keyword in REASONING_KEYWORDS if keyword in text)
+    if keyword_hits:
+        signals["keywords"] = min(1.5, 0.75 * keyword_hits)
+
+    if text.count("?") > 1 or re.search(r"\b(and also|as well as)\b", text):
+        signals["multi_part"] = 0.5
+
+    if relevance_scores:
+        top_score = max(relevance_scores)
+        if top_score >= 0.7:
+            # A strongly matching document usually means a lookup-style answer
+            signals["retrieval"] = -0.5
+        elif top_score < 0.3:
+            signals["retrieval"] = 0.5
+
+    score = max(0.0, sum(signals.values()))
+    tier = 0 if score < 1.0 else 1 if score < 2.0 else 2
+    return Complexity(score=score, tier=tier, signals=signals)
+
+
+class ModelRouter:
+    """Route each question to the cheapest adequate model within the latency SLO"""
+
+    def __init__(
+            self,
+            profiles: List[ModelProfile] = MODEL_PROFILES,
+            latency_slo: float = settings.ROUTER_LATENCY_SLO,
+            percentile: float = settings.ROUTER_LATENCY_PERCENTILE,
+            history: int = 200,
+            sample_max_age: float = settings.ROUTER_SAMPLE_MAX_AGE,
+    ):
+        self.profiles = sorted(profiles, key=lambda p: p.cost)
+        self.latency_slo = latency_slo
+        self.percentile = percentile
+        # A model over the SLO gets no traffic, hence no new samples: let the old ones expire
+        self.stats = LatencyStats(max_age=sample_max_age)
+        self.decisions = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def predicted_latency(self, profile: ModelProfile) -> float:
+        observed = self.stats.percentile(profile.name, self.percentile)
+        return observed if observed is not None else profile.prior_latency
+
+    def _select(self, complexity: Complexity):
+        max_tier = max(p.tier for p in self.profiles)
+        required = min(complexity.tier, max_tier)
+
+        chosen = next(p for p in self.profiles if p.tier >= required)
+        predicted = self.predicted_latency(chosen)
+        fallback = False
+        reason = f"complexity {complexity.score:.1f} needs tier {required}"
+
+        if predicted > self.latency_slo:
+            within_slo = [p for p in self.profiles if self.predicted_latency(p) <= self.latency_slo]
+            if within_slo:
+                # Most capable model that still meets the SLO, cheapest first on ties
+                faster = max(within_slo, key=lambda p: (p.tier, -p.cost))
+            else:
+                faster = min(self.profiles, key=self.predicted_latency)
+            if faster.name != chosen.name:
+                reason += (
+                    f"; {chosen.name} p{int(self.percentile * 100)} {predicted:.1f}s"
+                    f" exceeds SLO {self.latency_slo:.1f}s, fell back to {faster.name}"
+                )
+                chosen, predicted, fallback = faster, self.predicted_latency(faster), True
+        return chosen, predicted, fallback, reason
+
+    def preview(self, query: str) -> str:
+        """Likely model for a query before retrieval scores are known; nothing is recorded"""
+        chosen, _, _, _ = self._select(classify_complexity(query))
+        return chosen.name
+
+    def route(self, query: str, relevance_scores: Sequence[float] = ()) -> RoutingDecision:
+        complexity = classify_complexity(query, relevance_scores)
+        chosen, predicted, fallback, reason = self._select(complexity)
+        decision = RoutingDecision(
+            timestamp=time.time(),
+            query_chars=len(query),
+            complexity=complexity,
+            model=chosen.name,
+            predicted_latency=predicted,
+            fallback=fallback,
+            reason=reason,
+        )
+        with self._lock:
+            self.decisions.append(decision)
+        logger.info(f"Routed query ({len(query)} chars) to {chosen.name}: {reason}")
+        return decision
+
+    def observe(self, decision: RoutingDecision, latency: float):
+        """Record the measured latency of a routed call"""
+        decision.latency = latency
+        self.stats.observe(decision.model, latency)
+
+    def recent_decisions(self, limit: int = 20) -> List[RoutingDecision]:
+        with self._lock:
+            return list(self.decisions)[-limit:][::-1]
+
+
+# Process-wide router, shared by all Streamlit sessions
+router = ModelRouter()
@@ -0,0 +1,258 @@
+"""In-process scheduler in front of every LLM call.
+
+Each model has its own concurrency limit, so a long ``gemma2:27b``
+generation never holds a slot a ``llama3.2:1b`` question is waiting for.
+Waiting calls are granted by priority first and then fair share across
+sessions (fewest running calls, least recent service time). Admission is
+bounded: when a model's queue is full, or a call waits longer than
+``max_wait``, ``SchedulerBusy`` is raised instead of blocking the page.
+Calls that are cancelled while queued or running give their place back
+immediately and are counted per model.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class SchedulerBusy(Exception):
+    """Raised when a call is not admitted because the model is saturated"""
+
+
+@dataclass
+class Ticket:
+    model: str
+    session_id: str
+    priority: int
+    seq: int
+    enqueued_at: float
+    granted_at: Optional[float] = None
+    abandoned: bool = False
+    released: bool = False
+    on_grant: Optional[Callable[[], None]] = None
+
+
+@dataclass
+class ModelMetrics:
+    admitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    wait_times: deque = field(default_factory=lambda: deque(maxlen=200))
+
+
+class LLMScheduler:
+    def __init__(
+            self,
+            limits: Dict[str, int] = settings.LLM_CONCURRENCY,
+            default_limit: int = settings.LLM_DEFAULT_CONCURRENCY,
+            max_queue: int = settings.LLM_MAX_QUEUE,
+            max_wait: float = settings.LLM_MAX_WAIT,
+            usage_half_life: float = 60.0,
+    ):
+        self.limits = dict(limits)
+        self.default_limit = default_limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.usage_half_life = usage_half_life
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = defaultdict(list)
+        self._running = defaultdict(int)
+        self._session_running = defaultdict(int)
+        self._session_usage = {}  # session -> (decayed seconds of service, last update)
+        self._metrics = defaultdict(ModelMetrics)
+
+    def limit(self, model: str) -> int:
+        return self.limits.get(model, self.default_limit)
+
+    def _usage(self, session_id: str, now: float) -> float:
+        usage, updated = self._session_usage.get(session_id, (0.0, now))
+        return usage * 0.5 ** ((now - updated) / self.usage_half_life)
+
+    def _dispatch(self, model: str):
+        queue = self._waiting[model]
+        now = time.monotonic()
+        granted = False
+        while queue and self._running[model] < self.limit(model):
+            ticket = min(queue, key=lambda t: (
+                t.priority,
+                self._session_running.get(t.session_id, 0),
+                self._usage(t.session_id, now),
+                t.seq,
+            ))
+            queue.remove(ticket)
+            ticket.granted_at = now
+            self._running[model] += 1
+            self._session_running[ticket.session_id] += 1
+            if ticket.on_grant is not None:
+                ticket.on_grant()
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _enqueue(self, model: str, session_id: str, priority: int) -> Ticket:
+        with self._cond:
+            queue = self._waiting[model]
+            if self._running[model] >= self.limit(model) and len(queue) >= self.max_queue:
+                self._metrics[model].rejected += 1
+                raise SchedulerBusy(f"{model} is busy ({len(queue)} requests queued)")
+            ticket = Ticket(model, session_id, priority, next(self._seq), time.monotonic())
+            queue.append(ticket)
+            self._dispatch(model)
+            return ticket
+
+    def _wait(self, ticket: Ticket, timeout: float) -> Ticket:
+        deadline = ticket.enqueued_at + timeout
+        with self._cond:
+            metrics = self._metrics[ticket.model]
+            while ticket.granted_at is None:
+                if ticket.abandoned:
+                    return ticket
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting[ticket.model].remove(ticket)
+                    metrics.rejected += 1
+                    raise SchedulerBusy(f"{ticket.model} is busy (waited {timeout:.0f}s)")
+                self._cond.wait(remaining)
+            self._admit(ticket)
+        return ticket
+
+    def _admit(self, ticket: Ticket):
+        metrics = self._metrics[ticket.model]
+        metrics.admitted += 1
+        metrics.wait_times.append(ticket.granted_at - ticket.enqueued_at)
+
+    def acquire(
+            self,
+            model: str,
+            session_id: str,
+            priority: int = PRIORITY_INTERACTIVE,
+            timeout: Optional[float] = None,
+    ) -> Ticket:
+        """Wait for a slot on ``model``; raises SchedulerBusy if not admitted in time"""
+        ticket = self._enqueue(model, session_id, priority)
+        return self._wait(ticket, self.max_wait if timeout is None else timeout)
+
+    async def acquire_async(
+            self,
+            model: str,
+            session_id: str,
+            priority: int = PRIORITY_INTERACTIVE,
+            timeout: Optional[float] = None,
+    ) -> Ticket:
+        """Like acquire(), but cancelling the awaiting task gives the place back.
+
+        Waits on a future resolved by the releasing thread, so queued calls
+        hold no executor thread.
+        """
+        ticket = self._enqueue(model, session_id, priority)
+        timeout = self.max_wait if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+            except RuntimeError:
+                pass  # The loop is closed; its task was cancelled and withdrew the ticket
+
+        with self._cond:
+            if ticket.granted_at is None:
+                ticket.on_grant = wake
+            else:
+                granted.set_result(None)
+        try:
+            await asyncio.wait_for(granted, ticket.enqueued_at + timeout - time.monotonic())
+        except asyncio.TimeoutError:
+            with self._cond:
+                if ticket.granted_at is None:
+                    self._waiting[ticket.model].remove(ticket)
+                    self._metrics[ticket.model].rejected += 1
+                    raise SchedulerBusy(f"{ticket.model} is busy (waited {timeout:.0f}s)")
+                # Granted just as the wait timed out
+        except asyncio.CancelledError:
+            self.release(ticket, cancelled=True)
+            raise
+        with self._cond:
+            self._admit(ticket)
+        return ticket
+
+    def release(self, ticket: Ticket, cancelled: bool = False):
+        """Free a granted slot, or withdraw a ticket that is still queued"""
+        with self._cond:
+            if ticket.released or ticket.abandoned:
+                return
+            metrics = self._metrics[ticket.model]
+            if cancelled:
+                metrics.cancelled += 1
+            if ticket.granted_at is None:
+                ticket.abandoned = True
+                if ticket in self._waiting[ticket.model]:
+                    self._waiting[ticket.model].remove(ticket)
+                self._cond.notify_all()
+                return
+
+            ticket.released = True
+            now = time.monotonic()
+            self._running[ticket.model] -= 1
+            self._session_running[ticket.session_id] -= 1
+            if not self._session_running[ticket.session_id]:
+                del self._session_running[ticket.session_id]
+            usage = self._usage(ticket.session_id, now) + (now - ticket.granted_at)
+            self._session_usage[ticket.session_id] = (usage, now)
+            if len(self._session_usage) > 1000:
+                # Forget sessions whose usage has decayed away
+                self._session_usage = {
+                    session: entry for session, entry in self._session_usage.items()
+                    if self._usage(session, now) > 0.01
+                }
+            if not cancelled:
+                metrics.completed += 1
+            self._dispatch(ticket.model)
+
+    @contextmanager
+    def slot(self, model: str, session_id: str, priority: int = PRIORITY_INTERACTIVE,
+             timeout: Optional[float] = None):
+        ticket = self.acquire(model, session_id, priority, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Queue depth, running calls and wait-time metrics per model"""
+        with self._cond:
+            models = set(self._metrics) | set(self._waiting) | set(self._running)
+            result = {}
+            for model in sorted(models):
+                metrics = self._metrics[model]
+                waits = sorted(metrics.wait_times)
+                result[model] = {
+                    "limit": self.limit(model),
+                    "running": self._running[model],
+                    "queued": len(self._waiting[model]),
+                    "admitted": metrics.admitted,
+                    "rejected": metrics.rejected,
+                    "completed": metrics.completed,
+                    "cancelled": metrics.cancelled,
+                    "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                    "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                }
+            return result
+
+
+# Process-wide scheduler, shared by all Streamlit sessions
+scheduler = LLMScheduler()
@@ -0,0 +1,231 @@
+"""The JSON scrape blob, and deltas between two blobs of a site.
+
+A blob is ``{"Name", "url", "time", "pages": [{"url", "title", "text"}]}``.
+Older blobs, and the stand-in server's, have the text of every page in one
+``data`` field instead of ``pages``. ``render`` is the only way blobs are
+written, so the same pages always give the same bytes and SHA-256.
+
+A delta holds only what changed since a base blob::
+
+    {"Name", "url", "time", "delta": {"base", "sha256", "urls"}, "pages": [changed pages]}
+
+``base`` and ``sha256`` are the hashes of the old and the new blob, and
+``urls`` lists every page of the new blob in order, so removed pages are
+the ones missing from it. ``apply_delta`` rebuilds the new blob from the
+base and checks it against ``sha256``.
+
+``decode`` turns a blob of any shape into a typed ``ScrapeRecord``, parsed
+with orjson when it is installed. ``StreamedRecord`` decodes a JSON blob as
+its text streams in (e.g. from compression.decompress_chunks), holding one
+page at a time rather than the whole text and every page.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+from models.compression import content_hash
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class DeltaError(Exception):
+    """Raised when a delta does not rebuild the blob it was made for"""
+
+
+@dataclass(frozen=True)
+class ScrapedPage:
+    url: Optional[str]
+    title: Optional[str]
+    text: str
+
+
+@dataclass(frozen=True)
+class ScrapeRecord:
+    name: Optional[str]
+    url: Optional[str]
+    time: Optional[str]
+    pages: List[ScrapedPage]
+
+
+def loads(text: str):
+    """json.loads, with orjson when it is installed"""
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def _str(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def decode(blob: str) -> ScrapeRecord:
+    """The record of a blob with pages, with one "data" text, or of plain text"""
+    try:
+        record = loads(blob)
+    except ValueError:
+        record = None
+    if not isinstance(record, dict):
+        return ScrapeRecord(None, None, None, [ScrapedPage(None, None, blob)])
+    url = _str(record.get("url"))
+    if isinstance(record.get("pages"), list):
+        pages = [
+            ScrapedPage(_str(page.get("url")), _str(page.get("title")), _str(page.get("text")) or "")
+            for page in record["pages"] if isinstance(page, dict)
+        ]
+    else:
+        pages = [ScrapedPage(url, None, _str(record.get("data")) or "")]
+    return ScrapeRecord(_str(record.get("Name")), url, _str(record.get("time")), pages)
+
+
+_decoder = json.JSONDecoder()
+_SPACE = re.compile(r"\s*")
+
+
+class _Reader:
+    """JSON values from a stream of text, reading ahead only as far as each one needs"""
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _grow(self) -> bool:
+        """Read at least as much again as is left unparsed, so a long value is retried O(log n) times"""
+        left = self._buffer[self._pos:]
+        parts = [left]
+        wanted = max(len(left), 1)
+        read = 0
+        while read < wanted:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                break
+            parts.append(chunk)
+            read += len(chunk)
+        self._buffer, self._pos = "".join(parts), 0
+        return read > 0
+
+    def peek(self) -> str:
+        """The next character that is not whitespace, or "" at the end"""
+        while True:
+            self._pos = _SPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if self._eof or not self._grow():
+                return ""
+
+    def skip(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in the blob at {self.peek()!r}")
+        self._pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._eof and self._grow():
+                    continue
+                raise
+            # A number at the end of what has been read may go on in the next chunk
+            if end < len(self._buffer) or self._eof or not self._grow():
+                self._pos = end
+                return value
+
+
+class StreamedRecord:
+    """decode() of a JSON object blob read from chunks of its text
+
+    ``pages()`` yields the pages as they are parsed; ``name``, ``url`` and
+    ``time`` are set once it is exhausted (older blobs put ``time`` last).
+    Raises ValueError for a blob that is not a JSON object, which decode()
+    reads as plain text instead.
+    """
+
+    def __init__(self, chunks: Iterable[str]):
+        self.name: Optional[str] = None
+        self.url: Optional[str] = None
+        self.time: Optional[str] = None
+        self._reader = _Reader(chunks)
+
+    def pages(self) -> Iterator[ScrapedPage]:
+        reader = self._reader
+        reader.skip("{")
+        data = None
+        has_pages = False
+        while reader.peek() != "}":
+            key = reader.value()
+            reader.skip(":")
+            if key == "pages" and reader.peek() == "[":
+                has_pages = True
+                reader.skip("[")
+                while reader.peek() != "]":
+                    page = reader.value()
+                    if isinstance(page, dict):
+                        yield ScrapedPage(_str(page.get("url")), _str(page.get("title")), _str(page.get("text")) or "")
+                    if reader.peek() != "]":
+                        reader.skip(",")
+                reader.skip("]")
+            else:
+                value = reader.value()
+                if key == "Name":
+                    self.name = _str(value)
+                elif key == "url":
+                    self.url = _str(value)
+                elif key == "time":
+                    self.time = _str(value)
+                elif key == "data":
+                    data = value
+            if reader.peek() != "}":
+                reader.skip(",")
+        reader.skip("}")
+        if reader.peek():
+            raise ValueError("Extra data after the blob's object")
+        if not has_pages:
+            yield ScrapedPage(self.url, None, _str(data) or "")
+
+
+def render(name: str, url: str, pages: List[dict], time: str) -> str:
+    return json.dumps({"Name": name, "url": url, "time": time, "pages": pages}, indent=4)
+
+
+def make_delta(base: str, blob: str) -> Optional[str]:
+    """The delta from one blob of a site to the next; None if the base has no pages to patch"""
+    old, new = loads(base), loads(blob)
+    if "pages" not in old:
+        return None
+    old_pages = {page["url"]: page for page in old["pages"]}
+    return json.dumps({
+        "Name": new["Name"],
+        "url": new["url"],
+        "time": new["time"],
+        "delta": {
+            "base": content_hash(base),
+            "sha256": content_hash(blob),
+            "urls": [page["url"] for page in new["pages"]],
+        },
+        "pages": [page for page in new["pages"] if old_pages.get(page["url"]) != page],
+    }, indent=4)
+
+
+def apply_delta(base: str, delta: str) -> str:
+    """The blob a delta was made for, from its base"""
+    patch = loads(delta)
+    info = patch.get("delta")
+    if not info:
+        raise DeltaError("Not a delta")
+    if content_hash(base) != info["base"]:
+        raise DeltaError(f"Delta is against {info['base'][:12]}, not this blob")
+    pages = {page["url"]: page for page in loads(base).get("pages", [])}
+    pages.update((page["url"], page) for page in patch["pages"])
+    missing = [url for url in info["urls"] if url not in pages]
+    if missing:
+        raise DeltaError(f"Delta lacks {len(missing)} pages, e.g. {missing[0]}")
+    blob = render(patch["Name"], patch["url"], [pages[url] for url in info["urls"]], patch["time"])
+    if content_hash(blob) != info["sha256"]:
+        raise DeltaError("Rebuilt blob does not match the delta's SHA-256")
+    return blob
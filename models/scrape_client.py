@@ -0,0 +1,573 @@
+"""Process-wide gRPC channel to the scrape service.
+
+Every page used to open a new channel per click and per rerun, and no call
+had a deadline. ``scrape_channel`` owns one channel for the whole process:
+HTTP/2 keepalive pings keep the connection warm through idle periods, gRPC
+retries UNAVAILABLE calls per the service config, messages are gzip
+compressed, and an interceptor gives every call a deadline (longer for blob
+downloads) and records its latency and status. The channel's connectivity
+state is tracked as it changes.
+
+Blobs are downloaded with the server-streaming ``StreamScrapingBlob``:
+``stream_blob`` checks each chunk against the size and SHA-256 sent up
+front and compresses it as it arrives, so a large site is neither limited
+by the message size nor held in memory uncompressed. Given the hash of the
+stored blob, the service may send only the pages changed since; the delta
+is merged with the stored blob here (see models/scrape_blob.py), and a
+delta that does not apply is followed by a download of the whole blob.
+Services without the streaming method are asked with ``GetScrapingBlob``.
+
+``scraping_done_many`` and ``scraping_blobs_many`` check or fetch many
+names in one ``IsScrapingDoneMany`` / ``GetScrapingBlobsMany`` call per
+``SCRAPE_BATCH_SIZE`` names, returning per-name results and errors; they
+fall back to one call per name when the service lacks the batch methods.
+Blobs the service withholds to keep an answer under its size cap are
+streamed one by one.
+
+Async code gets a ``grpc.aio`` stub with the same options, deadlines and
+metrics from ``scrape_channel.aio_stub()``, bound to the running loop.
+
+Usage::
+
+    stub = scrape_channel.stub
+    stub.IsScrapingDone(ScrapeStatusRequest(name=name))   # deadline applied
+    scrape_channel.snapshot()                              # state and latency
+    blob = stream_blob(name, known_hash=latest_hash(name))  # compressed on the way in
+"""
+import asyncio
+import atexit
+import collections
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import grpc
+
+from config import settings
+from models.compression import StreamCompressor
+from models.event_loop import on_shutdown
+from models.router import LatencyStats
+from models.scrape_blob import DeltaError
+from models.scrapes import merge_delta
+
+# The generated modules live with the pages; scrape_pb2_grpc imports "proto.scrape_pb2",
+# the pages import "scrape_pb2", so both directories go on the path
+PROTO_DIR = settings.ROOT_DIR / "pages" / "user" / "proto"
+for path in (PROTO_DIR.parent, PROTO_DIR):
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+from proto.scrape_pb2 import (  # noqa: E402
+    ScrapeBlobRequest, ScrapeBlobsManyRequest, ScrapeStatusManyRequest, ScrapeStatusRequest,
+)
+from proto.scrape_pb2_grpc import ScrapeServiceStub  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+SERVICE = "scrape.ScrapeService"
+# Calls that may take longer than SCRAPE_RPC_TIMEOUT
+SLOW_METHODS = {f"/{SERVICE}/GetScrapingBlob", f"/{SERVICE}/StreamScrapingBlob"}
+# Streams kept open for as long as the client wants: no default deadline
+OPEN_ENDED_METHODS = {f"/{SERVICE}/WatchScrapes"}
+
+
+def service_config() -> str:
+    """Retry UNAVAILABLE calls with exponential backoff; gRPC only retries before a response arrives"""
+    return json.dumps({
+        "methodConfig": [{
+            "name": [{"service": SERVICE}],
+            "retryPolicy": {
+                "maxAttempts": max(2, settings.SCRAPE_RPC_ATTEMPTS),
+                "initialBackoff": "0.2s",
+                "maxBackoff": "5s",
+                "backoffMultiplier": 2,
+                "retryableStatusCodes": ["UNAVAILABLE"],
+            },
+        }],
+    })
+
+
+def channel_options() -> list:
+    max_message = settings.SCRAPE_MAX_MESSAGE_MB * 1024 * 1024
+    return [
+        ("grpc.keepalive_time_ms", int(settings.SCRAPE_KEEPALIVE * 1000)),
+        ("grpc.keepalive_timeout_ms", 10000),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+        ("grpc.max_receive_message_length", max_message),
+        ("grpc.max_send_message_length", max_message),
+        ("grpc.enable_retries", 1),
+        ("grpc.service_config", service_config()),
+    ]
+
+
+class _CallDetails(
+    collections.namedtuple("_CallDetails", ("method", "timeout", "metadata", "credentials", "wait_for_ready", "compression")),
+    grpc.ClientCallDetails,
+):
+    pass
+
+
+def method_name(method) -> str:
+    # grpc.aio passes the method as bytes
+    return method.decode("ascii") if isinstance(method, bytes) else method
+
+
+def with_deadline(details):
+    """Call details with the default deadline for the method, unless the caller set one"""
+    if details.timeout is not None or method_name(details.method) in OPEN_ENDED_METHODS:
+        return details
+    timeout = settings.SCRAPE_BLOB_TIMEOUT if method_name(details.method) in SLOW_METHODS else settings.SCRAPE_RPC_TIMEOUT
+    return _CallDetails(
+        details.method,
+        timeout,
+        details.metadata,
+        details.credentials,
+        getattr(details, "wait_for_ready", None),
+        getattr(details, "compression", None),
+    )
+
+
+class MetricsInterceptor(grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor):
+    """Applies default deadlines and records per-method latency and status codes"""
+
+    def __init__(self, channel: "ScrapeChannel"):
+        self.channel = channel
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        details = with_deadline(client_call_details)
+        start = time.perf_counter()
+        call = continuation(details, request)
+        call.add_done_callback(
+            lambda done: self.channel.record(details.method, time.perf_counter() - start, done.code())
+        )
+        return call
+
+    # A stream is done, and recorded, after its last message or when cancelled
+    intercept_unary_stream = intercept_unary_unary
+
+
+class AsyncMetricsInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """MetricsInterceptor for grpc.aio channels"""
+
+    def __init__(self, channel: "ScrapeChannel"):
+        self.channel = channel
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        details = with_deadline(client_call_details)
+        start = time.perf_counter()
+        call = await continuation(details, request)
+        try:
+            await call
+            code = grpc.StatusCode.OK
+        except grpc.aio.AioRpcError as e:
+            # The caller's own await of the call raises it again
+            code = e.code()
+        self.channel.record(details.method, time.perf_counter() - start, code)
+        return call
+
+
+class AsyncStreamMetricsInterceptor(grpc.aio.UnaryStreamClientInterceptor):
+    """AsyncMetricsInterceptor for server-streaming calls (grpc.aio takes one kind per interceptor)"""
+
+    def __init__(self, channel: "ScrapeChannel"):
+        self.channel = channel
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        details = with_deadline(client_call_details)
+        start = time.perf_counter()
+        call = await continuation(details, request)
+        call.add_done_callback(
+            lambda done: asyncio.ensure_future(self._record_stream(done, details.method, time.perf_counter() - start))
+        )
+        return call
+
+    async def _record_stream(self, call, method, seconds: float):
+        # An aio call's code is awaited, but is already there once the call is done
+        self.channel.record(method, seconds, await call.code())
+
+
+class ScrapeChannel:
+    """One lazily opened, shared channel to the scrape service"""
+
+    def __init__(self, target: str = settings.SCRAPE_SERVICE_TARGET):
+        self.target = target
+        self.state: Optional[grpc.ChannelConnectivity] = None
+        self.state_changes = Counter()
+        self.state_since = time.time()
+        self.latency = LatencyStats(window=200, min_samples=1)
+        self.calls: Dict[str, Counter] = collections.defaultdict(Counter)
+        self._channel: Optional[grpc.Channel] = None
+        self._raw_channel: Optional[grpc.Channel] = None
+        self._stub: Optional[ScrapeServiceStub] = None
+        self._aio_channel: Optional[grpc.aio.Channel] = None
+        self._aio_stub: Optional[ScrapeServiceStub] = None
+        self._aio_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # Cleared once the service answers StreamScrapingBlob / the batch methods with UNIMPLEMENTED
+        self.streaming = True
+        self.batching = True
+
+    def _on_state(self, state: grpc.ChannelConnectivity):
+        if state != self.state:
+            logger.info(f"Scrape service channel to {self.target}: {state.name}")
+            self.state = state
+            self.state_changes[state.name] += 1
+            self.state_since = time.time()
+
+    @property
+    def channel(self) -> grpc.Channel:
+        with self._lock:
+            if self._channel is None:
+                self._raw_channel = grpc.insecure_channel(
+                    self.target,
+                    options=channel_options(),
+                    compression=grpc.Compression.Gzip if settings.SCRAPE_GZIP else None,
+                )
+                self._raw_channel.subscribe(self._on_state, try_to_connect=True)
+                self._channel = grpc.intercept_channel(self._raw_channel, MetricsInterceptor(self))
+                atexit.register(self.close)
+            return self._channel
+
+    @property
+    def stub(self) -> ScrapeServiceStub:
+        channel = self.channel
+        with self._lock:
+            if self._stub is None:
+                self._stub = ScrapeServiceStub(channel)
+            return self._stub
+
+    def aio_stub(self) -> ScrapeServiceStub:
+        """A stub on a grpc.aio channel for the running event loop (e.g. the shared one of models.event_loop)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._aio_loop is not loop:
+                # aio channels belong to the loop that created them: close the previous loop's there
+                self._drop_aio_channel()
+                self._aio_channel = grpc.aio.insecure_channel(
+                    self.target,
+                    options=channel_options(),
+                    compression=grpc.Compression.Gzip if settings.SCRAPE_GZIP else None,
+                    interceptors=[AsyncMetricsInterceptor(self), AsyncStreamMetricsInterceptor(self)],
+                )
+                self._aio_stub = ScrapeServiceStub(self._aio_channel)
+                self._aio_loop = loop
+            return self._aio_stub
+
+    def _drop_aio_channel(self):
+        """Forget the aio channel, closing it on its loop if that still runs; call with the lock held"""
+        channel, loop = self._aio_channel, self._aio_loop
+        self._aio_channel = self._aio_stub = self._aio_loop = None
+        if channel is None:
+            return
+        if loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(channel.close(), loop)
+        else:
+            # Its loop is gone and its calls with it; nothing is left to close them on
+            logger.debug(f"Dropped the aio channel to {self.target} of a stopped event loop")
+
+    async def aclose(self):
+        """Close the aio channel if it belongs to the running loop"""
+        with self._lock:
+            if self._aio_loop is not asyncio.get_running_loop():
+                return
+            channel = self._aio_channel
+            self._aio_channel = self._aio_stub = self._aio_loop = None
+        await channel.close()
+
+    def record(self, method: str, seconds: float, code: grpc.StatusCode):
+        name = method_name(method).rsplit("/", 1)[-1]
+        self.latency.observe(name, seconds)
+        self.calls[name][code.name if code is not None else "UNKNOWN"] += 1
+
+    def close(self):
+        with self._lock:
+            if self._raw_channel is not None:
+                self._raw_channel.unsubscribe(self._on_state)
+                self._raw_channel.close()
+            self._channel = self._raw_channel = self._stub = None
+            self.state = None
+
+    def snapshot(self) -> dict:
+        methods = []
+        for name in self.latency.models():
+            p50 = self.latency.percentile(name, 0.5)
+            p95 = self.latency.percentile(name, 0.95)
+            methods.append({
+                "method": name,
+                "calls": sum(self.calls[name].values()),
+                "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+                "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+                **dict(self.calls[name]),
+            })
+        return {
+            "target": self.target,
+            "state": self.state.name if self.state is not None else "NOT OPENED",
+            "state_for_s": round(time.time() - self.state_since, 1),
+            "state_changes": dict(self.state_changes),
+            "methods": methods,
+        }
+
+
+scrape_channel = ScrapeChannel()
+on_shutdown(lambda: scrape_channel.aclose())
+
+
+class BlobStreamError(Exception):
+    """Raised when a streamed blob does not match the size or hash announced for it"""
+
+
+class ScrapeFailed(Exception):
+    """Raised for a name the scrape service reported an error for in a batch call"""
+
+
+@dataclass
+class StreamedBlob:
+    name: str
+    sha256: str
+    size: int
+    codec: Optional[str] = None
+    data: Optional[bytes] = None  # compressed; None when the download was skipped
+    received: Optional[int] = None  # bytes downloaded, when only a delta was
+
+    @property
+    def skipped(self) -> bool:
+        return self.data is None
+
+
+class BlobReceiver:
+    """Checks StreamScrapingBlob chunks in order and compresses them as they arrive"""
+
+    def __init__(self, name: str, known_hash: Optional[str] = None):
+        self.name = name
+        self.known_hash = known_hash
+        self.info = None
+        self.skipped = False
+        self.next_index = 0
+        self.compressor = StreamCompressor()
+        self.delta_parts: List[bytes] = []
+
+    def feed(self, chunk) -> bool:
+        """Take one message; False once the rest of the stream is not needed"""
+        if chunk.WhichOneof("payload") == "info":
+            if self.info is not None:
+                raise BlobStreamError(f"{self.name}: second ScrapeBlobInfo in the stream")
+            self.info = chunk.info
+            # The blob is the one already stored: no need to download it again
+            self.skipped = self.info.sha256 == self.known_hash
+            return not self.skipped
+        if self.info is None:
+            raise BlobStreamError(f"{self.name}: data before the ScrapeBlobInfo")
+        if chunk.index != self.next_index:
+            raise BlobStreamError(f"{self.name}: chunk {chunk.index} arrived, expected {self.next_index}")
+        self.next_index += 1
+        self.compressor.write(chunk.data)
+        if self.info.base_sha256:
+            self.delta_parts.append(chunk.data)
+        if self.compressor.size > self.info.size:
+            raise BlobStreamError(f"{self.name}: more than the announced {self.info.size} bytes")
+        return True
+
+    def result(self) -> StreamedBlob:
+        if self.info is None:
+            raise BlobStreamError(f"{self.name}: stream ended without a ScrapeBlobInfo")
+        if self.skipped:
+            return StreamedBlob(self.name, self.info.sha256, self.info.size)
+        if self.compressor.size != self.info.size:
+            raise BlobStreamError(f"{self.name}: got {self.compressor.size} of {self.info.size} bytes")
+        if self.compressor.hexdigest() != self.info.sha256:
+            raise BlobStreamError(f"{self.name}: SHA-256 does not match")
+        if self.info.base_sha256:
+            text = merge_delta(self.info.base_sha256, b"".join(self.delta_parts).decode("utf-8"))
+            blob = unary_blob(self.name, text)
+            if blob.sha256 != self.info.full_sha256:
+                raise DeltaError("Rebuilt blob does not match the announced SHA-256")
+            blob.received = self.info.size
+            return blob
+        return StreamedBlob(self.name, self.info.sha256, self.info.size, self.compressor.codec, self.compressor.finish())
+
+
+def unary_blob(name: str, json_blob: str) -> StreamedBlob:
+    """A GetScrapingBlob answer in the same form as a streamed one"""
+    compressor = StreamCompressor()
+    compressor.write(json_blob.encode("utf-8"))
+    return StreamedBlob(name, compressor.hexdigest(), compressor.size, compressor.codec, compressor.finish())
+
+
+def stream_blob(name: str, known_hash: Optional[str] = None, stub: Optional[ScrapeServiceStub] = None,
+                delta: bool = True) -> StreamedBlob:
+    """Download a scrape blob, compressed on the way in; skipped if its hash is ``known_hash``
+
+    ``known_hash`` must be a stored blob: the service may answer with a delta against it.
+    """
+    stub = stub or scrape_channel.stub
+    request = ScrapeBlobRequest(name=name)
+    if scrape_channel.streaming:
+        if delta and known_hash:
+            request.base_sha256 = known_hash
+        receiver = BlobReceiver(name, known_hash)
+        responses = stub.StreamScrapingBlob(request)
+        try:
+            for chunk in responses:
+                if not receiver.feed(chunk):
+                    responses.cancel()
+                    break
+            return receiver.result()
+        except DeltaError as e:
+            logger.warning(f"{name}: {e}, downloading the whole blob")
+            return stream_blob(name, known_hash, stub, delta=False)
+        except BlobStreamError:
+            responses.cancel()
+            raise
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+            logger.info(f"{scrape_channel.target} has no StreamScrapingBlob, using GetScrapingBlob")
+            scrape_channel.streaming = False
+    return unary_blob(name, stub.GetScrapingBlob(request).json_blob)
+
+
+async def stream_blob_async(stub: ScrapeServiceStub, name: str, known_hash: Optional[str] = None,
+                            delta: bool = True) -> StreamedBlob:
+    """stream_blob on a scrape_channel.aio_stub()"""
+    request = ScrapeBlobRequest(name=name)
+    if scrape_channel.streaming:
+        if delta and known_hash:
+            request.base_sha256 = known_hash
+        receiver = BlobReceiver(name, known_hash)
+        call = stub.StreamScrapingBlob(request)
+        try:
+            async for chunk in call:
+                if not receiver.feed(chunk):
+                    call.cancel()
+                    break
+            return receiver.result()
+        except DeltaError as e:
+            logger.warning(f"{name}: {e}, downloading the whole blob")
+            return await stream_blob_async(stub, name, known_hash, delta=False)
+        except BlobStreamError:
+            call.cancel()
+            raise
+        except grpc.aio.AioRpcError as e:
+            if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+            logger.info(f"{scrape_channel.target} has no StreamScrapingBlob, using GetScrapingBlob")
+            scrape_channel.streaming = False
+    return unary_blob(name, (await stub.GetScrapingBlob(request)).json_blob)
+
+
+def batches(names: Sequence[str], size: int = settings.SCRAPE_BATCH_SIZE) -> Iterator[List[str]]:
+    names = list(dict.fromkeys(names))
+    for start in range(0, len(names), size):
+        yield names[start:start + size]
+
+
+def no_batching():
+    logger.info(f"{scrape_channel.target} has no batch methods, calling once per name")
+    scrape_channel.batching = False
+
+
+def rpc_error(e: grpc.RpcError) -> str:
+    return f"{e.code().name}: {e.details()}"
+
+
+def _status_results(response, done: Dict[str, bool], errors: Dict[str, str]):
+    for result in response.results:
+        if result.error:
+            errors[result.name] = result.error
+        else:
+            done[result.name] = result.is_done
+
+
+def _blob_results(response, blobs: Dict[str, StreamedBlob], errors: Dict[str, str]) -> List[str]:
+    """Fill in the blobs and errors of a GetScrapingBlobsMany answer; the names withheld to keep it small"""
+    withheld = []
+    for result in response.results:
+        if result.error:
+            errors[result.name] = result.error
+        elif result.withheld:
+            withheld.append(result.name)
+        elif result.unchanged:
+            blobs[result.name] = StreamedBlob(result.name, result.sha256, result.size)
+        else:
+            blobs[result.name] = unary_blob(result.name, result.json_blob)
+    return withheld
+
+
+def scraping_done_many(names: Sequence[str], stub: Optional[ScrapeServiceStub] = None
+                       ) -> Tuple[Dict[str, bool], Dict[str, str]]:
+    """({name: is_done}, {name: error}) for many names"""
+    stub = stub or scrape_channel.stub
+    done, errors = {}, {}
+    for batch in batches(names):
+        if scrape_channel.batching:
+            try:
+                _status_results(stub.IsScrapingDoneMany(ScrapeStatusManyRequest(names=batch)), done, errors)
+                continue
+            except grpc.RpcError as e:
+                if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                    raise
+                no_batching()
+        for name in batch:
+            try:
+                done[name] = stub.IsScrapingDone(ScrapeStatusRequest(name=name)).is_done
+            except grpc.RpcError as e:
+                errors[name] = rpc_error(e)
+    return done, errors
+
+
+def scraping_blobs_many(names: Sequence[str], known_hashes: Optional[Dict[str, str]] = None,
+                        stub: Optional[ScrapeServiceStub] = None) -> Tuple[Dict[str, StreamedBlob], Dict[str, str]]:
+    """({name: blob}, {name: error}) for many names; blobs whose hash is known come back skipped"""
+    stub = stub or scrape_channel.stub
+    known_hashes = {name: digest for name, digest in (known_hashes or {}).items() if digest}
+    blobs, errors = {}, {}
+    for batch in batches(names):
+        if scrape_channel.batching:
+            request = ScrapeBlobsManyRequest(
+                names=batch, known_sha256={name: known_hashes[name] for name in batch if name in known_hashes},
+            )
+            try:
+                # Blobs past the response's size cap are streamed one by one
+                batch = _blob_results(stub.GetScrapingBlobsMany(request), blobs, errors)
+            except grpc.RpcError as e:
+                if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                    raise
+                no_batching()
+        for name in batch:
+            try:
+                blobs[name] = stream_blob(name, known_hashes.get(name), stub)
+            except grpc.RpcError as e:
+                errors[name] = rpc_error(e)
+            except BlobStreamError as e:
+                errors[name] = str(e)
+    return blobs, errors
+
+
+async def scraping_done_many_async(stub: ScrapeServiceStub, names: Sequence[str]
+                                   ) -> Tuple[Dict[str, bool], Dict[str, str]]:
+    """scraping_done_many on a scrape_channel.aio_stub()"""
+    done, errors = {}, {}
+
+    async def one(name: str):
+        try:
+            done[name] = (await stub.IsScrapingDone(ScrapeStatusRequest(name=name))).is_done
+        except grpc.aio.AioRpcError as e:
+            errors[name] = rpc_error(e)
+
+    for batch in batches(names):
+        if scrape_channel.batching:
+            try:
+                _status_results(await stub.IsScrapingDoneMany(ScrapeStatusManyRequest(names=batch)), done, errors)
+                continue
+            except grpc.aio.AioRpcError as e:
+                if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                    raise
+                no_batching()
+        await asyncio.gather(*(one(name) for name in batch))
+    return done, errors
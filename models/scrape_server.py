@@ -0,0 +1,274 @@
+"""Stand-in scrape service for development and load tests.
+
+Implements ScrapeService without touching the network. ``Scrape`` marks a
+site busy for a random delay, ``IsScrapingDone`` reports whether that delay
+has passed and ``GetScrapingBlob`` returns a deterministic fake page in the
+real service's blob format. ``StreamScrapingBlob`` is the reference for the
+streaming protocol: one ScrapeBlobInfo with the blob's size and SHA-256,
+then the UTF-8 bytes in ``SCRAPE_CHUNK_KB`` chunks, numbered from 0 (or,
+for a caller naming the blob it has, possibly a delta against that one).
+``IsScrapingDoneMany`` and ``GetScrapingBlobsMany`` answer for many names
+at once and report failures per name rather than failing the call; blobs
+past ``SCRAPE_BATCH_MAX_KB`` in one response are marked withheld, for the
+caller to stream.
+``WatchScrapes`` pushes a versioned RUNNING event when a scrape starts and
+DONE (with the blob's SHA-256) when it finishes. A share of sites can be
+made to fail, to exercise error handling.
+
+``ScrapeServiceBase`` holds everything but ``Scrape`` and is shared with the
+crawling service in models/scrape_service.py.
+
+Usage:
+    python -m models.scrape_server                      # on SCRAPE_SERVICE_TARGET's port
+    python -m models.scrape_server --port 5299 --delay 0.5 --fail-rate 0.1
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+import grpc
+
+from config import settings
+from models.scrape_client import PROTO_DIR  # noqa: F401 (puts the generated modules on the path)
+from proto import scrape_pb2, scrape_pb2_grpc
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeServiceBase(scrape_pb2_grpc.ScrapeServiceServicer, ABC):
+    """Every ScrapeService method but Scrape, on top of is_done and blob
+
+    Subclasses implement ``Scrape``, ``is_done(name)`` and ``blob(name)``
+    (raising LookupError for unknown names and RuntimeError for failed
+    scrapes) and call ``publish`` on every state change for WatchScrapes.
+    """
+
+    def __init__(self, chunk_kb: int = settings.SCRAPE_CHUNK_KB, batch_max_kb: int = settings.SCRAPE_BATCH_MAX_KB):
+        self.chunk_size = chunk_kb * 1024
+        self.batch_max_bytes = batch_max_kb * 1024
+        # WatchScrapes: the latest event per name and a queue per open watch
+        self.instance = uuid.uuid4().hex
+        self.version = 0
+        self.events: Dict[str, scrape_pb2.ScrapeEvent] = {}
+        self.watchers: Set[asyncio.Queue] = set()
+
+    @abstractmethod
+    def is_done(self, name: str) -> bool:
+        """Whether the scrape of ``name`` has finished, successfully or not"""
+
+    @abstractmethod
+    def blob(self, name: str) -> str:
+        """The blob of the last finished scrape of ``name``"""
+
+    def delta(self, name: str, base_sha256: str) -> Optional[str]:
+        """The changes from the blob ``base_sha256`` to the current one, if known"""
+        return None
+
+    def publish(self, name: str, state, **fields):
+        self.version += 1
+        event = self.events[name] = scrape_pb2.ScrapeEvent(
+            name=name, state=state, version=self.version, instance=self.instance, **fields,
+        )
+        for queue in self.watchers:
+            queue.put_nowait(event)
+
+    @staticmethod
+    async def abort(context, error: Exception):
+        code = grpc.StatusCode.NOT_FOUND if isinstance(error, LookupError) else grpc.StatusCode.INTERNAL
+        await context.abort(code, str(error))
+
+    async def IsScrapingDone(self, request, context):
+        try:
+            return scrape_pb2.ScrapeStatusResponse(is_done=self.is_done(request.name))
+        except (LookupError, RuntimeError) as e:
+            await self.abort(context, e)
+
+    async def GetScrapingBlob(self, request, context):
+        try:
+            return scrape_pb2.ScrapeBlobResponse(json_blob=self.blob(request.name))
+        except (LookupError, RuntimeError) as e:
+            await self.abort(context, e)
+
+    async def IsScrapingDoneMany(self, request, context):
+        results = []
+        for name in request.names:
+            try:
+                results.append(scrape_pb2.ScrapeStatusResult(name=name, is_done=self.is_done(name)))
+            except (LookupError, RuntimeError) as e:
+                results.append(scrape_pb2.ScrapeStatusResult(name=name, error=str(e)))
+        return scrape_pb2.ScrapeStatusManyResponse(results=results)
+
+    async def GetScrapingBlobsMany(self, request, context):
+        results = []
+        sent = 0
+        for name in request.names:
+            try:
+                blob = self.blob(name)
+            except (LookupError, RuntimeError) as e:
+                results.append(scrape_pb2.ScrapeBlobResult(name=name, error=str(e)))
+                continue
+            data = blob.encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()
+            result = scrape_pb2.ScrapeBlobResult(name=name, sha256=digest, size=len(data))
+            if request.known_sha256.get(name) == digest:
+                result.unchanged = True
+            elif sent + len(data) > self.batch_max_bytes:
+                result.withheld = True
+            else:
+                result.json_blob = blob
+                sent += len(data)
+            results.append(result)
+        return scrape_pb2.ScrapeBlobsManyResponse(results=results)
+
+    async def StreamScrapingBlob(self, request, context):
+        try:
+            data = self.blob(request.name).encode("utf-8")
+        except (LookupError, RuntimeError) as e:
+            await self.abort(context, e)
+        digest = hashlib.sha256(data).hexdigest()
+        info = scrape_pb2.ScrapeBlobInfo(size=len(data), sha256=digest, chunk_size=self.chunk_size)
+        # A caller holding the previous blob gets only what changed since
+        delta = self.delta(request.name, request.base_sha256) if request.base_sha256 not in ("", digest) else None
+        if delta is not None:
+            data = delta.encode("utf-8")
+            info = scrape_pb2.ScrapeBlobInfo(
+                size=len(data), sha256=hashlib.sha256(data).hexdigest(), chunk_size=self.chunk_size,
+                base_sha256=request.base_sha256, full_sha256=digest,
+            )
+        yield scrape_pb2.ScrapeBlobChunk(info=info)
+        for index, start in enumerate(range(0, len(data), self.chunk_size)):
+            yield scrape_pb2.ScrapeBlobChunk(data=data[start:start + self.chunk_size], index=index)
+
+    async def WatchScrapes(self, request, context):
+        names = set(request.names)
+        # Versions start over when the service restarts: a client of another instance gets everything
+        since = request.since_version if request.instance == self.instance else 0
+        queue = asyncio.Queue()
+        self.watchers.add(queue)
+        # Lets the client know the watch is open before there is anything to send
+        await context.send_initial_metadata(())
+        try:
+            for event in sorted(self.events.values(), key=lambda e: e.version):
+                if event.version > since and (not names or event.name in names):
+                    yield event
+            while True:
+                event = await queue.get()
+                if event.version > since and (not names or event.name in names):
+                    yield event
+        finally:
+            self.watchers.discard(queue)
+
+
+class StubScrapeService(ScrapeServiceBase):
+    """In-memory ScrapeService: scrapes finish after a random delay"""
+
+    def __init__(self, delay: float = 1.0, fail_rate: float = 0.0, page_kb: int = 100,
+                 chunk_kb: int = settings.SCRAPE_CHUNK_KB, batch_max_kb: int = settings.SCRAPE_BATCH_MAX_KB):
+        super().__init__(chunk_kb, batch_max_kb)
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.page_kb = page_kb
+        self.ready_at: Dict[str, float] = {}
+        self.urls: Dict[str, str] = {}
+        self.requested_at: Dict[str, str] = {}
+
+    @staticmethod
+    def key(url: str) -> str:
+        return url.split("://", 1)[-1].rstrip("/")
+
+    def fake_page(self, url: str) -> str:
+        """Deterministic filler text of about page_kb for a URL"""
+        rng = random.Random(hashlib.sha256(url.encode("utf-8")).digest())
+        vocabulary = [f"{rng.getrandbits(32):08x}" for _ in range(512)]
+        # Each word is 8 characters plus a space
+        return " ".join(rng.choices(vocabulary, k=self.page_kb * 1024 // 9))
+
+    async def Scrape(self, request, context):
+        key = self.key(request.url)
+        self.urls[key] = request.url
+        self.requested_at[key] = datetime.now().isoformat()
+        delay = random.uniform(0.5, 1.5) * self.delay
+        ready_at = self.ready_at[key] = time.monotonic() + delay
+        self.publish(key, scrape_pb2.ScrapeEvent.RUNNING)
+        asyncio.get_running_loop().call_later(delay, self.finish, key, ready_at)
+        return scrape_pb2.ScrapeResponse(message=f"Scraping started for {request.name}")
+
+    def finish(self, name: str, ready_at: float):
+        if self.ready_at.get(name) != ready_at:
+            return  # scraped again since
+        data = self.render_blob(name).encode("utf-8")
+        self.publish(name, scrape_pb2.ScrapeEvent.DONE, sha256=hashlib.sha256(data).hexdigest())
+
+    def is_done(self, name: str) -> bool:
+        ready_at = self.ready_at.get(name)
+        if ready_at is None:
+            raise LookupError(f"No scrape requested for {name}")
+        return time.monotonic() >= ready_at
+
+    def blob(self, name: str) -> str:
+        """The blob of the last scrape of a site; the same until it is scraped again"""
+        url = self.urls.get(name)
+        if url is None:
+            raise LookupError("File not found")
+        if random.random() < self.fail_rate:
+            raise RuntimeError("Stand-in failure")
+        return self.render_blob(name)
+
+    def render_blob(self, name: str) -> str:
+        url = self.urls[name]
+        blob = {
+            "Name": name,
+            "url": url,
+            "data": self.fake_page(url),
+            "time": self.requested_at[name],
+        }
+        return json.dumps(blob, indent=4)
+
+
+async def serve(servicer, port: int) -> grpc.aio.Server:
+    server = grpc.aio.server(compression=grpc.Compression.Gzip if settings.SCRAPE_GZIP else None)
+    scrape_pb2_grpc.add_ScrapeServiceServicer_to_server(servicer, server)
+    server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    logger.info(f"{type(servicer).__name__} listening on port {port}")
+    return server
+
+
+def main(argv=None):
+    default_port = int(settings.SCRAPE_SERVICE_TARGET.rsplit(":", 1)[-1])
+    parser = argparse.ArgumentParser(description="Run a stand-in scrape service")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--delay", type=float, default=1.0, help="mean seconds until a scrape is done")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of blob downloads that fail")
+    parser.add_argument("--page-kb", type=int, default=100, help="size of each fake page")
+    parser.add_argument("--chunk-kb", type=int, default=settings.SCRAPE_CHUNK_KB, help="StreamScrapingBlob chunk size")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    async def run():
+        server = await serve(StubScrapeService(args.delay, args.fail_rate, args.page_kb, args.chunk_kb), args.port)
+        await server.wait_for_termination()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
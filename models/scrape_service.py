@@ -0,0 +1,118 @@
+"""The in-repo scrape service: ScrapeService backed by the crawler in models/crawler.py.
+
+``Scrape`` starts a crawl of the site (unless one is running), named like
+the stored scrapes by its URL without scheme; ``IsScrapingDone``, the blob
+methods and ``WatchScrapes`` come from ScrapeServiceBase and read the
+crawler's job store. ``StreamScrapingBlob`` sends a caller holding the
+previous blob of a site only the pages that changed since. Jobs survive
+restarts: on start the service publishes every stored job's state and
+resumes the crawls that were unfinished.
+
+Usage:
+    python -m models.scrape_service                      # on SCRAPE_SERVICE_TARGET's port
+    python -m models.scrape_service --port 5200 --db data/crawler.db
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Optional
+
+import grpc
+
+from config import settings
+from models.crawler import Crawler, CrawlJob, CrawlStore, normalize_url
+from models.scrape_server import ScrapeServiceBase, serve
+from models.scrapes import url_key
+from proto import scrape_pb2
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlerScrapeService(ScrapeServiceBase):
+    """ScrapeService whose scrapes are crawls"""
+
+    def __init__(self, store: CrawlStore, chunk_kb: int = settings.SCRAPE_CHUNK_KB):
+        super().__init__(chunk_kb)
+        self.store = store
+        self.crawler = Crawler(store, on_finish=self.publish_job)
+        for job in store.jobs():
+            self.publish_job(job)
+
+    def publish_job(self, job: CrawlJob):
+        if job.state == "running":
+            self.publish(job.name, scrape_pb2.ScrapeEvent.RUNNING)
+        elif job.state == "done":
+            self.publish(job.name, scrape_pb2.ScrapeEvent.DONE, sha256=job.blob_sha256)
+        else:
+            self.publish(job.name, scrape_pb2.ScrapeEvent.FAILED, error=job.error)
+
+    async def Scrape(self, request, context):
+        url = request.url.strip()
+        if "://" not in url:
+            url = f"http://{url}"
+        url = normalize_url(url)
+        if url is None:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Not an http(s) URL: {request.url}")
+        name = url_key(request.url)
+        if not self.crawler.start(name, url):
+            return scrape_pb2.ScrapeResponse(message=f"Already scraping {request.name}")
+        self.publish(name, scrape_pb2.ScrapeEvent.RUNNING)
+        return scrape_pb2.ScrapeResponse(message=f"Scraping started for {request.name}")
+
+    def job(self, name: str) -> CrawlJob:
+        job = self.store.job(name)
+        if job is None:
+            raise LookupError(f"No scrape requested for {name}")
+        return job
+
+    def is_done(self, name: str) -> bool:
+        return self.job(name).state != "running"
+
+    def blob(self, name: str) -> str:
+        """The blob of the last finished crawl, also while the site is crawled again"""
+        job = self.job(name)
+        if job.state == "failed":
+            raise RuntimeError(job.error)
+        blob = self.store.blob(name)
+        if blob is None:
+            raise LookupError("File not found")
+        return blob
+
+    def delta(self, name: str, base_sha256: str) -> Optional[str]:
+        return self.store.delta(name, base_sha256)
+
+
+def main(argv=None):
+    default_port = int(settings.SCRAPE_SERVICE_TARGET.rsplit(":", 1)[-1])
+    parser = argparse.ArgumentParser(description="Run the crawling scrape service")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--db", default=settings.CRAWL_DB_PATH, help="SQLite file for crawl jobs")
+    parser.add_argument("--chunk-kb", type=int, default=settings.SCRAPE_CHUNK_KB, help="StreamScrapingBlob chunk size")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    async def run():
+        servicer = CrawlerScrapeService(CrawlStore(args.db), args.chunk_kb)
+        server = await serve(servicer, args.port)
+        servicer.crawler.resume()
+        try:
+            await server.wait_for_termination()
+        finally:
+            await servicer.crawler.aclose()
+            servicer.store.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Keep stored scrapes current from the scrape service's WatchScrapes stream.
+
+Pages used to learn about finished scrapes by calling ``IsScrapingDone``
+and ``GetScrapingBlob`` on every render. ``scrape_watcher`` instead follows
+``WatchScrapes`` on a background thread: each DONE event whose blob hash
+differs from the latest stored one is streamed into storage (see
+models/scrapes.py), and every event's state is kept in memory. Renders read
+the database and ``scrape_watcher.state(name)``, and make no gRPC calls.
+
+The watch resumes from the last version it saw after a dropped connection,
+retrying with exponential backoff; versions belong to one run of the
+service, and a restarted one replays everything. A service without ``WatchScrapes`` is
+noted, and the pages go back to fetching blobs themselves.
+
+Usage::
+
+    if scrape_watcher.start():          # once per process; cheap afterwards
+        event = scrape_watcher.state(name)
+"""
+import atexit
+import logging
+import random
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+import grpc
+
+from config import settings
+from models.scrape_client import BlobStreamError, rpc_error, scrape_channel, stream_blob
+from models.scrapes import latest_hash, save_compressed_scrape
+from proto.scrape_pb2 import ScrapeEvent, WatchScrapesRequest  # on the path via scrape_client
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeWatcher:
+    """Background thread following WatchScrapes"""
+
+    def __init__(self):
+        self.instance = ""
+        self.version = 0
+        self.states: Dict[str, ScrapeEvent] = {}
+        self.counts = Counter()
+        self.connected = False
+        self.supported = True
+        self.last_error: Optional[str] = None
+        self._call = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        """Start the thread unless it is running; False if the service cannot push"""
+        if not settings.SCRAPE_WATCH or not self.supported:
+            return False
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                # Open the channel first: atexit handlers run in reverse, so the watch
+                # is stopped before the channel is closed and ends quietly
+                scrape_channel.channel
+                atexit.register(self.stop)
+                self._thread = threading.Thread(target=self.run, name="scrape-watcher", daemon=True)
+                self._thread.start()
+        return True
+
+    def stop(self):
+        self._stopping.set()
+        call = self._call
+        if call is not None:
+            call.cancel()
+
+    def state(self, name: str) -> Optional[ScrapeEvent]:
+        return self.states.get(name)
+
+    def run(self):
+        delay = 1.0
+        while not self._stopping.is_set():
+            try:
+                self._call = scrape_channel.stub.WatchScrapes(WatchScrapesRequest(
+                    since_version=self.version, instance=self.instance,
+                ))
+                # Headers arrive as soon as the service accepts the watch, before any event
+                self._call.initial_metadata()
+                self.connected = True
+                delay = 1.0
+                for event in self._call:
+                    self.handle(event)
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                    logger.info(f"{scrape_channel.target} has no WatchScrapes, pages will fetch blobs themselves")
+                    self.supported = False
+                    return
+                if e.code() != grpc.StatusCode.CANCELLED or not self._stopping.is_set():
+                    self.last_error = rpc_error(e)
+                    logger.warning(f"Scrape watch lost ({self.last_error}), retrying in {delay:.0f}s")
+            finally:
+                self._call = None
+                self.connected = False
+            self._stopping.wait(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, settings.SCRAPE_WATCH_RETRY_MAX)
+
+    def handle(self, event: ScrapeEvent):
+        if event.instance != self.instance:
+            # The service restarted and replays its state with new versions
+            self.instance, self.version = event.instance, 0
+        if event.version <= self.version:
+            return  # seen before a reconnect
+        self.version = event.version
+        self.states[event.name] = event
+        self.counts[ScrapeEvent.State.Name(event.state)] += 1
+        if event.state == ScrapeEvent.DONE:
+            self.refresh(event)
+
+    def refresh(self, event: ScrapeEvent):
+        """Store the finished scrape's blob, unless it is already the latest one"""
+        try:
+            known_hash = latest_hash(event.name)
+            if event.sha256 and event.sha256 == known_hash:
+                self.counts["unchanged"] += 1
+                return
+            blob = stream_blob(event.name, known_hash)
+            if blob.received is not None:
+                self.counts["deltas"] += 1
+            if not blob.skipped and blob.size and save_compressed_scrape(
+                    event.name, blob.sha256, blob.size, blob.codec, blob.data):
+                self.counts["stored"] += 1
+            else:
+                self.counts["unchanged"] += 1
+        except grpc.RpcError as e:
+            self.counts["failed"] += 1
+            self.last_error = f"{event.name}: {rpc_error(e)}"
+            logger.warning(f"Could not fetch the scrape of {event.name}: {rpc_error(e)}")
+        except (BlobStreamError, sqlite3.Error) as e:
+            self.counts["failed"] += 1
+            self.last_error = f"{event.name}: {e}"
+            logger.warning(f"Could not store the scrape of {event.name}: {e}")
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "connected": self.connected,
+            "supported": self.supported,
+            "version": self.version,
+            "names": len(self.states),
+            "events": dict(self.counts),
+            "last_error": self.last_error,
+        }
+
+
+scrape_watcher = ScrapeWatcher()
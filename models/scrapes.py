@@ -0,0 +1,230 @@
+"""Scrape history, stored once per distinct blob.
+
+Each scrape of a company is a ``scraping_data`` row (company, blob hash,
+time). The blob itself lives in ``scrape_blobs`` under the SHA-256 of its
+text, compressed (see models/compression.py), so repeated identical scrapes
+cost one small row each. Only the last ``SCRAPE_KEEP_VERSIONS`` scrapes per
+company are kept, and blobs no scrape points at any more are deleted.
+
+Blobs streamed from the scrape service arrive already compressed and
+hashed and are stored with ``save_compressed_scrape``. When the service
+sends only what changed since the latest stored blob, ``merge_delta``
+rebuilds the full blob from that one first (see models/scrape_blob.py), so
+an unchanged site stores nothing and a changed one a blob like any other.
+
+A new blob is decoded once as it is stored: its name, URL and time go into
+columns of ``scrape_blobs`` and every page into a ``scrape_pages`` row, so
+``scrape_pages`` and ``latest_records`` read fields without touching the
+blob. A blob that arrives compressed is decoded as it is decompressed, a
+chunk at a time, so its text is not held whole here either. ``load_text`` decompresses a single blob for callers that need it
+whole.
+"""
+import logging
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from models.compression import compress, content_hash, decompress, decompress_chunks
+from models.database import get_db_connection
+from models.query_cache import cached_fetch_all, invalidate
+from models.scrape_blob import DeltaError, ScrapedPage, ScrapeRecord, StreamedRecord, apply_delta, decode
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Scrape:
+    id: int
+    company_name: str
+    blob_hash: str
+    scraped_at: float
+    size: int  # uncompressed bytes
+    site_url: Optional[str] = None
+    page_count: Optional[int] = None
+
+
+def url_key(url: str) -> str:
+    """The name a site's scrapes are stored under: its URL without scheme or trailing slash"""
+    return re.sub(r"^https?://", "", url.strip()).rstrip("/")
+
+
+def latest_hash(company_name: str) -> Optional[str]:
+    """Blob hash of the company's latest scrape"""
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT blob_hash FROM scraping_data WHERE company_name = ? ORDER BY id DESC LIMIT 1",
+            (company_name,),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def save_scrape(
+        company_name: str,
+        text: str,
+        scraped_at: Optional[float] = None,
+        keep: int = settings.SCRAPE_KEEP_VERSIONS,
+) -> bool:
+    """Record a scrape; False if it is identical to the company's latest one"""
+    digest = content_hash(text)
+    # Only compressed if the blob is not stored yet
+    return _record(
+        company_name, digest,
+        lambda conn: _store(conn, digest, len(text.encode("utf-8")), *compress(text), decode(text)),
+        scraped_at, keep,
+    )
+
+
+def save_compressed_scrape(
+        company_name: str,
+        digest: str,
+        size: int,
+        codec: str,
+        data: bytes,
+        scraped_at: Optional[float] = None,
+        keep: int = settings.SCRAPE_KEEP_VERSIONS,
+) -> bool:
+    """save_scrape for a blob compressed on the way in (see compression.StreamCompressor)"""
+    return _record(company_name, digest, lambda conn: _store_streamed(conn, digest, size, codec, data),
+                   scraped_at, keep)
+
+
+def _record(company_name: str, digest: str, store: Callable[[sqlite3.Connection], None],
+            scraped_at: Optional[float], keep: int) -> bool:
+    with get_db_connection() as conn:
+        # Take the write lock before reading: a read snapshot cannot be upgraded once
+        # another writer (e.g. a concurrent bulk scrape) has committed
+        conn.execute("BEGIN IMMEDIATE")
+        latest = conn.execute(
+            "SELECT blob_hash FROM scraping_data WHERE company_name = ? ORDER BY id DESC LIMIT 1",
+            (company_name,),
+        ).fetchone()
+        if latest and latest[0] == digest:
+            return False
+        if conn.execute("SELECT 1 FROM scrape_blobs WHERE hash = ?", (digest,)).fetchone() is None:
+            store(conn)
+        conn.execute(
+            "INSERT INTO scraping_data (company_name, blob_hash, scraped_at) VALUES (?, ?, ?)",
+            (company_name, digest, scraped_at or time.time()),
+        )
+        prune(conn, company_name, keep)
+    invalidate("scraping_data")
+    return True
+
+
+def _store(conn, digest: str, size: int, codec: str, data: bytes, record: ScrapeRecord):
+    conn.execute(
+        "INSERT INTO scrape_blobs (hash, size, codec, data, site_name, site_url, site_time, page_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (digest, size, codec, data, record.name, record.url, record.time, len(record.pages)),
+    )
+    conn.executemany(
+        "INSERT INTO scrape_pages (blob_hash, position, url, title, text) VALUES (?, ?, ?, ?, ?)",
+        [(digest, position, page.url, page.title, page.text) for position, page in enumerate(record.pages)],
+    )
+
+
+def _store_streamed(conn, digest: str, size: int, codec: str, data: bytes):
+    """_store, decoding the pages as the blob is decompressed"""
+    record = StreamedRecord(decompress_chunks(codec, data))
+    conn.execute("INSERT INTO scrape_blobs (hash, size, codec, data) VALUES (?, ?, ?, ?)", (digest, size, codec, data))
+    try:
+        conn.executemany(
+            "INSERT INTO scrape_pages (blob_hash, position, url, title, text) VALUES (?, ?, ?, ?, ?)",
+            ((digest, position, page.url, page.title, page.text) for position, page in enumerate(record.pages())),
+        )
+    except ValueError:
+        # Not a JSON object: decode() takes the whole text as one page
+        conn.execute("DELETE FROM scrape_pages WHERE blob_hash = ?", (digest,))
+        conn.execute("DELETE FROM scrape_blobs WHERE hash = ?", (digest,))
+        _store(conn, digest, size, codec, data, decode(decompress(codec, data)))
+        return
+    page_count = conn.execute("SELECT COUNT(*) FROM scrape_pages WHERE blob_hash = ?", (digest,)).fetchone()[0]
+    conn.execute(
+        "UPDATE scrape_blobs SET site_name = ?, site_url = ?, site_time = ?, page_count = ? WHERE hash = ?",
+        (record.name, record.url, record.time, page_count, digest),
+    )
+
+
+def prune(conn, company_name: str, keep: int):
+    """Drop all but the last ``keep`` scrapes of a company, then any blobs left unreferenced"""
+    old = conn.execute(
+        "SELECT id, blob_hash FROM scraping_data WHERE company_name = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+        (company_name, keep),
+    ).fetchall()
+    if not old:
+        return
+    conn.executemany("DELETE FROM scraping_data WHERE id = ?", [(row_id,) for row_id, _ in old])
+    hashes = {(digest, digest) for _, digest in old}
+    conn.executemany(
+        "DELETE FROM scrape_pages WHERE blob_hash = ? AND NOT EXISTS (SELECT 1 FROM scraping_data WHERE blob_hash = ?)",
+        hashes,
+    )
+    conn.executemany(
+        "DELETE FROM scrape_blobs WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM scraping_data WHERE blob_hash = ?)",
+        hashes,
+    )
+    logger.info(f"Pruned {len(old)} old scrapes of {company_name}")
+
+
+def list_scrapes(company_name: Optional[str] = None) -> List[Scrape]:
+    """Scrapes newest first, without their blobs"""
+    sql = """
+        SELECT s.id, s.company_name, s.blob_hash, s.scraped_at, b.size, b.site_url, b.page_count
+        FROM scraping_data AS s JOIN scrape_blobs AS b ON b.hash = s.blob_hash
+    """
+    params: tuple = ()
+    if company_name is not None:
+        sql += " WHERE s.company_name = ?"
+        params = (company_name,)
+    sql += " ORDER BY s.id DESC"
+    return [Scrape(*row) for row in cached_fetch_all(sql, params, tables=("scraping_data",))]
+
+
+@lru_cache(maxsize=32)
+def load_text(blob_hash: str) -> Optional[str]:
+    """Decompress one blob; blobs never change, so the result is cached by hash"""
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT codec, data FROM scrape_blobs WHERE hash = ?", (blob_hash,)).fetchone()
+    return decompress(*row) if row else None
+
+
+def merge_delta(base_hash: str, delta: str) -> str:
+    """The blob a delta from the stored blob ``base_hash`` rebuilds"""
+    base = load_text(base_hash)
+    if base is None:
+        raise DeltaError(f"Delta base {base_hash[:12]} is not stored")
+    return apply_delta(base, delta)
+
+
+def scrape_pages(blob_hash: str) -> List[ScrapedPage]:
+    """The pages of a stored blob, in order"""
+    rows = cached_fetch_all(
+        "SELECT url, title, text FROM scrape_pages WHERE blob_hash = ? ORDER BY position",
+        (blob_hash,),
+        tables=("scraping_data",),
+    )
+    return [ScrapedPage(*row) for row in rows]
+
+
+def latest_records() -> List[Tuple[str, ScrapeRecord]]:
+    """(company, record) of each company's latest scrape; a blob without pages gives an empty record"""
+    with get_db_connection() as conn:
+        rows = conn.execute("""
+            SELECT s.company_name, b.site_name, b.site_url, b.site_time, p.url, p.title, p.text
+            FROM scraping_data AS s
+            JOIN scrape_blobs AS b ON b.hash = s.blob_hash
+            LEFT JOIN scrape_pages AS p ON p.blob_hash = s.blob_hash
+            WHERE s.id IN (SELECT MAX(id) FROM scraping_data GROUP BY company_name)
+            ORDER BY s.company_name, p.position
+        """).fetchall()
+    records: Dict[str, ScrapeRecord] = {}
+    for company_name, name, url, site_time, page_url, title, text in rows:
+        if company_name not in records:
+            records[company_name] = ScrapeRecord(name, url, site_time, [])
+        if text is not None:  # text is NOT NULL, so None means no page row
+            records[company_name].pages.append(ScrapedPage(page_url, title, text))
+    return list(records.items())
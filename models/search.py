@@ -0,0 +1,77 @@
+"""Full-text search over the clients and vcs tables.
+
+Both tables have an FTS5 index (``clients_fts``, ``vcs_fts``) over name, URL
+and the latest scraped page text, kept in sync by triggers (see migration 5
+in models/migrations.py). Every word of a query matches as a prefix, results
+are ranked with bm25 (name counts most, scraped text least) and pages are
+fetched with a keyset cursor, so page 100 costs the same as page 1.
+
+Usage::
+
+    rows, after = search("clients", "acc")           # first page
+    rows, after = search("clients", "acc", after)    # next page, until after is None
+"""
+import re
+from typing import List, Optional, Tuple
+
+from config import settings
+from models.database import get_db_connection
+from models.query_cache import query_cache
+
+# Searchable table -> its FTS5 index
+SEARCH_TABLES = {"clients": "clients_fts", "vcs": "vcs_fts"}
+# bm25 column weights: name, url, scraped
+WEIGHTS = (10.0, 4.0, 1.0)
+# Highlighted fragment of the scraped text around the match
+SNIPPET = "snippet({fts}, 2, '**', '**', '…', 12)"
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(
+        table: str,
+        text: str,
+        after: Optional[tuple] = None,
+        limit: int = settings.SEARCH_PAGE_SIZE,
+) -> Tuple[List[tuple], Optional[tuple]]:
+    """One page of (id, name, url, snippet) rows and the cursor for the next page.
+
+    An empty query lists everything by name. The cursor is None on the last page.
+    """
+    fts = SEARCH_TABLES[table]
+    query = fts_query(text)
+    params: list = []
+    if query:
+        weights = ", ".join(str(w) for w in WEIGHTS)
+        sql = f"""
+            SELECT t.id, t.name, t.url, {SNIPPET.format(fts=fts)}, bm25({fts}, {weights}) AS score
+            FROM {fts} JOIN {table} AS t ON t.id = {fts}.rowid
+            WHERE {fts} MATCH ?
+        """
+        params.append(query)
+        if after is not None:
+            sql += f" AND (bm25({fts}, {weights}), t.id) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY score, t.id LIMIT ?"
+    else:
+        sql = f"SELECT id, name, url, '', name FROM {table}"
+        if after is not None:
+            sql += " WHERE (name, id) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY name, id LIMIT ?"
+    params.append(limit + 1)
+
+    def load():
+        with get_db_connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # The index also holds scraped text, so a new scrape changes results too
+    rows = query_cache.get_or_load((sql, tuple(params)), (table, "scraping_data"), load)
+    if len(rows) <= limit:
+        return [row[:4] for row in rows], None
+    last = rows[limit - 1]
+    return [row[:4] for row in rows[:limit]], (last[4], last[0])
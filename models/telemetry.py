@@ -0,0 +1,191 @@
+"""Per-call telemetry for every LLM invocation.
+
+Each call records model, page, session, token counts, time-to-first-token,
+total latency, whether the prompt prefix was reused from Ollama's cache,
+cost and outcome. Records are queued in memory and a background thread
+writes them to the ``llm_calls`` table in batches, so a page never waits on
+SQLite. When the queue is full new records are dropped and counted rather
+than blocking the caller.
+
+Usage::
+
+    with track(model, session_id=session_id, page="auto") as call:
+        ...
+        call.first_token()
+        call.prompt_tokens, call.completion_tokens = 120, 45
+"""
+import asyncio
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from config import settings
+from models.database import connect, init_schema, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+INSERT = """
+INSERT INTO llm_calls (ts, model, kind, page, session_id, prompt_tokens, completion_tokens,
+                       ttft_ms, latency_ms, cache_hit, cost, status)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+@dataclass
+class LLMCall:
+    model: str
+    kind: str = "chat"
+    page: str = ""
+    session_id: str = ""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    ttft: Optional[float] = None  # seconds
+    latency: Optional[float] = None  # seconds
+    cache_hit: Optional[bool] = None
+    status: str = "ok"
+    ts: float = field(default_factory=time.time)
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    @property
+    def cost(self) -> float:
+        """USD, from settings.MODEL_PRICES; local models cost nothing"""
+        model = self.model.split("/", 1)[-1]
+        input_price, output_price = settings.MODEL_PRICES.get(model, (0.0, 0.0))
+        return (self.prompt_tokens * input_price + self.completion_tokens * output_price) / 1e6
+
+    def as_row(self) -> tuple:
+        return (
+            self.ts,
+            self.model,
+            self.kind,
+            self.page,
+            self.session_id,
+            self.prompt_tokens,
+            self.completion_tokens,
+            None if self.ttft is None else int(self.ttft * 1000),
+            None if self.latency is None else int(self.latency * 1000),
+            None if self.cache_hit is None else int(self.cache_hit),
+            self.cost,
+            self.status,
+        )
+
+
+class TelemetryWriter:
+    """Background thread writing queued calls to SQLite with executemany"""
+
+    def __init__(
+            self,
+            db_path=settings.DB_PATH,
+            batch_size: int = settings.TELEMETRY_BATCH_SIZE,
+            flush_interval: float = settings.TELEMETRY_FLUSH_INTERVAL,
+            max_queue: int = 10000,
+    ):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-telemetry", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def submit(self, call: LLMCall):
+        self._start()
+        try:
+            self._queue.put_nowait(call.as_row())
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first=None) -> List[tuple]:
+        rows = [] if first is None else [first]
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, conn: sqlite3.Connection, rows: List[tuple]):
+        try:
+            with conn:
+                conn.executemany(INSERT, rows)
+            self.written += len(rows)
+        except sqlite3.Error as e:
+            self.dropped += len(rows)
+            logger.error(f"Failed to write {len(rows)} telemetry records: {e}")
+
+    def _run(self):
+        # The writer keeps its own connection for the life of the process
+        conn = connect(self.db_path)
+        init_schema(conn)
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            rows = self._drain(first)
+            # Give a trickle of calls a moment to fill the batch
+            if len(rows) < self.batch_size:
+                time.sleep(min(0.5, self.flush_interval))
+                rows += self._drain()
+            self._write(conn, rows)
+            for _ in rows:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """Wait (up to ``timeout``) until everything queued so far is written"""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+writer = TelemetryWriter()
+
+
+@contextmanager
+def track(model: str, session_id: str = "", page: str = "", kind: str = "chat", record: bool = True):
+    """Time an LLM call and queue its record once the block exits (unless ``record`` is False)"""
+    call = LLMCall(model=model, kind=kind, page=page, session_id=session_id)
+    try:
+        yield call
+    except (asyncio.CancelledError, GeneratorExit):
+        call.status = "cancelled"
+        raise
+    except BaseException:
+        call.status = "error"
+        raise
+    finally:
+        call.latency = time.perf_counter() - call.started
+        if record and settings.TELEMETRY_ENABLED:
+            writer.submit(call)
+
+
+def load_calls(since: float) -> List[Dict]:
+    """Calls recorded since a UNIX timestamp, oldest first"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.execute("SELECT * FROM llm_calls WHERE ts >= ? ORDER BY ts", (since,))
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to load telemetry: {e}")
+        return []
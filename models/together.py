@@ -0,0 +1,12 @@
+"""Together AI adapter (OpenAI-compatible API)"""
+from models.openai import OpenAIProvider
+
+
+class TogetherProvider(OpenAIProvider):
+    name = "together"
+    base_url = "https://api.together.xyz/v1"
+    api_key_env = "TOGETHER_API_KEY"
+    models = [
+        "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo",
+        "meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo",
+    ]
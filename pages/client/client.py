@@ -1,20 +1,18 @@
 import streamlit as st
 import sqlite3
 
-
-# Function to get database connection
-def get_db_connection():
-    conn = sqlite3.connect("user.db")
-    return conn
+from models.database import get_db_connection
+from models.query_cache import invalidate
+from models.search import search
+from pages.client.scrape_all import fetch_site, render_bulk_scrape
+from pages.user.bulk import render_bulk_tools
 
 
 # Function to remove a client
 def remove_client(client_id):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM clients WHERE id = ?", (client_id,))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM clients WHERE id = ?", (client_id,))
+    invalidate("clients")
 
 
 # Function to edit a client (placeholder for now)
@@ -24,11 +22,10 @@ def edit_client(client_id):
     if 'edit_client_id' in st.session_state:
         st.title("Edit Client")
         # Fetch current client details
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute("SELECT name, url FROM clients WHERE id = ?", (st.session_state['edit_client_id'],))
-        client = c.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT name, url FROM clients WHERE id = ?", (st.session_state['edit_client_id'],))
+            client = c.fetchone()
 
         with st.form(key="edit_client_form"):
             company_name = st.text_input("Client Company Name", value=client[0] if client else '')
@@ -36,46 +33,22 @@ def edit_client(client_id):
             submit_button = st.form_submit_button(label="Update Client")
 
             if submit_button:
-                conn = get_db_connection()
-                c = conn.cursor()
                 try:
-                    c.execute(
-                        "UPDATE clients SET name = ?, url = ? WHERE id = ?",
-                        (company_name, company_url, st.session_state['edit_client_id'])
-                    )
-                    conn.commit()
+                    with get_db_connection() as conn:
+                        conn.execute(
+                            "UPDATE clients SET name = ?, url = ? WHERE id = ?",
+                            (company_name, company_url, st.session_state['edit_client_id'])
+                        )
+                    invalidate("clients")
                     st.success("Client updated successfully!")
                     del st.session_state['edit_client_id']
                     st.rerun()
                 except sqlite3.IntegrityError:
                     st.warning("Client update failed!")
-                finally:
-                    conn.close()
 
-# Function to edit a client (placeholder for now)
+# Function to scrape a client's site in the background
 def fetch_client(client_id):
-    st.session_state['edit_client_id'] = client_id
-
-
-# Initialize database and create table
-def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS clients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            url TEXT NOT NULL
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
-
-
-# Initialize the database
-init_db()
+    fetch_site("clients", client_id)
 
 
 # Streamlit app
@@ -85,14 +58,18 @@ st.title("Client Management")
 # Search clients
 search_query = st.text_input("Search Clients")
 
+# Keyset pagination: one cursor per page visited, reset when the search changes
+if st.session_state.get("client_search") != search_query:
+    st.session_state["client_search"] = search_query
+    st.session_state["client_cursors"] = [None]
+cursors = st.session_state["client_cursors"]
+
 # Retrieve and display clients from the database
-conn = get_db_connection()
-c = conn.cursor()
-c.execute(
-    "SELECT id, name, url FROM clients WHERE name LIKE ?", ("%" + search_query + "%",)
-)
-filtered_clients = c.fetchall()
-conn.close()
+try:
+    filtered_clients, next_cursor = search("clients", search_query, after=cursors[-1])
+except sqlite3.Error as e:
+    st.error(f"Database error: {e}")
+    filtered_clients, next_cursor = [], None
 
 st.write("### Client List")
 if filtered_clients:
@@ -100,6 +77,8 @@ if filtered_clients:
         col1, col2, col3, col4, col5 = st.columns([1, 4, 1, 1, 1])
         col1.write(client[1])  # Name
         col2.write(client[2])  # URL
+        if client[3]:
+            col2.caption(client[3])  # Matching scraped text
 
         if col3.button(
                 "Remove",
@@ -125,6 +104,15 @@ if filtered_clients:
 else:
     st.write("No clients found.")
 
+col_prev, col_page, col_next = st.columns([1, 4, 1])
+if col_prev.button("Previous", key="client_prev", disabled=len(cursors) == 1):
+    cursors.pop()
+    st.rerun()
+col_page.caption(f"Page {len(cursors)}")
+if col_next.button("Next", key="client_next", disabled=next_cursor is None):
+    cursors.append(next_cursor)
+    st.rerun()
+
 # Add new client form
 st.title("Add Client")
 with st.form(key="client_form"):
@@ -134,17 +122,16 @@ with st.form(key="client_form"):
 
     # Add new client to the database if not a duplicate
     if submit_button:
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            c.execute(
-                "INSERT INTO clients (name, url) VALUES (?, ?)", (company_name, company_url)
-            )
-            conn.commit()
+            with get_db_connection() as conn:
+                conn.execute(
+                    "INSERT INTO clients (name, url) VALUES (?, ?)", (company_name, company_url)
+                )
+            invalidate("clients")
             st.success("Client added successfully!")
         except sqlite3.IntegrityError:
             st.warning("Client already exists!")
-        finally:
-            conn.close()
 
+render_bulk_tools("clients", "clients")
 
+render_bulk_scrape()
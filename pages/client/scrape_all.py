@@ -0,0 +1,46 @@
+import time
+
+import streamlit as st
+
+from models import bulk_scrape
+
+
+def fetch_site(table, row_id):
+    """Scrape one client or VC in the background"""
+    site = bulk_scrape.load_site(table, row_id)
+    if site is None:
+        return
+    if bulk_scrape.start_scrape([site]) is None:
+        st.warning("A scrape is already running, try again when it finishes.")
+
+
+def render_scrape_progress(job):
+    """Progress of a bulk scrape, updated until it finishes"""
+    bar = st.progress(0.0)
+    caption = st.empty()
+    while True:
+        progress = job.progress
+        bar.progress(progress.completed / progress.total if progress.total else 1.0)
+        caption.caption(
+            f"{progress.completed}/{progress.total} sites: {progress.stored} stored, {progress.unchanged} unchanged, "
+            f"{progress.failed} failed, {progress.in_flight} in flight | "
+            f"{progress.sites_per_minute:.0f} sites/min, {progress.bytes / 1e6:.1f} MB in {progress.seconds:.0f}s"
+        )
+        if not job.running:
+            break
+        time.sleep(0.5)
+    for message in job.progress.errors:
+        st.warning(message)
+
+
+def render_bulk_scrape():
+    """Scrape-all section shared by the Client and VC pages; also shows a running Fetch"""
+    job = bulk_scrape.current_job
+    with st.expander("Scrape all clients and VCs", expanded=job is not None and job.running):
+        if job is not None and job.running:
+            if st.button("Cancel scrape", key="bulk_scrape_cancel"):
+                job.cancel()
+        elif st.button("Scrape all", key="bulk_scrape_start"):
+            job = bulk_scrape.start_scrape(bulk_scrape.load_sites())
+        if job is not None:
+            render_scrape_progress(job)
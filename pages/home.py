@@ -1,22 +1,11 @@
 import streamlit as st
-import sqlite3
 import logging
 
+from models.query_cache import cached_fetch_one
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def get_db_connection():
-    """
-    Establish a connection to the SQLite database.
-
-    Returns:
-        sqlite3.Connection: Database connection object.
-    """
-    logging.info("Establishing database connection.")
-    conn = sqlite3.connect('user.db')
-    logging.info("Database connection established.")
-    return conn
-
 def get_user_info():
     """
     Fetch user information from the database.
@@ -25,15 +14,14 @@ def get_user_info():
         tuple: A tuple containing the first name and last name of the user, or None if no user info is found.
     """
     logging.info("Fetching user information from the database.")
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT first_name, last_name FROM user_info")
-        user_info = cursor.fetchone()
-        if user_info:
-            logging.info(f"User information retrieved: {user_info}")
-        else:
-            logging.warning("No user information found in the database.")
-        return user_info
+    user_info = cached_fetch_one(
+        "SELECT first_name, last_name FROM user_info ORDER BY id LIMIT 1", tables=("user_info",)
+    )
+    if user_info:
+        logging.info(f"User information retrieved: {user_info}")
+    else:
+        logging.warning("No user information found in the database.")
+    return user_info
 
 # Fetch user info
 logging.info("Starting to fetch user information.")
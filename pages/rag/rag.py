@@ -1,5 +1,4 @@
 import os
-import sqlite3
 import streamlit as st
 from langchain.text_splitter import CharacterTextSplitter
 from langchain_community.document_loaders import TextLoader
@@ -9,10 +8,11 @@ import logging
 import shutil
 from pathlib import Path
 from typing import Optional, List
-from contextlib import contextmanager
 from chromadb.config import Settings
 from langchain_text_splitters import SentenceTransformersTokenTextSplitter
 
+from models.database import get_db_connection
+
 # Configure logging with more detailed format
 logging.basicConfig(
     level=logging.INFO,
@@ -39,28 +39,10 @@ class Config:
 config = Config()
 
 
-# Database operations
-@contextmanager
-def database_connection():
-    """Context manager for database connections"""
-    conn = None
-    try:
-        conn = sqlite3.connect(config.root_dir / "user.db")
-        yield conn
-    except sqlite3.Error as e:
-        logger.error(f"Database error: {e}")
-        st.error(f"Database error: {e}")
-        raise
-    finally:
-        if conn:
-            conn.close()
-            logger.debug("Database connection closed")
-
-
 def get_company_name() -> Optional[str]:
     """Fetch company name from database with proper error handling"""
     try:
-        with database_connection() as conn:
+        with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT company_name FROM user_info")
             result = cursor.fetchone()
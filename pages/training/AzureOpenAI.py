@@ -0,0 +1,4 @@
+from pages.training.training import render_chat_page
+
+# The model is the Azure deployment name (AZURE_OPENAI_DEPLOYMENT)
+render_chat_page(None, title="Azure OpenAI Chat", provider="azure_openai")
@@ -0,0 +1,4 @@
+from pages.training.training import render_chat_page
+
+# No fixed model: each question is routed by models.router
+render_chat_page(None, title="Auto Chat")
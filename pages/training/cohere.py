@@ -0,0 +1,3 @@
+from pages.training.training import render_chat_page
+
+render_chat_page(None, title="Cohere Chat", provider="cohere")
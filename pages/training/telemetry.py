@@ -0,0 +1,118 @@
+import time
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from models.telemetry import load_calls, writer
+
+RANGES = {
+    "Last hour": (3600, "1min"),
+    "Last 24 hours": (86400, "15min"),
+    "Last 7 days": (7 * 86400, "2h"),
+}
+
+
+def p50(series: pd.Series) -> float:
+    return series.quantile(0.5)
+
+
+def p95(series: pd.Series) -> float:
+    return series.quantile(0.95)
+
+
+def load_frame(seconds: int) -> pd.DataFrame:
+    """Calls of the selected range with derived throughput columns"""
+    df = pd.DataFrame(load_calls(time.time() - seconds))
+    if df.empty:
+        return df
+    df["time"] = pd.to_datetime(df["ts"], unit="s")
+    df["ttft_s"] = df["ttft_ms"] / 1000
+    df["latency_s"] = df["latency_ms"] / 1000
+    # Decode speed: completion tokens over the time after the first token
+    decode_s = (df["latency_ms"] - df["ttft_ms"].fillna(0)) / 1000
+    df["tokens_per_s"] = (df["completion_tokens"] / decode_s).where(decode_s > 0)
+    return df
+
+
+def model_summary(df: pd.DataFrame) -> pd.DataFrame:
+    ok = df[df["status"] == "ok"]
+    summary = ok.groupby("model").agg(
+        calls=("id", "count"),
+        prompt_tokens=("prompt_tokens", "mean"),
+        completion_tokens=("completion_tokens", "mean"),
+        ttft_p50=("ttft_s", p50),
+        ttft_p95=("ttft_s", p95),
+        latency_p50=("latency_s", p50),
+        latency_p95=("latency_s", p95),
+        tokens_per_s=("tokens_per_s", p50),
+        cache_hit_rate=("cache_hit", "mean"),
+        cost_usd=("cost", "sum"),
+    )
+    outcomes = df.pivot_table(index="model", columns="status", values="id", aggfunc="count", fill_value=0)
+    return summary.join(outcomes, how="outer").fillna(0).round(3)
+
+
+st.title("LLM Telemetry")
+
+range_label = st.selectbox("Range", list(RANGES))
+seconds, bucket = RANGES[range_label]
+df = load_frame(seconds)
+
+st.caption(f"{writer.written} calls written by this process, {writer.dropped} dropped")
+
+if df.empty:
+    st.info("No LLM calls recorded in this range yet.")
+    st.stop()
+
+ok = df[df["status"] == "ok"]
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Calls", len(df))
+col2.metric("Prompt tokens / call", f"{ok['prompt_tokens'].mean():.0f}")
+col3.metric("TTFT p95", f"{ok['ttft_s'].quantile(0.95):.2f}s" if ok["ttft_s"].notna().any() else "N/A")
+col4.metric("Cost", f"${df['cost'].sum():.4f}")
+
+st.markdown("## Per model")
+st.dataframe(model_summary(df), use_container_width=True)
+
+st.markdown("## Over time")
+over_time = (
+    ok.groupby([pd.Grouper(key="time", freq=bucket), "model"])
+    .agg(
+        calls=("id", "count"),
+        tokens_per_s=("tokens_per_s", p50),
+        ttft_p95=("ttft_s", p95),
+        latency_p50=("latency_s", p50),
+        latency_p95=("latency_s", p95),
+    )
+    .reset_index()
+)
+
+col5, col6 = st.columns(2)
+with col5:
+    fig = px.line(over_time, x="time", y="tokens_per_s", color="model", markers=True,
+                  title="Decode throughput (tokens/s, median)")
+    st.plotly_chart(fig, use_container_width=True)
+with col6:
+    fig = px.line(over_time, x="time", y="ttft_p95", color="model", markers=True,
+                  title="Time to first token (s, p95)")
+    st.plotly_chart(fig, use_container_width=True)
+
+col7, col8 = st.columns(2)
+with col7:
+    latency = over_time.melt(id_vars=["time", "model"], value_vars=["latency_p50", "latency_p95"],
+                             var_name="percentile", value_name="seconds")
+    fig = px.line(latency, x="time", y="seconds", color="model", line_dash="percentile", markers=True,
+                  title="Call latency (s, p50 and p95)")
+    st.plotly_chart(fig, use_container_width=True)
+with col8:
+    fig = px.bar(over_time, x="time", y="calls", color="model", title="Calls")
+    st.plotly_chart(fig, use_container_width=True)
+
+with st.expander("Recent calls"):
+    st.dataframe(
+        df.sort_values("ts", ascending=False)
+        .head(200)[["time", "model", "kind", "page", "prompt_tokens", "completion_tokens",
+                    "ttft_s", "latency_s", "cache_hit", "cost", "status"]],
+        use_container_width=True,
+    )
@@ -0,0 +1,257 @@
+import time
+import uuid
+import queue
+import logging
+from concurrent.futures import CancelledError
+from functools import partial
+from typing import List, Optional
+
+import streamlit as st
+
+from config import settings
+from models.chat import load_vector_store, summarize, PrefixState
+from models.memory import ConversationStore
+from models.pipeline import start_turn, cancel_turn, run_turn, run_provider_turn, turn_counts, END_OF_STREAM
+from models.hedging import run_hedged_turn, hedge_counts, ttft_snapshot
+from models.provider import get_provider, provider_snapshots, ProviderError, PROVIDERS
+from models.router import router, MODEL_PROFILES
+from models.scheduler import scheduler, SchedulerBusy
+
+# Configure logging with more detailed format
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+
+@st.cache_resource
+def get_vector_store():
+    return load_vector_store()
+
+
+def get_conversation() -> ConversationStore:
+    """Per-session conversation store, shared by all chat pages"""
+    if "chat_memory" not in st.session_state:
+        session_id = uuid.uuid4().hex
+        st.session_state.chat_memory = ConversationStore(
+            session_id, summarizer=partial(summarize, session_id=session_id), background=True,
+        )
+    return st.session_state.chat_memory
+
+
+def get_prefix_state() -> PrefixState:
+    """What this session's previous turn left in Ollama's context"""
+    if "prefix_state" not in st.session_state:
+        st.session_state.prefix_state = PrefixState()
+    return st.session_state.prefix_state
+
+
+def render_older_messages(conversation: ConversationStore):
+    """Page older messages in from the transcript table only when asked for"""
+    pages = conversation.page_count()
+    if not pages:
+        return
+    with st.expander(f"Earlier messages ({conversation.older_count})"):
+        if conversation.summary:
+            st.caption(f"Summary: {conversation.summary}")
+        if not st.toggle("Load transcript", key="load_transcript"):
+            return
+        page = st.number_input("Page (1 = most recent)", min_value=1, max_value=pages, value=1) - 1
+        for message in conversation.page(page):
+            with st.chat_message(message["role"]):
+                st.write(message["content"])
+
+
+def stream_tokens(tokens: queue.Queue, status):
+    """Yield streamed tokens, touching the page while waiting for the first one.
+
+    Every element update gives Streamlit a chance to interrupt this run when
+    the user submits a new question, navigates away or disconnects.
+    """
+    while True:
+        try:
+            token = tokens.get(timeout=0.25)
+        except queue.Empty:
+            status.caption("Thinking" + "." * (int(time.monotonic() * 2) % 4))
+            continue
+        if token is END_OF_STREAM:
+            status.empty()
+            return
+        status.empty()
+        yield token
+
+
+def hedge_backends() -> List[str]:
+    """Backends a turn can be hedged to: the local models and every configured provider's models"""
+    backends = [profile.name for profile in MODEL_PROFILES]
+    for name in PROVIDERS:
+        hosted = get_provider(name)
+        if hosted.configured:
+            backends += [f"{name}/{model}" for model in hosted.models]
+    return backends
+
+
+def render_chat_page(model: Optional[str], title: str, provider: Optional[str] = None):
+    """Render a RAG chat page. With model=None every question is routed automatically.
+
+    With a ``provider`` (see models.provider) the question goes to that hosted
+    API instead of Ollama and the model is picked on the page.
+    """
+    st.title(title)
+
+    if provider:
+        hosted = get_provider(provider)
+        if not hosted.configured:
+            st.warning(f"Set {hosted.api_key_env} (and the provider's endpoint settings) to use this page.")
+            return
+        model = st.selectbox("Model", hosted.models, index=hosted.models.index(model) if model in hosted.models else 0)
+
+    # Hedging: send late turns to a second backend as well and keep whichever answers first
+    secondary = None
+    if model is not None:
+        primary = f"{provider}/{model}" if provider else model
+        if st.toggle("Hedge slow answers", key="hedge"):
+            backends = [backend for backend in hedge_backends() if backend != primary]
+            default = backends.index(settings.HEDGE_SECONDARY) if settings.HEDGE_SECONDARY in backends else 0
+            secondary = st.selectbox("Hedge to", backends, index=default)
+
+    db = get_vector_store()
+
+    conversation = get_conversation()
+    render_older_messages(conversation)
+
+    # Display the recent chat history
+    for message in conversation.recent:
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+
+    # Chat input
+    user_input = st.chat_input("Enter your query:")
+
+    if user_input:
+        # Display user message
+        with st.chat_message("user"):
+            st.write(user_input)
+        # Stored before generating, so the question survives a failed or interrupted turn
+        summary, history = conversation.context()
+        conversation.add("user", user_input)
+
+        # Retrieval, warm-up and generation run on the shared pipeline loop;
+        # starting a turn cancels this session's previous one if it is still running
+        tokens = queue.Queue()
+        if secondary:
+            turn_coro = run_hedged_turn(
+                db,
+                user_input,
+                primary,
+                secondary,
+                conversation.session_id,
+                summary=summary,
+                history=history,
+                tokens=tokens,
+                page=title,
+            )
+        elif provider:
+            turn_coro = run_provider_turn(
+                db,
+                user_input,
+                provider,
+                model,
+                conversation.session_id,
+                summary=summary,
+                history=history,
+                tokens=tokens,
+                page=title,
+            )
+        else:
+            turn_coro = run_turn(
+                db,
+                user_input,
+                model,
+                get_prefix_state(),
+                conversation.session_id,
+                summary=summary,
+                history=history,
+                tokens=tokens,
+                page=title,
+            )
+        future = start_turn(conversation.session_id, turn_coro)
+
+        # Display assistant's message as it streams in
+        with st.chat_message("assistant"):
+            result = None
+            try:
+                st.write_stream(stream_tokens(tokens, st.empty()))
+                turn = future.result()
+                result = turn.answer
+            except SchedulerBusy as e:
+                logger.warning(f"Request not admitted: {e}")
+                st.warning("The model is busy right now, please try again in a moment.")
+            except ProviderError as e:
+                logger.error(f"Provider request failed: {e}")
+                st.error(f"{e.provider} request failed: {e}")
+            except CancelledError:
+                st.info("Generation cancelled.")
+            finally:
+                # Rerun, navigation or disconnect interrupted the page: stop generating
+                if not future.done():
+                    cancel_turn(conversation.session_id)
+
+            if result is not None:
+                stats = turn.stats
+                if secondary:
+                    st.caption(
+                        f"Answered by {turn.model}, {stats.prompt_tokens} prompt tokens, "
+                        f"{stats.completion_tokens} completion tokens"
+                    )
+                elif provider:
+                    st.caption(f"{stats.prompt_tokens} prompt tokens, {stats.completion_tokens} completion tokens")
+                else:
+                    st.caption(
+                        f"Prefilled {stats.prompt_tokens} tokens in {stats.prefill_seconds:.2f}s, "
+                        f"reused {stats.reused_tokens} cached tokens (~{stats.saved_seconds:.2f}s saved)"
+                    )
+                if turn.decision:
+                    st.caption(f"Routed to {turn.model}: {turn.decision.reason}")
+                with st.expander("Turn timeline"):
+                    st.dataframe(turn.timeline.as_rows(), use_container_width=True)
+
+        if result is not None:
+            conversation.add("assistant", result)
+
+    with st.expander("LLM queue"):
+        st.dataframe(
+            [{"model": name, **metrics} for name, metrics in scheduler.snapshot().items()],
+            use_container_width=True,
+        )
+        st.caption(", ".join(f"{count} turns {state}" for state, count in sorted(turn_counts.items())))
+        if provider:
+            st.dataframe(
+                [{"provider": name, **metrics} for name, metrics in provider_snapshots().items()],
+                use_container_width=True,
+            )
+
+    if secondary:
+        with st.expander("Hedging"):
+            st.caption(", ".join(f"{count} {outcome}" for outcome, count in sorted(hedge_counts.items())))
+            st.dataframe(ttft_snapshot(), use_container_width=True)
+
+    if model is None:
+        with st.expander("Routing decisions"):
+            st.dataframe(
+                [
+                    {
+                        "time": time.strftime("%H:%M:%S", time.localtime(d.timestamp)),
+                        "model": d.model,
+                        "complexity": round(d.complexity.score, 2),
+                        "predicted (s)": round(d.predicted_latency, 2),
+                        "actual (s)": round(d.latency, 2) if d.latency is not None else None,
+                        "fallback": d.fallback,
+                        "reason": d.reason,
+                    }
+                    for d in router.recent_decisions()
+                ],
+                use_container_width=True,
+            )
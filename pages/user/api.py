@@ -1,3 +1,4 @@
+import os
 import sys
 import logging
 
@@ -14,7 +15,8 @@ import logging
 
 import grpc
 from scrape_pb2 import ScrapeRequest, ScrapeBlobRequest, ScrapeStatusRequest
-from scrape_pb2_grpc import ScrapeServiceStub
+from models.bulk_scrape import refresh_blobs
+from models.scrape_client import scrape_channel, scraping_done_many
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -26,9 +28,8 @@ sys.path.append("proto")
 
 
 def create_stub():
-    """Create a gRPC stub (client)."""
-    channel = grpc.insecure_channel("localhost:5200")
-    return ScrapeServiceStub(channel)
+    """Return the process-wide gRPC stub (client)."""
+    return scrape_channel.stub
 
 
 def send_scrape_request(stub, name, url):
@@ -63,6 +64,32 @@ def get_scraping_blob(stub, name):
         return None
 
 
+def check_scraping_status_many(stub, names):
+    """Check many scrapes with one IsScrapingDoneMany call and return {name: is_done}."""
+    try:
+        done, errors = scraping_done_many(names, stub)
+    except grpc.RpcError as e:
+        logger.error(f"Failed to check scraping status: {e.details()}")
+        return {}
+    for name, is_done in done.items():
+        logger.info(f"Is scraping done for {name}: {is_done}")
+    for name, error in errors.items():
+        logger.error(f"Failed to check scraping status for {name}: {error}")
+    return done
+
+
+def store_scraping_blobs(stub, names):
+    """Fetch the blobs of finished scrapes with one GetScrapingBlobsMany call and store the changed ones."""
+    try:
+        stored, unchanged, errors = refresh_blobs(names, stub)
+    except grpc.RpcError as e:
+        logger.error(f"Failed to get scraping blobs: {e.details()}")
+        return
+    logger.info(f"Scraping blobs: {stored} stored, {unchanged} unchanged")
+    for name, error in errors.items():
+        logger.error(f"Failed to get scraping blob for {name}: {error}")
+
+
 def run():
     """Main function to run the gRPC client."""
     stub = create_stub()
@@ -71,12 +98,9 @@ def run():
     # send_scrape_request(stub, "EmbeddedOne", "http://embeddedone.com")
     # send_scrape_request(stub, "Soccentric", "http://soccentric.com")
 
-    # Check scraping status and get blobs
-    check_scraping_status(stub, "EmbeddedOne.com")
-    get_scraping_blob(stub, "EmbeddedOne.com")
-
-    check_scraping_status(stub, "soccentric.com")
-    get_scraping_blob(stub, "soccentric.com")
+    # Check scraping status and get blobs, one round trip each for all companies
+    done = check_scraping_status_many(stub, ["EmbeddedOne.com", "soccentric.com"])
+    store_scraping_blobs(stub, [name for name, is_done in done.items() if is_done])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+import io
+
+import streamlit as st
+
+from models.bulk import CONFLICT_MODES, FORMATS, columns, export_lines, import_records, read_records
+
+
+def render_bulk_tools(table: str, label: str):
+    """Import/export expander shared by the Products, Services, Client and VC pages"""
+    with st.expander(f"Bulk import / export {label}"):
+        st.caption(f"CSV with a header row, or JSONL objects, with the fields: {', '.join(columns(table))}")
+        uploaded = st.file_uploader("File to import", type=["csv", "jsonl", "ndjson"], key=f"bulk_file_{table}")
+        col1, col2 = st.columns(2)
+        on_conflict = col1.selectbox(
+            "Existing rows", CONFLICT_MODES, key=f"bulk_conflict_{table}",
+            help="skip keeps the stored row, update overwrites it, abort stops the import",
+        )
+        dry_run = col2.checkbox("Dry run", value=True, key=f"bulk_dry_run_{table}",
+                                help="Validate and count without saving anything")
+
+        if uploaded is not None and st.button("Import", key=f"bulk_import_{table}"):
+            fmt = "csv" if uploaded.name.lower().endswith(".csv") else "jsonl"
+            lines = io.TextIOWrapper(uploaded, encoding="utf-8-sig", newline="")
+            with st.spinner("Importing..."):
+                result = import_records(table, read_records(lines, fmt), on_conflict=on_conflict, dry_run=dry_run)
+            summary = (
+                f"{result.read} rows read: {result.inserted} inserted, {result.updated} updated, "
+                f"{result.skipped} skipped, {result.invalid} invalid "
+                f"({result.seconds:.2f}s, {result.rows_per_second:.0f} rows/s)"
+            )
+            if result.aborted:
+                st.error(f"Import stopped at a conflicting row. {summary}")
+            elif dry_run:
+                st.info(f"Dry run, nothing saved. {summary}")
+            else:
+                st.success(summary)
+            for message in result.errors:
+                st.warning(message)
+
+        st.divider()
+        fmt = st.radio("Export format", FORMATS, horizontal=True, key=f"bulk_format_{table}")
+        # Build the file only when asked, not on every rerun of the page
+        if st.button("Prepare export", key=f"bulk_export_{table}"):
+            st.session_state[f"bulk_export_data_{table}"] = (fmt, "".join(export_lines(table, fmt)))
+        prepared = st.session_state.get(f"bulk_export_data_{table}")
+        if prepared:
+            export_fmt, data = prepared
+            st.download_button(
+                f"Download {table}.{export_fmt}",
+                data=data,
+                file_name=f"{table}.{export_fmt}",
+                mime="text/csv" if export_fmt == "csv" else "application/x-ndjson",
+                key=f"bulk_download_{table}",
+            )
@@ -9,43 +9,16 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 sys.path.append(os.path.join(current_dir, 'proto'))
 
-from scrape_pb2 import ScrapeRequest, ScrapeBlobRequest, ScrapeStatusRequest
-from scrape_pb2_grpc import ScrapeServiceStub
-from contextlib import contextmanager
+from scrape_pb2 import ScrapeEvent, ScrapeRequest, ScrapeStatusRequest
+from models.database import get_db_connection
+from models.query_cache import cached_fetch_all, invalidate
+from models.scrapes import latest_hash, latest_records, list_scrapes, save_compressed_scrape, scrape_pages
+from models.scrape_client import BlobStreamError, scrape_channel, stream_blob
+from models.scrape_watch import scrape_watcher
 import re
 
 
 # Database Functions
-@contextmanager
-def get_db_connection():
-    conn = sqlite3.connect("user.db")
-    try:
-        yield conn
-    finally:
-        conn.close()
-
-
-def init_db():
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_info (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                company_name TEXT NOT NULL,
-                company_url TEXT NOT NULL,
-                company_description TEXT
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS scraping_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                company_name TEXT NOT NULL,
-                data TEXT NOT NULL
-            )
-        """)
-        conn.commit()
-
-
 def update_company_description(company_name, new_description):
     try:
         with get_db_connection() as conn:
@@ -54,7 +27,7 @@ def update_company_description(company_name, new_description):
                 "UPDATE user_info SET company_description = ? WHERE company_name = ?",
                 (new_description, company_name),
             )
-            conn.commit()
+        invalidate("user_info")
         return True
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
@@ -63,8 +36,8 @@ def update_company_description(company_name, new_description):
 
 # gRPC Functions
 def create_stub():
-    channel = grpc.insecure_channel("localhost:5200")
-    return ScrapeServiceStub(channel)
+    # Shared, long-lived channel with deadlines and retries (see models/scrape_client.py)
+    return scrape_channel.stub
 
 
 def send_scrape_request(stub, name, url):
@@ -85,29 +58,24 @@ def check_scraping_status(stub, name):
 
 def get_scraping_data():
     try:
-        with sqlite3.connect("user.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT company_name, data FROM scraping_data")
-            return cursor.fetchall()
+        return latest_records()
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         return []
 
 
 def get_scraping_blob(stub, name):
-    blob_request = ScrapeBlobRequest(name=name)
+    # Streamed and compressed on the way in; not downloaded at all if it is the stored one
     try:
-        blob_response = stub.GetScrapingBlob(blob_request)
-        return blob_response.json_blob
+        return stream_blob(name, known_hash=latest_hash(name), stub=stub)
     except grpc.RpcError as e:
         st.error(f"Failed to get scraping blob: {e.details()}")
-        return None
+    except BlobStreamError as e:
+        st.error(f"Failed to get scraping blob: {e}")
+    return None
 
 
 # Streamlit App
-init_db()
-
-
 def strip_url(url):
     # Remove 'https://' or 'http://'
     url = re.sub(r'^https?://', '', url)
@@ -119,35 +87,21 @@ def strip_url(url):
 st.header("Company Information")
 
 
-def save_scraping_data_to_db(company_name, data):
+def save_scraping_data_to_db(company_name, blob):
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT data FROM scraping_data WHERE company_name = ?",
-                (company_name,)
-            )
-            existing_data = cursor.fetchone()
-
-            if existing_data and existing_data[0] == data:
-                st.info("Data is the same as the existing data. No update needed.")
-                return False
-
-            cursor.execute(
-                "INSERT INTO scraping_data (company_name, data) VALUES (?, ?)",
-                (company_name, data)
-            )
-            conn.commit()
+        # Only store the blob if it differs from the latest one for this company
+        if blob.skipped or not save_compressed_scrape(company_name, blob.sha256, blob.size, blob.codec, blob.data):
+            st.info("Data is the same as the existing data. No update needed.")
+            return False
         return True
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         return False
 
 
-with get_db_connection() as conn:
-    cursor = conn.cursor()
-    cursor.execute("SELECT company_name, company_url, company_description FROM user_info")
-    data = cursor.fetchall()
+data = cached_fetch_all(
+    "SELECT company_name, company_url, company_description FROM user_info", tables=("user_info",)
+)
 
 for company_name, company_url, company_description in data:
     st.divider()
@@ -196,12 +150,30 @@ for company_name, company_url, company_description in data:
 # Display scraping data
 company_url = strip_url(company_url)
 st.markdown("### Company web curl info ")
-stub = create_stub()
-data = get_scraping_blob(stub, company_url)
 
-if data:
-    if save_scraping_data_to_db(company_url, data):
-        st.success("Scraping data saved to database successfully!")
+pages = []
+if scrape_watcher.start():
+    # The watcher stores finished scrapes as they are pushed; rendering only reads the database
+    event = scrape_watcher.state(company_url)
+    if event is not None:
+        st.caption(f"Last scrape: {ScrapeEvent.State.Name(event.state).lower()} (version {event.version})")
+    scrapes = list_scrapes(company_url)
+    if scrapes:
+        pages = scrape_pages(scrapes[0].blob_hash)
+else:
+    # The service cannot push: fetch the blob, which is skipped when it is the stored one
+    stub = create_stub()
+    blob = get_scraping_blob(stub, company_url)
+    if blob and blob.size:
+        if save_scraping_data_to_db(company_url, blob):
+            st.success("Scraping data saved to database successfully!")
+        pages = scrape_pages(blob.sha256)
 
 with st.expander("Scraping Data"):
-    st.write(data)
+    for page in pages:
+        st.markdown(f"**{page.title or page.url or company_url}**")
+        st.write(page.text)
+
+with st.expander("Scrape service connection"):
+    st.json(scrape_channel.snapshot())
+    st.json(scrape_watcher.snapshot())
@@ -1,80 +1,27 @@
 import sqlite3
 import yaml
 import os
+import time
 import streamlit as st
-from contextlib import contextmanager
+from dataclasses import asdict
 from typing import List, Tuple, Optional
 
-
-# Database Connection
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections."""
-    conn = None
-    try:
-        conn = sqlite3.connect("user.db")
-        yield conn
-    except sqlite3.Error as e:
-        st.error(f"Database error: {e}")
-        raise
-    finally:
-        if conn:
-            conn.close()
-
-
-# Database Initialization
-def init_db():
-    """Initialize database with necessary tables."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-
-        # Create user_info table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS user_info (
-                first_name TEXT,
-                last_name TEXT,
-                company_name TEXT,
-                position TEXT,
-                email TEXT,
-                address TEXT,
-                phone TEXT,
-                company_url TEXT
-            )
-        """
-        )
-
-        # Create products table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT
-            )
-        """
-        )
-
-        # Create services table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS service (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT
-            )
-        """
-        )
-
-        conn.commit()
+from models.query_cache import cached_fetch_all, query_cache
+from models.scrapes import latest_records, list_scrapes, scrape_pages
 
 
 def get_scraping_data():
+    """Latest scrape of each company, page by page"""
     try:
-        with sqlite3.connect("user.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT company_name, data FROM scraping_data")
-            return cursor.fetchall()
+        return [
+            {
+                "company": company_name,
+                "url": record.url,
+                "time": record.time,
+                "pages": [asdict(page) for page in record.pages],
+            }
+            for company_name, record in latest_records()
+        ]
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         return []
@@ -84,11 +31,8 @@ def get_scraping_data():
 def fetch_data(table: str, columns: List[str]) -> List[Tuple]:
     """Generic function to fetch data from any table."""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            column_names = ", ".join(columns)
-            cursor.execute(f"SELECT {column_names} FROM {table}")
-            return cursor.fetchall()
+        column_names = ", ".join(columns)
+        return cached_fetch_all(f"SELECT {column_names} FROM {table}", tables=(table,))
     except sqlite3.Error as e:
         st.error(f"Error fetching data from {table}: {e}")
         return []
@@ -198,9 +142,6 @@ def create_rag_data():
 # Main App
 st.header("Company Dashboard")
 
-# Initialize database
-init_db()
-
 # Initialize session state if needed
 if "products" not in st.session_state:
     st.session_state["products"] = []
@@ -231,14 +172,44 @@ try:
         display_items(st.session_state["services"], "Services")
 
     with tab3:
-        scraping_data = get_scraping_data()
-        for company_name, data in scraping_data:
-            st.write(f"**Company Name:** {company_name}")
-            st.write(f"**Data:** {data}")
+        scrapes = list_scrapes()
+        if not scrapes:
+            st.info("No curl data found in the database.")
+        else:
+            st.dataframe(
+                [
+                    {
+                        "Company Name": s.company_name,
+                        "Scraped": time.strftime("%Y-%m-%d %H:%M", time.localtime(s.scraped_at)),
+                        "URL": s.site_url,
+                        "Pages": s.page_count,
+                        "Size (KB)": round(s.size / 1024, 1),
+                        "Blob": s.blob_hash[:12],
+                    }
+                    for s in scrapes
+                ],
+                use_container_width=True,
+            )
+            # Only the selected scrape's pages are read
+            selected = st.selectbox(
+                "View scrape",
+                scrapes,
+                format_func=lambda s: f"{s.company_name} - "
+                                      f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(s.scraped_at))}",
+            )
+            st.write(f"**Company Name:** {selected.company_name}")
+            for page in scrape_pages(selected.blob_hash):
+                st.markdown(f"**{page.title or page.url or selected.company_name}**")
+                if page.url:
+                    st.caption(page.url)
+                st.write(page.text)
 
     if st.button("## Create RAG data "):
         create_rag_data()
 
+    with st.expander("Query cache"):
+        st.json(query_cache.snapshot())
+
 except Exception as e:
     st.error(f"An error occurred: {e}")
     st.error("Please check your database connection and try again.")
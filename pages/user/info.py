@@ -1,28 +1,14 @@
 import streamlit as st
 import logging
-import sqlite3
-from contextlib import contextmanager
 import re
 
+from models.database import get_db_connection
+from models.query_cache import cached_fetch_one, invalidate
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections"""
-    conn = None
-    try:
-        conn = sqlite3.connect('user.db')
-        yield conn
-    except sqlite3.Error as e:
-        logging.error(f"Database error: {e}")
-        raise
-    finally:
-        if conn:
-            conn.close()
-
-
 def validate_email(email):
     """Validate email format"""
     pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
@@ -41,46 +27,31 @@ def validate_url(url):
     return re.match(pattern, url) is not None
 
 
-def init_database():
-    """Initialize database and create table"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''CREATE TABLE IF NOT EXISTS user_info
-                         (first_name TEXT, last_name TEXT, company_name TEXT, 
-                          position TEXT, email TEXT, address TEXT, 
-                          phone TEXT, company_url TEXT)''')
-        conn.commit()
-
-
 def get_user_info():
     """Get user information from database"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM user_info")
-        return cursor.fetchone()
+    return cached_fetch_one("""SELECT first_name, last_name, company_name, position,
+                               email, address, phone, company_url
+                               FROM user_info ORDER BY id LIMIT 1""", tables=("user_info",))
 
 
-def save_user_info(data, is_update=False):
-    """Save or update user information"""
+def save_user_info(data):
+    """Save or update user information (a single profile row)"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        if is_update:
-            cursor.execute('''UPDATE user_info SET 
-                            first_name=?, last_name=?, company_name=?, 
-                            position=?, email=?, address=?, 
-                            phone=?, company_url=?''', data)
-        else:
-            cursor.execute('''INSERT INTO user_info 
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', data)
-        conn.commit()
+        cursor.execute('''INSERT INTO user_info (id, first_name, last_name, company_name, 
+                        position, email, address, phone, company_url)
+                        VALUES ((SELECT COALESCE(MIN(id), 1) FROM user_info), ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (id) DO UPDATE SET 
+                        first_name=excluded.first_name, last_name=excluded.last_name, 
+                        company_name=excluded.company_name, position=excluded.position, 
+                        email=excluded.email, address=excluded.address, 
+                        phone=excluded.phone, company_url=excluded.company_url''', data)
+    invalidate("user_info")
 
 
 
 st.header("User Info")
 
-# Initialize database
-init_database()
-
 # Get existing user info
 user_info = get_user_info()
 
@@ -135,7 +106,7 @@ with st.form("user_info_form"):
                 data = (first_name, last_name, company_name, position,
                         email, address, phone, company_url)
                 try:
-                    save_user_info(data, is_update=bool(user_info))
+                    save_user_info(data)
                     st.success("Information saved successfully")
                     st.session_state.edit_mode = False
                     st.rerun()
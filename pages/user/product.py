@@ -1,40 +1,23 @@
 import streamlit as st
 import sqlite3
-from contextlib import contextmanager
 
-# Database operations
-@contextmanager
-def get_db_connection():
-    conn = sqlite3.connect('user.db')
-    try:
-        yield conn
-    finally:
-        conn.close()
+from models.database import get_db_connection
+from models.query_cache import cached_fetch_all, invalidate
+from pages.user.bulk import render_bulk_tools
 
-def init_db():
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL
-            )
-        """)
-        conn.commit()
 
+# Database operations
 def insert_product(title, description):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM products WHERE title = ?", (title,))
-            if cursor.fetchone()[0] > 0:
-                return "Product with this title already exists."
             cursor.execute(
-                "INSERT INTO products (title, description) VALUES (?, ?)",
+                "INSERT INTO products (title, description) VALUES (?, ?) ON CONFLICT (title) DO NOTHING",
                 (title, description)
             )
-            conn.commit()
+            if cursor.rowcount == 0:
+                return "Product with this title already exists."
+        invalidate("products")
         return True
     except sqlite3.Error as e:
         return str(e)
@@ -44,25 +27,19 @@ def delete_product(title):
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM products WHERE title = ?", (title,))
-            conn.commit()
+        invalidate("products")
         return True
     except sqlite3.Error as e:
         return str(e)
 
 # Main execution
-# Initialize database
-init_db()
-
 # Product handling
 st.header("Product List")
 if 'products' not in st.session_state:
     st.session_state['products'] = []
 
 # Fetch products from the database
-with get_db_connection() as conn:
-    cursor = conn.cursor()
-    cursor.execute("SELECT title, description FROM products")
-    st.session_state['products'] = cursor.fetchall()
+st.session_state['products'] = cached_fetch_all("SELECT title, description FROM products", tables=("products",))
 
 import streamlit as st
 
@@ -97,4 +74,6 @@ with st.form(key='product_form'):
                 st.success("Product added successfully!")
                 st.rerun()
             else:
-                st.error(result)
\ No newline at end of file
+                st.error(result)
+
+render_bulk_tools("products", "products")
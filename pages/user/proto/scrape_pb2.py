@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12proto/scrape.proto\x12\x06scrape\"*\n\rScrapeRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0b\n\x03url\x18\x02 \x01(\t\"!\n\x0eScrapeResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"#\n\x13ScrapeStatusRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\"\'\n\x14ScrapeStatusResponse\x12\x0f\n\x07is_done\x18\x01 \x01(\x08\"!\n\x11ScrapeBlobRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\"\'\n\x12ScrapeBlobResponse\x12\x11\n\tjson_blob\x18\x01 \x01(\t2\xdf\x01\n\rScrapeService\x12\x37\n\x06Scrape\x12\x15.scrape.ScrapeRequest\x1a\x16.scrape.ScrapeResponse\x12K\n\x0eIsScrapingDone\x12\x1b.scrape.ScrapeStatusRequest\x1a\x1c.scrape.ScrapeStatusResponse\x12H\n\x0fGetScrapingBlob\x12\x19.scrape.ScrapeBlobRequest\x1a\x1a.scrape.ScrapeBlobResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12proto/scrape.proto\x12\x06scrape\"*\n\rScrapeRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0b\n\x03url\x18\x02 \x01(\t\"!\n\x0eScrapeResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"#\n\x13ScrapeStatusRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\"\'\n\x14ScrapeStatusResponse\x12\x0f\n\x07is_done\x18\x01 \x01(\x08\"6\n\x11ScrapeBlobRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x13\n\x0b\x62\x61se_sha256\x18\x02 \x01(\t\"\'\n\x12ScrapeBlobResponse\x12\x11\n\tjson_blob\x18\x01 \x01(\t\"l\n\x0eScrapeBlobInfo\x12\x0c\n\x04size\x18\x01 \x01(\x04\x12\x0e\n\x06sha256\x18\x02 \x01(\t\x12\x12\n\nchunk_size\x18\x03 \x01(\r\x12\x13\n\x0b\x62\x61se_sha256\x18\x04 \x01(\t\x12\x13\n\x0b\x66ull_sha256\x18\x05 \x01(\t\"c\n\x0fScrapeBlobChunk\x12&\n\x04info\x18\x01 \x01(\x0b\x32\x16.scrape.ScrapeBlobInfoH\x00\x12\x0e\n\x04\x64\x61ta\x18\x02 \x01(\x0cH\x00\x12\r\n\x05index\x18\x03 \x01(\rB\t\n\x07payload\"(\n\x17ScrapeStatusManyRequest\x12\r\n\x05names\x18\x01 \x03(\t\"B\n\x12ScrapeStatusResult\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0f\n\x07is_done\x18\x02 \x01(\x08\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"G\n\x18ScrapeStatusManyResponse\x12+\n\x07results\x18\x01 \x03(\x0b\x32\x1a.scrape.ScrapeStatusResult\"\xa2\x01\n\x16ScrapeBlobsManyRequest\x12\r\n\x05names\x18\x01 \x03(\t\x12\x45\n\x0cknown_sha256\x18\x02 \x03(\x0b\x32/.scrape.ScrapeBlobsManyRequest.KnownSha256Entry\x1a\x32\n\x10KnownSha256Entry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x85\x01\n\x10ScrapeBlobResult\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\tjson_blob\x18\x02 \x01(\t\x12\x0e\n\x06sha256\x18\x03 \x01(\t\x12\x0c\n\x04size\x18\x04 \x01(\x04\x12\x11\n\tunchanged\x18\x05 \x01(\x08\x12\r\n\x05\x65rror\x18\x06 \x01(\t\x12\x10\n\x08withheld\x18\x07 \x01(\x08\"D\n\x17ScrapeBlobsManyResponse\x12)\n\x07results\x18\x01 \x03(\x0b\x32\x18.scrape.ScrapeBlobResult\"M\n\x13WatchScrapesRequest\x12\x15\n\rsince_version\x18\x01 \x01(\x04\x12\r\n\x05names\x18\x02 \x03(\t\x12\x10\n\x08instance\x18\x03 \x01(\t\"\xc0\x01\n\x0bScrapeEvent\x12\x0c\n\x04name\x18\x01 \x01(\t\x12(\n\x05state\x18\x02 \x01(\x0e\x32\x19.scrape.ScrapeEvent.State\x12\x0f\n\x07version\x18\x03 \x01(\x04\x12\x0e\n\x06sha256\x18\x04 \x01(\t\x12\r\n\x05\x65rror\x18\x05 \x01(\t\x12\x10\n\x08instance\x18\x06 \x01(\t\"7\n\x05State\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0b\n\x07RUNNING\x10\x01\x12\x08\n\x04\x44ONE\x10\x02\x12\n\n\x06\x46\x41ILED\x10\x03\x32\xa1\x04\n\rScrapeService\x12\x37\n\x06Scrape\x12\x15.scrape.ScrapeRequest\x1a\x16.scrape.ScrapeResponse\x12K\n\x0eIsScrapingDone\x12\x1b.scrape.ScrapeStatusRequest\x1a\x1c.scrape.ScrapeStatusResponse\x12H\n\x0fGetScrapingBlob\x12\x19.scrape.ScrapeBlobRequest\x1a\x1a.scrape.ScrapeBlobResponse\x12J\n\x12StreamScrapingBlob\x12\x19.scrape.ScrapeBlobRequest\x1a\x17.scrape.ScrapeBlobChunk0\x01\x12W\n\x12IsScrapingDoneMany\x12\x1f.scrape.ScrapeStatusManyRequest\x1a .scrape.ScrapeStatusManyResponse\x12W\n\x14GetScrapingBlobsMany\x12\x1e.scrape.ScrapeBlobsManyRequest\x1a\x1f.scrape.ScrapeBlobsManyResponse\x12\x42\n\x0cWatchScrapes\x12\x1b.scrape.WatchScrapesRequest\x1a\x13.scrape.ScrapeEvent0\x01\x62\x06proto3')
 
 
 
@@ -24,6 +24,18 @@ _SCRAPESTATUSREQUEST = DESCRIPTOR.message_types_by_name['ScrapeStatusRequest']
 _SCRAPESTATUSRESPONSE = DESCRIPTOR.message_types_by_name['ScrapeStatusResponse']
 _SCRAPEBLOBREQUEST = DESCRIPTOR.message_types_by_name['ScrapeBlobRequest']
 _SCRAPEBLOBRESPONSE = DESCRIPTOR.message_types_by_name['ScrapeBlobResponse']
+_SCRAPEBLOBINFO = DESCRIPTOR.message_types_by_name['ScrapeBlobInfo']
+_SCRAPEBLOBCHUNK = DESCRIPTOR.message_types_by_name['ScrapeBlobChunk']
+_SCRAPESTATUSMANYREQUEST = DESCRIPTOR.message_types_by_name['ScrapeStatusManyRequest']
+_SCRAPESTATUSRESULT = DESCRIPTOR.message_types_by_name['ScrapeStatusResult']
+_SCRAPESTATUSMANYRESPONSE = DESCRIPTOR.message_types_by_name['ScrapeStatusManyResponse']
+_SCRAPEBLOBSMANYREQUEST = DESCRIPTOR.message_types_by_name['ScrapeBlobsManyRequest']
+_SCRAPEBLOBSMANYREQUEST_KNOWNSHA256ENTRY = _SCRAPEBLOBSMANYREQUEST.nested_types_by_name['KnownSha256Entry']
+_SCRAPEBLOBRESULT = DESCRIPTOR.message_types_by_name['ScrapeBlobResult']
+_SCRAPEBLOBSMANYRESPONSE = DESCRIPTOR.message_types_by_name['ScrapeBlobsManyResponse']
+_WATCHSCRAPESREQUEST = DESCRIPTOR.message_types_by_name['WatchScrapesRequest']
+_SCRAPEEVENT = DESCRIPTOR.message_types_by_name['ScrapeEvent']
+_SCRAPEEVENT_STATE = _SCRAPEEVENT.enum_types_by_name['State']
 ScrapeRequest = _reflection.GeneratedProtocolMessageType('ScrapeRequest', (_message.Message,), {
   'DESCRIPTOR' : _SCRAPEREQUEST,
   '__module__' : 'proto.scrape_pb2'
@@ -66,10 +78,90 @@ ScrapeBlobResponse = _reflection.GeneratedProtocolMessageType('ScrapeBlobRespons
   })
 _sym_db.RegisterMessage(ScrapeBlobResponse)
 
+ScrapeBlobInfo = _reflection.GeneratedProtocolMessageType('ScrapeBlobInfo', (_message.Message,), {
+  'DESCRIPTOR' : _SCRAPEBLOBINFO,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeBlobInfo)
+  })
+_sym_db.RegisterMessage(ScrapeBlobInfo)
+
+ScrapeBlobChunk = _reflection.GeneratedProtocolMessageType('ScrapeBlobChunk', (_message.Message,), {
+  'DESCRIPTOR' : _SCRAPEBLOBCHUNK,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeBlobChunk)
+  })
+_sym_db.RegisterMessage(ScrapeBlobChunk)
+
+ScrapeStatusManyRequest = _reflection.GeneratedProtocolMessageType('ScrapeStatusManyRequest', (_message.Message,), {
+  'DESCRIPTOR' : _SCRAPESTATUSMANYREQUEST,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeStatusManyRequest)
+  })
+_sym_db.RegisterMessage(ScrapeStatusManyRequest)
+
+ScrapeStatusResult = _reflection.GeneratedProtocolMessageType('ScrapeStatusResult', (_message.Message,), {
+  'DESCRIPTOR' : _SCRAPESTATUSRESULT,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeStatusResult)
+  })
+_sym_db.RegisterMessage(ScrapeStatusResult)
+
+ScrapeStatusManyResponse = _reflection.GeneratedProtocolMessageType('ScrapeStatusManyResponse', (_message.Message,), {
+  'DESCRIPTOR' : _SCRAPESTATUSMANYRESPONSE,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeStatusManyResponse)
+  })
+_sym_db.RegisterMessage(ScrapeStatusManyResponse)
+
+ScrapeBlobsManyRequest = _reflection.GeneratedProtocolMessageType('ScrapeBlobsManyRequest', (_message.Message,), {
+
+  'KnownSha256Entry' : _reflection.GeneratedProtocolMessageType('KnownSha256Entry', (_message.Message,), {
+    'DESCRIPTOR' : _SCRAPEBLOBSMANYREQUEST_KNOWNSHA256ENTRY,
+    '__module__' : 'proto.scrape_pb2'
+    # @@protoc_insertion_point(class_scope:scrape.ScrapeBlobsManyRequest.KnownSha256Entry)
+    })
+  ,
+  'DESCRIPTOR' : _SCRAPEBLOBSMANYREQUEST,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeBlobsManyRequest)
+  })
+_sym_db.RegisterMessage(ScrapeBlobsManyRequest)
+_sym_db.RegisterMessage(ScrapeBlobsManyRequest.KnownSha256Entry)
+
+ScrapeBlobResult = _reflection.GeneratedProtocolMessageType('ScrapeBlobResult', (_message.Message,), {
+  'DESCRIPTOR' : _SCRAPEBLOBRESULT,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeBlobResult)
+  })
+_sym_db.RegisterMessage(ScrapeBlobResult)
+
+ScrapeBlobsManyResponse = _reflection.GeneratedProtocolMessageType('ScrapeBlobsManyResponse', (_message.Message,), {
+  'DESCRIPTOR' : _SCRAPEBLOBSMANYRESPONSE,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeBlobsManyResponse)
+  })
+_sym_db.RegisterMessage(ScrapeBlobsManyResponse)
+
+WatchScrapesRequest = _reflection.GeneratedProtocolMessageType('WatchScrapesRequest', (_message.Message,), {
+  'DESCRIPTOR' : _WATCHSCRAPESREQUEST,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.WatchScrapesRequest)
+  })
+_sym_db.RegisterMessage(WatchScrapesRequest)
+
+ScrapeEvent = _reflection.GeneratedProtocolMessageType('ScrapeEvent', (_message.Message,), {
+  'DESCRIPTOR' : _SCRAPEEVENT,
+  '__module__' : 'proto.scrape_pb2'
+  # @@protoc_insertion_point(class_scope:scrape.ScrapeEvent)
+  })
+_sym_db.RegisterMessage(ScrapeEvent)
+
 _SCRAPESERVICE = DESCRIPTOR.services_by_name['ScrapeService']
 if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
+  _SCRAPEBLOBSMANYREQUEST_KNOWNSHA256ENTRY._options = None
+  _SCRAPEBLOBSMANYREQUEST_KNOWNSHA256ENTRY._serialized_options = b'8\001'
   _SCRAPEREQUEST._serialized_start=30
   _SCRAPEREQUEST._serialized_end=72
   _SCRAPERESPONSE._serialized_start=74
@@ -79,9 +171,33 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _SCRAPESTATUSRESPONSE._serialized_start=146
   _SCRAPESTATUSRESPONSE._serialized_end=185
   _SCRAPEBLOBREQUEST._serialized_start=187
-  _SCRAPEBLOBREQUEST._serialized_end=220
-  _SCRAPEBLOBRESPONSE._serialized_start=222
-  _SCRAPEBLOBRESPONSE._serialized_end=261
-  _SCRAPESERVICE._serialized_start=264
-  _SCRAPESERVICE._serialized_end=487
+  _SCRAPEBLOBREQUEST._serialized_end=241
+  _SCRAPEBLOBRESPONSE._serialized_start=243
+  _SCRAPEBLOBRESPONSE._serialized_end=282
+  _SCRAPEBLOBINFO._serialized_start=284
+  _SCRAPEBLOBINFO._serialized_end=392
+  _SCRAPEBLOBCHUNK._serialized_start=394
+  _SCRAPEBLOBCHUNK._serialized_end=493
+  _SCRAPESTATUSMANYREQUEST._serialized_start=495
+  _SCRAPESTATUSMANYREQUEST._serialized_end=535
+  _SCRAPESTATUSRESULT._serialized_start=537
+  _SCRAPESTATUSRESULT._serialized_end=603
+  _SCRAPESTATUSMANYRESPONSE._serialized_start=605
+  _SCRAPESTATUSMANYRESPONSE._serialized_end=676
+  _SCRAPEBLOBSMANYREQUEST._serialized_start=679
+  _SCRAPEBLOBSMANYREQUEST._serialized_end=841
+  _SCRAPEBLOBSMANYREQUEST_KNOWNSHA256ENTRY._serialized_start=791
+  _SCRAPEBLOBSMANYREQUEST_KNOWNSHA256ENTRY._serialized_end=841
+  _SCRAPEBLOBRESULT._serialized_start=844
+  _SCRAPEBLOBRESULT._serialized_end=977
+  _SCRAPEBLOBSMANYRESPONSE._serialized_start=979
+  _SCRAPEBLOBSMANYRESPONSE._serialized_end=1047
+  _WATCHSCRAPESREQUEST._serialized_start=1049
+  _WATCHSCRAPESREQUEST._serialized_end=1126
+  _SCRAPEEVENT._serialized_start=1129
+  _SCRAPEEVENT._serialized_end=1321
+  _SCRAPEEVENT_STATE._serialized_start=1266
+  _SCRAPEEVENT_STATE._serialized_end=1321
+  _SCRAPESERVICE._serialized_start=1324
+  _SCRAPESERVICE._serialized_end=1869
 # @@protoc_insertion_point(module_scope)
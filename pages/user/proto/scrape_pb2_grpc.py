@@ -29,6 +29,26 @@ class ScrapeServiceStub(object):
                 request_serializer=proto_dot_scrape__pb2.ScrapeBlobRequest.SerializeToString,
                 response_deserializer=proto_dot_scrape__pb2.ScrapeBlobResponse.FromString,
                 )
+        self.StreamScrapingBlob = channel.unary_stream(
+                '/scrape.ScrapeService/StreamScrapingBlob',
+                request_serializer=proto_dot_scrape__pb2.ScrapeBlobRequest.SerializeToString,
+                response_deserializer=proto_dot_scrape__pb2.ScrapeBlobChunk.FromString,
+                )
+        self.IsScrapingDoneMany = channel.unary_unary(
+                '/scrape.ScrapeService/IsScrapingDoneMany',
+                request_serializer=proto_dot_scrape__pb2.ScrapeStatusManyRequest.SerializeToString,
+                response_deserializer=proto_dot_scrape__pb2.ScrapeStatusManyResponse.FromString,
+                )
+        self.GetScrapingBlobsMany = channel.unary_unary(
+                '/scrape.ScrapeService/GetScrapingBlobsMany',
+                request_serializer=proto_dot_scrape__pb2.ScrapeBlobsManyRequest.SerializeToString,
+                response_deserializer=proto_dot_scrape__pb2.ScrapeBlobsManyResponse.FromString,
+                )
+        self.WatchScrapes = channel.unary_stream(
+                '/scrape.ScrapeService/WatchScrapes',
+                request_serializer=proto_dot_scrape__pb2.WatchScrapesRequest.SerializeToString,
+                response_deserializer=proto_dot_scrape__pb2.ScrapeEvent.FromString,
+                )
 
 
 class ScrapeServiceServicer(object):
@@ -52,6 +72,33 @@ class ScrapeServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamScrapingBlob(self, request, context):
+        """The blob as a stream: a ScrapeBlobInfo first, then the bytes in order
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def IsScrapingDoneMany(self, request, context):
+        """Batch variants: one result per requested name, failures reported per name
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetScrapingBlobsMany(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WatchScrapes(self, request, context):
+        """Pushes every scrape state change after since_version, then new ones as they happen
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ScrapeServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -70,6 +117,26 @@ def add_ScrapeServiceServicer_to_server(servicer, server):
                     request_deserializer=proto_dot_scrape__pb2.ScrapeBlobRequest.FromString,
                     response_serializer=proto_dot_scrape__pb2.ScrapeBlobResponse.SerializeToString,
             ),
+            'StreamScrapingBlob': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamScrapingBlob,
+                    request_deserializer=proto_dot_scrape__pb2.ScrapeBlobRequest.FromString,
+                    response_serializer=proto_dot_scrape__pb2.ScrapeBlobChunk.SerializeToString,
+            ),
+            'IsScrapingDoneMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.IsScrapingDoneMany,
+                    request_deserializer=proto_dot_scrape__pb2.ScrapeStatusManyRequest.FromString,
+                    response_serializer=proto_dot_scrape__pb2.ScrapeStatusManyResponse.SerializeToString,
+            ),
+            'GetScrapingBlobsMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetScrapingBlobsMany,
+                    request_deserializer=proto_dot_scrape__pb2.ScrapeBlobsManyRequest.FromString,
+                    response_serializer=proto_dot_scrape__pb2.ScrapeBlobsManyResponse.SerializeToString,
+            ),
+            'WatchScrapes': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchScrapes,
+                    request_deserializer=proto_dot_scrape__pb2.WatchScrapesRequest.FromString,
+                    response_serializer=proto_dot_scrape__pb2.ScrapeEvent.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'scrape.ScrapeService', rpc_method_handlers)
@@ -130,3 +197,71 @@ class ScrapeService(object):
             proto_dot_scrape__pb2.ScrapeBlobResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def StreamScrapingBlob(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/scrape.ScrapeService/StreamScrapingBlob',
+            proto_dot_scrape__pb2.ScrapeBlobRequest.SerializeToString,
+            proto_dot_scrape__pb2.ScrapeBlobChunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def IsScrapingDoneMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/scrape.ScrapeService/IsScrapingDoneMany',
+            proto_dot_scrape__pb2.ScrapeStatusManyRequest.SerializeToString,
+            proto_dot_scrape__pb2.ScrapeStatusManyResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetScrapingBlobsMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/scrape.ScrapeService/GetScrapingBlobsMany',
+            proto_dot_scrape__pb2.ScrapeBlobsManyRequest.SerializeToString,
+            proto_dot_scrape__pb2.ScrapeBlobsManyResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def WatchScrapes(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/scrape.ScrapeService/WatchScrapes',
+            proto_dot_scrape__pb2.WatchScrapesRequest.SerializeToString,
+            proto_dot_scrape__pb2.ScrapeEvent.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
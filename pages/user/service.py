@@ -1,45 +1,23 @@
 import streamlit as st
 import sqlite3
-from contextlib import contextmanager
 
-
-# Database operations
-@contextmanager
-def get_db_connection():
-    conn = sqlite3.connect("user.db")
-    try:
-        yield conn
-    finally:
-        conn.close()
-
-
-def init_db():
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS services (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL
-            )
-        """
-        )
-        conn.commit()
+from models.database import get_db_connection
+from models.query_cache import cached_fetch_all, invalidate
+from pages.user.bulk import render_bulk_tools
 
 
+# Database operations
 def insert_product(title, description):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM services WHERE title = ?", (title,))
-            if cursor.fetchone()[0] > 0:
-                return "service with this title already exists."
             cursor.execute(
-                "INSERT INTO services (title, description) VALUES (?, ?)",
+                "INSERT INTO services (title, description) VALUES (?, ?) ON CONFLICT (title) DO NOTHING",
                 (title, description),
             )
-            conn.commit()
+            if cursor.rowcount == 0:
+                return "service with this title already exists."
+        invalidate("services")
         return True
     except sqlite3.Error as e:
         return str(e)
@@ -50,26 +28,20 @@ def delete_product(title):
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM services WHERE title = ?", (title,))
-            conn.commit()
+        invalidate("services")
         return True
     except sqlite3.Error as e:
         return str(e)
 
 
 # Main execution
-# Initialize database
-init_db()
-
 # service handling
 st.header("service List")
 if "services" not in st.session_state:
     st.session_state["services"] = []
 
 # Fetch services from the database
-with get_db_connection() as conn:
-    cursor = conn.cursor()
-    cursor.execute("SELECT title, description FROM services")
-    st.session_state["services"] = cursor.fetchall()
+st.session_state["services"] = cached_fetch_all("SELECT title, description FROM services", tables=("services",))
 
 import streamlit as st
 
@@ -107,3 +79,5 @@ with st.form(key="product_form"):
                 st.rerun()
             else:
                 st.error(result)
+
+render_bulk_tools("services", "services")
@@ -1,20 +1,18 @@
 import streamlit as st
 import sqlite3
 
-
-# Function to get database connection
-def get_db_connection():
-    conn = sqlite3.connect("user.db")
-    return conn
+from models.database import get_db_connection
+from models.query_cache import invalidate
+from models.search import search
+from pages.client.scrape_all import fetch_site, render_bulk_scrape
+from pages.user.bulk import render_bulk_tools
 
 
 # Function to remove a vc
 def remove_client(vc_id):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM vcs WHERE id = ?", (vc_id,))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM vcs WHERE id = ?", (vc_id,))
+    invalidate("vcs")
 
 
 # Function to edit a vc (placeholder for now)
@@ -24,14 +22,13 @@ def edit_client(vc_id):
     if "edit_client_id" in st.session_state:
         st.title("Edit vc")
         # Fetch current vc details
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute(
-            "SELECT name, url FROM vcs WHERE id = ?",
-            (st.session_state["edit_client_id"],),
-        )
-        vc = c.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute(
+                "SELECT name, url FROM vcs WHERE id = ?",
+                (st.session_state["edit_client_id"],),
+            )
+            vc = c.fetchone()
 
         with st.form(key="edit_client_form"):
             company_name = st.text_input("vc Company Name", value=vc[0] if vc else "")
@@ -39,47 +36,23 @@ def edit_client(vc_id):
             submit_button = st.form_submit_button(label="Update vc")
 
             if submit_button:
-                conn = get_db_connection()
-                c = conn.cursor()
                 try:
-                    c.execute(
-                        "UPDATE vcs SET name = ?, url = ? WHERE id = ?",
-                        (company_name, company_url, st.session_state["edit_client_id"]),
-                    )
-                    conn.commit()
+                    with get_db_connection() as conn:
+                        conn.execute(
+                            "UPDATE vcs SET name = ?, url = ? WHERE id = ?",
+                            (company_name, company_url, st.session_state["edit_client_id"]),
+                        )
+                    invalidate("vcs")
                     st.success("vc updated successfully!")
                     del st.session_state["edit_client_id"]
                     st.rerun()
                 except sqlite3.IntegrityError:
                     st.warning("vc update failed!")
-                finally:
-                    conn.close()
 
 
-# Function to edit a vc (placeholder for now)
+# Function to scrape a vc's site in the background
 def fetch_client(vc_id):
-    st.session_state["edit_client_id"] = vc_id
-
-
-# Initialize database and create table
-def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS vcs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            url TEXT NOT NULL
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
-
-
-# Initialize the database
-init_db()
+    fetch_site("vcs", vc_id)
 
 
 # Streamlit app
@@ -89,14 +62,18 @@ st.title("VC Management")
 # Search vcs
 search_query = st.text_input("Search vcs")
 
+# Keyset pagination: one cursor per page visited, reset when the search changes
+if st.session_state.get("vc_search") != search_query:
+    st.session_state["vc_search"] = search_query
+    st.session_state["vc_cursors"] = [None]
+cursors = st.session_state["vc_cursors"]
+
 # Retrieve and display vcs from the database
-conn = get_db_connection()
-c = conn.cursor()
-c.execute(
-    "SELECT id, name, url FROM vcs WHERE name LIKE ?", ("%" + search_query + "%",)
-)
-filtered_clients = c.fetchall()
-conn.close()
+try:
+    filtered_clients, next_cursor = search("vcs", search_query, after=cursors[-1])
+except sqlite3.Error as e:
+    st.error(f"Database error: {e}")
+    filtered_clients, next_cursor = [], None
 
 st.write("### VC List")
 if filtered_clients:
@@ -104,6 +81,8 @@ if filtered_clients:
         col1, col2, col3, col4, col5 = st.columns([1, 4, 1, 1, 1])
         col1.write(vc[1])  # Name
         col2.write(vc[2])  # URL
+        if vc[3]:
+            col2.caption(vc[3])  # Matching scraped text
 
         if col3.button(
             "Remove",
@@ -132,6 +111,15 @@ if filtered_clients:
 else:
     st.write("No vcs found.")
 
+col_prev, col_page, col_next = st.columns([1, 4, 1])
+if col_prev.button("Previous", key="vc_prev", disabled=len(cursors) == 1):
+    cursors.pop()
+    st.rerun()
+col_page.caption(f"Page {len(cursors)}")
+if col_next.button("Next", key="vc_next", disabled=next_cursor is None):
+    cursors.append(next_cursor)
+    st.rerun()
+
 # Add new vc form
 st.title("Add VC")
 with st.form(key="client_form"):
@@ -141,16 +129,17 @@ with st.form(key="client_form"):
 
     # Add new vc to the database if not a duplicate
     if submit_button:
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            c.execute(
-                "INSERT INTO vcs (name, url) VALUES (?, ?)",
-                (company_name, company_url),
-            )
-            conn.commit()
+            with get_db_connection() as conn:
+                conn.execute(
+                    "INSERT INTO vcs (name, url) VALUES (?, ?)",
+                    (company_name, company_url),
+                )
+            invalidate("vcs")
             st.success("vc added successfully!")
         except sqlite3.IntegrityError:
             st.warning("vc already exists!")
-        finally:
-            conn.close()
+
+render_bulk_tools("vcs", "VCs")
+
+render_bulk_scrape()
@@ -0,0 +1,62 @@
+"""Offline batch inference in stub mode: resuming and what it leaves alone.
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from models import batch, telemetry
+from models.batch import completed_ids, run_batch
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.input = Path(tmp.name) / "requests.jsonl"
+        self.output = Path(tmp.name) / "results.jsonl"
+        self.input.write_text("".join(
+            json.dumps({"id": name, "prompt": f"What does {name} make?"}) + "\n" for name in ("a", "b", "c")
+        ), encoding="utf-8")
+        # Stub mode must not need the vector store or record telemetry
+        for patch in (
+                mock.patch.object(batch, "load_vector_store", side_effect=AssertionError("vector store loaded")),
+                mock.patch.object(telemetry.writer, "submit", side_effect=AssertionError("telemetry recorded")),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def results(self) -> list:
+        return [json.loads(line) for line in self.output.read_text(encoding="utf-8").splitlines()]
+
+    def test_stub_run(self):
+        counts = run_batch(self.input, self.output, workers=2, stub=True)
+        self.assertEqual((counts["ok"], counts["error"], counts["skipped"]), (3, 0, 0))
+        results = {result["id"]: result for result in self.results()}
+        self.assertEqual(sorted(results), ["a", "b", "c"])
+        self.assertTrue(results["a"]["answer"].startswith("[stub llama3.2:1b]"))
+        self.assertEqual(len(results["a"]["sources"]), 3)
+
+    def test_resumes_after_completed_ids(self):
+        self.output.write_text(
+            json.dumps({"id": "a", "status": "ok"}) + "\n"
+            + json.dumps({"id": "b", "status": "error", "error": "timeout"}) + "\n"
+            + "[1, 2]\n\"ok\"\n{\"status\": \"ok\"}\n"
+            + '{"id": "c", "sta',  # torn by a crash
+            encoding="utf-8",
+        )
+        self.assertEqual(completed_ids(self.output), {"a"})
+        counts = run_batch(self.input, self.output, stub=True)
+        self.assertEqual((counts["ok"], counts["skipped"]), (2, 1))
+        self.assertEqual(completed_ids(self.output), {"a", "b", "c"})
+        # The torn line was terminated: every new result is a line of its own
+        lines = self.output.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(sorted(json.loads(line)["id"] for line in lines[-2:]), ["b", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
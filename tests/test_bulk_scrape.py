@@ -0,0 +1,157 @@
+"""Bulk scraping against the stand-in scrape service on a local port.
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import asyncio
+import socket
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from config import settings
+from models import bulk_scrape, database, scrape_client
+from models.bulk_scrape import ScrapeProgress, Site, refresh_blobs, scrape_sites
+from models.query_cache import invalidate
+from models.scrape_client import ScrapeChannel, scraping_done_many
+from models.scrape_server import StubScrapeService, serve
+from models.scrapes import list_scrapes, load_text
+
+SITES = [Site("clients", f"Site {i}", f"http://site{i}.test") for i in range(12)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+class CountingStub(StubScrapeService):
+    """The stand-in service, counting status calls and with a fixed scrape time so blobs repeat"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.status_calls = 0
+        self.batch_sizes = []
+        self.streamed = []
+
+    async def IsScrapingDone(self, request, context):
+        self.status_calls += 1
+        return await super().IsScrapingDone(request, context)
+
+    async def IsScrapingDoneMany(self, request, context):
+        self.batch_sizes.append(len(request.names))
+        return await super().IsScrapingDoneMany(request, context)
+
+    async def StreamScrapingBlob(self, request, context):
+        self.streamed.append(request.name)
+        async for chunk in super().StreamScrapingBlob(request, context):
+            yield chunk
+
+    async def Scrape(self, request, context):
+        response = await super().Scrape(request, context)
+        self.requested_at[self.key(request.url)] = "2024-01-01T00:00:00"
+        return response
+
+
+class FailingStub(CountingStub):
+    """A service whose status check of one site fails outright"""
+
+    def is_done(self, name: str) -> bool:
+        if name == SITES[0].key:
+            raise RuntimeError("Scraper crashed")
+        return super().is_done(name)
+
+
+class BulkScrapeTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.port = free_port()
+        channel = ScrapeChannel(f"localhost:{self.port}")
+        for patch in (
+                mock.patch.object(settings, "DB_PATH", Path(tmp.name) / "user.db"),
+                mock.patch.object(settings, "SCRAPE_POLL_INITIAL", 0.02),
+                mock.patch.object(settings, "SCRAPE_POLL_MAX", 0.1),
+                mock.patch.object(database, "pool", database.ConnectionPool()),
+                mock.patch.object(database, "_schema_ready", False),
+                mock.patch.object(bulk_scrape, "scrape_channel", channel),
+                mock.patch.object(scrape_client, "scrape_channel", channel),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+        # Results cached from another test's database
+        load_text.cache_clear()
+        invalidate()
+
+    def scrape(self, servicer: StubScrapeService) -> ScrapeProgress:
+        progress = ScrapeProgress(total=len(SITES))
+
+        async def run():
+            server = await serve(servicer, self.port)
+            try:
+                await scrape_sites(SITES, progress, concurrency=len(SITES))
+            finally:
+                await server.stop(None)
+
+        asyncio.run(run())
+        return progress
+
+    def call(self, servicer: StubScrapeService, fn, *args):
+        """fn(*args) on the blocking client, against servicer with every site already scraped"""
+        for site in SITES:
+            servicer.urls[site.key] = site.url
+            servicer.requested_at[site.key] = "2024-01-01T00:00:00"
+            servicer.ready_at[site.key] = 0.0
+
+        async def run():
+            server = await serve(servicer, self.port)
+            try:
+                return await asyncio.to_thread(fn, *args)
+            finally:
+                await server.stop(None)
+
+        return asyncio.run(run())
+
+    def test_stores_each_site_once_and_batches_status_polls(self):
+        servicer = CountingStub(delay=0.05, page_kb=4)
+        progress = self.scrape(servicer)
+        self.assertEqual((progress.stored, progress.unchanged, progress.failed), (len(SITES), 0, 0), progress.errors)
+        self.assertEqual(len(list_scrapes()), len(SITES))
+        self.assertIn(servicer.fake_page(SITES[0].url), load_text(list_scrapes(SITES[0].key)[0].blob_hash))
+
+        # Every site in flight is polled in one IsScrapingDoneMany call per round
+        self.assertEqual(servicer.status_calls, 0)
+        self.assertLess(len(servicer.batch_sizes), len(SITES))
+        self.assertGreater(max(servicer.batch_sizes), 1)
+
+        # The same blobs again are not downloaded, let alone stored
+        again = self.scrape(servicer)
+        self.assertEqual((again.stored, again.unchanged, again.failed), (0, len(SITES), 0), again.errors)
+        self.assertEqual(again.bytes, 0)
+        self.assertEqual(len(list_scrapes()), len(SITES))
+
+    def test_failed_downloads_are_counted_per_site(self):
+        progress = self.scrape(CountingStub(delay=0.05, fail_rate=1.0, page_kb=4))
+        self.assertEqual((progress.stored, progress.unchanged, progress.failed), (0, 0, len(SITES)))
+        self.assertEqual(len(progress.errors), len(SITES))
+        self.assertIn("Stand-in failure", progress.errors[0])
+        self.assertEqual(list_scrapes(), [])
+
+    def test_blobs_past_the_batch_cap_are_streamed(self):
+        # Each blob is about 4 KB: two fit in a response, the rest are withheld
+        servicer = CountingStub(page_kb=4, batch_max_kb=10)
+        stored, unchanged, errors = self.call(servicer, refresh_blobs, [site.key for site in SITES])
+        self.assertEqual((stored, unchanged, errors), (len(SITES), 0, {}))
+        self.assertEqual(len(servicer.streamed), len(SITES) - 2)
+        self.assertIn(servicer.fake_page(SITES[-1].url), load_text(list_scrapes(SITES[-1].key)[0].blob_hash))
+
+    def test_status_errors_are_reported_per_site(self):
+        done, errors = self.call(FailingStub(), scraping_done_many, [site.key for site in SITES])
+        self.assertEqual(errors, {SITES[0].key: "Scraper crashed"})
+        self.assertEqual(done, {site.key: True for site in SITES[1:]})
+
+
+if __name__ == "__main__":
+    unittest.main()
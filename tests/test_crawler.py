@@ -0,0 +1,171 @@
+"""The crawler against a fixture site served by httpx.MockTransport.
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import asyncio
+import tempfile
+import time
+import unittest
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import httpx
+
+from config import settings
+from models.crawler import ROBOTS_UNREACHABLE_TTL, Crawler, CrawlStore
+
+ROOT = "http://site.test/"
+ROBOTS = "User-agent: *\nDisallow: /private\nCrawl-delay: {delay}\n"
+
+
+def page(title: str, *links: str) -> str:
+    anchors = " ".join(f'<a href="{link}">{link}</a>' for link in links)
+    return (
+        f"<html><head><title>{title}</title></head><body><main><h1>{title}</h1>"
+        f"<p>The {title} page has a paragraph of real content, long enough to be kept.</p>"
+        f"<p>See also {anchors}.</p></main></body></html>"
+    )
+
+
+SITE = {
+    "/": page("Home", "/a", "/a#team", "/a", "/b", "/private/x", "http://other.test/", "/logo.png"),
+    "/a": page("A", "/", "/b", "/deep1"),
+    "/b": page("B", "/a"),
+    "/deep1": page("Deep 1", "/deep2"),
+    "/deep2": page("Deep 2", "/deep3"),
+    "/deep3": page("Deep 3"),
+    "/private/x": page("Private"),
+}
+
+
+class FixtureSite:
+    """Serves SITE on site.test and counts what was requested when"""
+
+    def __init__(self, crawl_delay: float = 0, robots_error: bool = False):
+        self.robots = ROBOTS.format(delay=crawl_delay)
+        self.robots_error = robots_error
+        self.requests = Counter()
+        self.times = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests[f"{request.url.host}{path}"] += 1
+        if path == "/robots.txt":
+            if self.robots_error:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, text=self.robots, headers={"content-type": "text/plain"})
+        self.times.append(time.monotonic())
+        if request.url.host != "site.test" or path not in SITE:
+            return httpx.Response(404, text="not found")
+        return httpx.Response(200, text=SITE[path], headers={"content-type": "text/html; charset=utf-8"})
+
+
+class CrawlerTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db_path = Path(tmp.name) / "crawler.db"
+        self.store = self.open_store()
+        for name, value in (
+                ("EXTRACT_WORKERS", 1),
+                ("CRAWL_HOST_RATE", 1000.0),
+                ("CRAWL_MAX_DEPTH", 10),
+                ("CRAWL_MAX_PAGES", 50),
+                ("CRAWL_MAX_RETRIES", 0),
+        ):
+            patch = mock.patch.object(settings, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def open_store(self) -> CrawlStore:
+        store = CrawlStore(self.db_path)
+        self.addCleanup(store.close)
+        return store
+
+    def crawl(self, site: FixtureSite, store: CrawlStore = None, resume: bool = False) -> Crawler:
+        crawler = Crawler(store or self.store, transport=httpx.MockTransport(site))
+
+        async def run():
+            try:
+                if resume:
+                    self.assertEqual(crawler.resume(), 1)
+                else:
+                    crawler.start("site.test", ROOT)
+                await asyncio.gather(*crawler.tasks.values())
+            finally:
+                await crawler.aclose()
+
+        asyncio.run(run())
+        return crawler
+
+    def crawled(self, store: CrawlStore = None) -> set:
+        return {url for url, _, _ in (store or self.store).pages("site.test")}
+
+    def test_obeys_robots_and_fetches_each_url_once(self):
+        site = FixtureSite()
+        crawler = self.crawl(site)
+        self.assertEqual(self.store.job("site.test").state, "done")
+        self.assertEqual(self.crawled(), {ROOT + path.lstrip("/") for path in SITE if path != "/private/x"})
+        self.assertNotIn("site.test/private/x", site.requests)
+        self.assertEqual(crawler.metrics["robots_disallowed"], 1)
+        # Fragments and repeated links are one URL; other hosts and images are not fetched
+        self.assertEqual(max(site.requests.values()), 1)
+        self.assertNotIn("other.test/", site.requests)
+        self.assertNotIn("site.test/logo.png", site.requests)
+        self.assertIn("paragraph of real content", self.store.blob("site.test"))
+
+    def test_crawl_delay_spaces_requests(self):
+        # robots.txt delays are whole seconds; three pages keep the test short
+        site = FixtureSite(crawl_delay=1)
+        with mock.patch.object(settings, "CRAWL_MAX_PAGES", 3):
+            crawler = self.crawl(site)
+        self.assertEqual(crawler.hosts["site.test"].limiter.rate, 1.0)
+        gaps = [later - earlier for earlier, later in zip(site.times, site.times[1:])]
+        self.assertEqual(len(gaps), 2)
+        self.assertGreaterEqual(min(gaps), 0.9)
+
+    def test_depth_limit(self):
+        with mock.patch.object(settings, "CRAWL_MAX_DEPTH", 2):
+            site = FixtureSite()
+            self.crawl(site)
+        # / is depth 0, /a depth 1, /deep1 depth 2: its links are not followed
+        self.assertIn(ROOT + "deep1", self.crawled())
+        self.assertNotIn("site.test/deep2", site.requests)
+
+    def test_page_limit(self):
+        with mock.patch.object(settings, "CRAWL_MAX_PAGES", 3):
+            site = FixtureSite()
+            self.crawl(site)
+        self.assertLessEqual(len(self.crawled()), 3)
+        self.assertLessEqual(sum(n for url, n in site.requests.items() if not url.endswith("robots.txt")), 3)
+
+    def test_resumes_a_job_left_running(self):
+        # A previous run fetched the start page, queued its links and was stopped
+        self.store.start_job("site.test", ROOT)
+        self.store.record_page("site.test", ROOT, 200, "Home", "Home text", [ROOT + "b"], None, None)
+        self.store.enqueue("site.test", ROOT + "b", 1)
+        self.store.close()
+
+        store = self.open_store()
+        self.assertEqual(store.job("site.test").state, "running")
+        site = FixtureSite()
+        self.crawl(site, store, resume=True)
+        self.assertEqual(store.job("site.test").state, "done")
+        self.assertNotIn("site.test/", site.requests)
+        self.assertEqual(site.requests["site.test/b"], 1)
+        self.assertTrue({ROOT, ROOT + "b", ROOT + "a"} <= self.crawled(store))
+
+    def test_unreachable_robots_blocks_the_host_only_briefly(self):
+        crawler = self.crawl(FixtureSite(robots_error=True))
+        job = self.store.job("site.test")
+        self.assertEqual(job.state, "failed")
+        self.assertIn("could be fetched", job.error)
+        host = crawler.hosts["site.test"]
+        self.assertLessEqual(host.robots_expires_at - time.monotonic(), ROBOTS_UNREACHABLE_TTL)
+        self.assertLess(ROBOTS_UNREACHABLE_TTL, settings.CRAWL_ROBOTS_TTL)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Main-content extraction, with selectolax and with the html.parser fallback.
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import unittest
+
+from models import extract as extract_module
+from models.extract import _extract_stdlib, extract
+
+CASES = [
+    # Void elements flagged as boilerplate have no end tag to stop skipping at
+    ('<p>Intro</p><img class="social-icon"><p>Main text here</p>', "Intro\nMain text here"),
+    ("<main><h1>Head</h1><input aria-hidden=true><p>Body para</p></main>", "Head\nBody para"),
+    # Boilerplate elements whose end tag is left out
+    ('<ul><li>One<li class="share">Share me<li>Three</ul><p>After</p>', "One\nThree\nAfter"),
+    ('<ul><li class="share">Share me</ul><p>After list</p>', "After list"),
+    ('<table><tr class="share"><td>Share<tr><td>Row two</table>', "Row two"),
+    # Ordinary boilerplate
+    ("<div><nav><ul><li>Home<li>About</ul></nav><p>Real</p></div>", "Real"),
+    ('<header>Banner</header><main><p>Body</p></main><footer>Contact</footer>', "Body"),
+    # Hints match whole class and id tokens, not substrings of them
+    ('<body class="page-template-default no-sidebar"><main><h1>Welcome</h1><p>We build turbines.</p></main></body>',
+     "Welcome\nWe build turbines."),
+    ('<body><div id="page" class="site shared-layout"><main><p>Our story</p></main></div></body>', "Our story"),
+    ('<div class="share-bar">Tweet</div><p>Kept</p>', "Kept"),
+    # Boilerplate-looking wrappers of the main content are layout
+    ('<body><div class="sidebar-layout"><aside>Menu</aside><main><p>Inside</p></main></div></body>', "Inside"),
+    # ASP.NET WebForms wrap the whole page in a form; other forms are still dropped
+    ('<html><body><form id="form1" method="post"><div><h2>Products</h2><p>Pumps and valves.</p>'
+     '<div role="search"><input name="q">Search</div></div></form></body></html>', "Products\nPumps and valves."),
+    ('<body><div><form action="/subscribe">Email us</form><p>Text</p></div></body>', "Text"),
+]
+
+
+class ExtractTest(unittest.TestCase):
+    def test_stdlib_parser(self):
+        for html, text in CASES:
+            with self.subTest(html=html):
+                self.assertEqual(_extract_stdlib(html).text, text)
+
+    @unittest.skipIf(extract_module.LexborHTMLParser is None, "selectolax is not installed")
+    def test_selectolax(self):
+        for html, text in CASES:
+            with self.subTest(html=html):
+                self.assertEqual(extract(html).text, text)
+
+    def test_links_include_boilerplate(self):
+        page = _extract_stdlib('<nav><a href="/about">About</a></nav><p><a href="/x" rel="nofollow">x</a>Body</p>')
+        self.assertEqual(page.links, ["/about"])
+        self.assertEqual(page.text, "xBody")
+
+
+if __name__ == "__main__":
+    unittest.main()
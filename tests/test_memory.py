@@ -0,0 +1,55 @@
+"""Per-session chat memory, summarized in the background.
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from config import settings
+from models import database
+from models.memory import ConversationStore
+
+
+class ConversationStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patch in (
+                mock.patch.object(settings, "DB_PATH", Path(tmp.name) / "user.db"),
+                mock.patch.object(database, "pool", database.ConnectionPool()),
+                mock.patch.object(database, "_schema_ready", False),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_background_summaries_keep_evicted_messages_in_context(self):
+        release = threading.Event()
+        done = threading.Event()
+
+        def summarizer(summary, messages):
+            release.wait(5)
+            done.set()
+            return " ".join(m["content"] for m in messages)
+
+        conversation = ConversationStore("s", max_turns=2, summarizer=summarizer, background=True)
+        for i in range(5):
+            conversation.add("user", f"m{i}")
+        # The summarizer is blocked, yet add() returned: nothing is lost from the next turn's context
+        summary, history = conversation.context()
+        self.assertEqual(summary, "")
+        self.assertEqual([m["content"] for m in history], [f"m{i}" for i in range(5)])
+
+        release.set()
+        self.assertTrue(done.wait(5))
+        conversation._summarizing.result(5)
+        summary, history = conversation.context()
+        self.assertEqual(summary, "m0 m1 m2")
+        self.assertEqual([m["content"] for m in history], ["m3", "m4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
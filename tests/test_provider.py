@@ -0,0 +1,122 @@
+"""Provider transport against an in-process mock server (httpx.MockTransport).
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import time
+import unittest
+
+import httpx
+
+from models.openai import OpenAIProvider
+from models.provider import Completion, Provider, ProviderError
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+def sse(*events) -> bytes:
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events).encode() + b"data: [DONE]\n\n"
+
+
+def answer(text: str) -> dict:
+    return {
+        "model": "gpt-4o-mini",
+        "choices": [{"message": {"content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 1},
+    }
+
+
+def provider(handler, **kwargs) -> OpenAIProvider:
+    kwargs.setdefault("rate_limit", 0)
+    return OpenAIProvider(base_url="http://mock/v1", api_key="test", transport=httpx.MockTransport(handler), **kwargs)
+
+
+class ProviderTest(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_adapter_hooks_are_abstract(self):
+        with self.assertRaises(TypeError):
+            Provider()
+
+    def test_stream_reads_server_sent_events(self):
+        def handler(request):
+            body = json.loads(request.content)
+            self.assertTrue(body["stream"])
+            self.assertEqual(request.headers["authorization"], "Bearer test")
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=sse(
+                {"choices": [{"delta": {"content": "Hel"}}]},
+                {"choices": [{"delta": {"content": "lo"}, "finish_reason": "stop"}]},
+                {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2}},
+            ))
+
+        completion = Completion("gpt-4o-mini")
+
+        async def run():
+            p = provider(handler)
+            try:
+                chunks = [chunk async for chunk in p.stream("gpt-4o-mini", MESSAGES, completion=completion)]
+            finally:
+                await p.aclose()
+            return chunks
+
+        self.assertEqual(self.run_async(run()), ["Hel", "lo"])
+        self.assertEqual(completion.text, "Hello")
+        self.assertEqual(completion.finish_reason, "stop")
+        self.assertEqual((completion.prompt_tokens, completion.completion_tokens), (3, 2))
+
+    def test_retries_429_after_retry_after(self):
+        calls = []
+
+        def handler(request):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"retry-after": "0.2"}, text="slow down")
+            return httpx.Response(200, json=answer("ok"))
+
+        async def run():
+            p = provider(handler)
+            try:
+                return await p.complete("gpt-4o-mini", MESSAGES), p.metrics
+            finally:
+                await p.aclose()
+
+        completion, metrics = self.run_async(run())
+        self.assertEqual(completion.text, "ok")
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.2)
+        self.assertEqual(metrics["retries"], 1)
+
+    def test_gives_up_on_non_retryable_status(self):
+        async def run():
+            p = provider(lambda request: httpx.Response(400, text="bad request"))
+            try:
+                await p.complete("gpt-4o-mini", MESSAGES)
+            finally:
+                await p.aclose()
+
+        with self.assertRaises(ProviderError) as raised:
+            self.run_async(run())
+        self.assertEqual(raised.exception.status, 400)
+
+    def test_rate_limit_spaces_requests(self):
+        async def run():
+            p = provider(lambda request: httpx.Response(200, json=answer("ok")), rate_limit=10)
+            try:
+                start = time.monotonic()
+                await asyncio.gather(*(p.complete("gpt-4o-mini", MESSAGES) for _ in range(12)))
+                return time.monotonic() - start, p.metrics
+            finally:
+                await p.aclose()
+
+        elapsed, metrics = self.run_async(run())
+        # A burst of 10, then one request per 0.1s
+        self.assertGreaterEqual(elapsed, 0.18)
+        self.assertEqual(metrics["requests"], 12)
+        self.assertGreater(metrics["throttled_seconds"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""The process-wide query cache: table versions and expiry.
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import unittest
+from unittest import mock
+
+from models import query_cache as query_cache_module
+from models.query_cache import QueryCache
+
+
+class QueryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return self.loads
+
+    def test_invalidate_refetches_the_table(self):
+        cache = QueryCache(max_entries=8, ttl=0)
+        self.assertEqual(cache.get_or_load("q", ("products",), self.load), 1)
+        self.assertEqual(cache.get_or_load("q", ("products",), self.load), 1)
+        cache.invalidate("clients")
+        self.assertEqual(cache.get_or_load("q", ("products",), self.load), 1)
+        cache.invalidate("products")
+        self.assertEqual(cache.get_or_load("q", ("products",), self.load), 2)
+
+    def test_entries_expire_for_writes_from_other_processes(self):
+        cache = QueryCache(max_entries=8, ttl=5)
+        with mock.patch.object(query_cache_module.time, "monotonic", return_value=100.0):
+            self.assertEqual(cache.get_or_load("q", ("products",), self.load), 1)
+        with mock.patch.object(query_cache_module.time, "monotonic", return_value=104.0):
+            self.assertEqual(cache.get_or_load("q", ("products",), self.load), 1)
+        with mock.patch.object(query_cache_module.time, "monotonic", return_value=105.5):
+            self.assertEqual(cache.get_or_load("q", ("products",), self.load), 2)
+        self.assertEqual(cache.snapshot()["expired"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""Latency-aware routing: SLO fallback and recovery once old samples age out.
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import unittest
+from unittest import mock
+
+from models import router as router_module
+from models.router import ModelProfile, ModelRouter
+
+PROFILES = [
+    ModelProfile("small", tier=0, cost=1.0, prior_latency=1.0),
+    ModelProfile("large", tier=1, cost=5.0, prior_latency=5.0),
+]
+QUESTION = "Why did revenue drop? Explain and compare the regions."
+
+
+class ModelRouterTest(unittest.TestCase):
+    def test_a_slow_model_is_tried_again_once_its_samples_age_out(self):
+        router = ModelRouter(PROFILES, latency_slo=10, percentile=0.9, sample_max_age=60)
+        with mock.patch.object(router_module.time, "monotonic", return_value=1000.0):
+            self.assertEqual(router.route(QUESTION).model, "large")
+            for _ in range(5):
+                router.stats.observe("large", 30.0)
+            decision = router.route(QUESTION)
+            self.assertEqual((decision.model, decision.fallback), ("small", True))
+        with mock.patch.object(router_module.time, "monotonic", return_value=1061.0):
+            decision = router.route(QUESTION)
+            self.assertEqual((decision.model, decision.fallback), ("large", False))
+            self.assertEqual(router.stats.count("large"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
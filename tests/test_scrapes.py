@@ -0,0 +1,102 @@
+"""Scrape storage: blobs decoded into scrape_pages on ingest.
+
+Run from the repository root:
+    python -m unittest discover -s tests
+"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from config import settings
+from models import database
+from models.compression import StreamCompressor, content_hash
+from models.query_cache import invalidate
+from models.scrape_blob import ScrapedPage, ScrapeRecord, StreamedRecord, decode, render
+from models.scrapes import (
+    latest_hash, latest_records, list_scrapes, load_text, save_compressed_scrape, save_scrape, scrape_pages,
+)
+
+BLOBS = [
+    render("a.test", "http://a.test/", [{"url": f"http://a.test/{i}", "title": f"Page {i}", "text": "é" * 40 * i}
+                                        for i in range(5)], "2024-01-01"),
+    # The stand-in server's shape: one "data" text and the time last
+    json.dumps({"Name": "b.test", "url": "http://b.test", "data": "Old ✓ text", "time": "t", "n": 1.5e3}),
+    json.dumps({"Name": "c.test", "url": "http://c.test", "pages": "not a list", "data": None}),
+    render("empty.test", "http://empty.test/", [], "t"),
+]
+
+
+def chunks(text: str, size: int):
+    return (text[start:start + size] for start in range(0, len(text), size))
+
+
+class ScrapesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patch in (
+                mock.patch.object(settings, "DB_PATH", Path(tmp.name) / "user.db"),
+                mock.patch.object(database, "pool", database.ConnectionPool()),
+                mock.patch.object(database, "_schema_ready", False),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+        # Results cached from another test's database
+        load_text.cache_clear()
+        invalidate()
+
+    def test_pages_are_stored_per_blob(self):
+        pages = [{"url": "http://a.test/", "title": "Home", "text": "Hello"},
+                 {"url": "http://a.test/x", "title": "X", "text": "More"}]
+        self.assertTrue(save_scrape("a.test", render("a.test", "http://a.test/", pages, "t")))
+        self.assertTrue(save_scrape("b.test", json.dumps({"Name": "b.test", "url": "http://b.test", "data": "Old"})))
+        self.assertEqual(scrape_pages(latest_hash("a.test")), [ScrapedPage(**page) for page in pages])
+        self.assertEqual(scrape_pages(latest_hash("b.test")), [ScrapedPage("http://b.test", None, "Old")])
+        scrape = list_scrapes("a.test")[0]
+        self.assertEqual((scrape.site_url, scrape.page_count), ("http://a.test/", 2))
+
+    def test_streamed_records_decode_like_whole_blobs(self):
+        for blob in BLOBS:
+            for size in (1, 7, 4096):
+                with self.subTest(blob=blob[:40], size=size):
+                    record = StreamedRecord(chunks(blob, size))
+                    pages = list(record.pages())
+                    self.assertEqual(ScrapeRecord(record.name, record.url, record.time, pages), decode(blob))
+        with self.assertRaises(ValueError):
+            list(StreamedRecord(chunks("plain text", 3)).pages())
+
+    def test_compressed_blobs_are_decoded_on_ingest(self):
+        for blob in BLOBS + ["plain text, not JSON"]:
+            compressor = StreamCompressor()
+            compressor.write(blob.encode("utf-8"))
+            name = content_hash(blob)[:8]
+            self.assertTrue(save_compressed_scrape(name, compressor.hexdigest(), compressor.size, compressor.codec,
+                                                   compressor.finish()))
+            record = decode(blob)
+            self.assertEqual(scrape_pages(latest_hash(name)), record.pages)
+            scrape = list_scrapes(name)[0]
+            self.assertEqual((scrape.site_url, scrape.page_count), (record.url, len(record.pages)))
+            self.assertEqual(load_text(scrape.blob_hash), blob)
+
+    def test_latest_records_keep_blobs_without_pages(self):
+        save_scrape("a.test", render("a.test", "http://a.test/", [{"url": "u", "title": None, "text": "Old"}], "t1"))
+        save_scrape("a.test", render("a.test", "http://a.test/", [{"url": "u", "title": None, "text": "New"}], "t2"))
+        save_scrape("empty.test", render("empty.test", "http://empty.test/", [], "t"))
+        records = dict(latest_records())
+        self.assertEqual([page.text for page in records["a.test"].pages], ["New"])
+        self.assertEqual(records["empty.test"].url, "http://empty.test/")
+        self.assertEqual(records["empty.test"].pages, [])
+
+    def test_pruned_blobs_lose_their_pages(self):
+        for i in range(3):
+            save_scrape("a.test", render("a.test", "http://a.test/", [{"url": "u", "title": None, "text": str(i)}], "t"),
+                        keep=1)
+        with database.get_db_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM scrape_blobs").fetchone()[0], 1)
+            self.assertEqual(conn.execute("SELECT text FROM scrape_pages").fetchall(), [("2",)])
+
+
+if __name__ == "__main__":
+    unittest.main()